@@ -10,10 +10,12 @@ set -Eeuo pipefail
 REPO_ROOT="${REPO_ROOT:-/home/uvceed/uvceed-disease-alerts}"
 OUT_LOG="${OUT_LOG:-/home/uvceed/cdc_cron_runs/refresh_requested.log}"
 DAYS="${DAYS:-30}"
+CONCURRENCY="${CONCURRENCY:-8}"
+REFRESH_WORKERS="${REFRESH_WORKERS:-$((CONCURRENCY * 2))}"
 
 mkdir -p "$(dirname "$OUT_LOG")"
 
-CRON_LINE="15 6 * * * cd $REPO_ROOT && /usr/bin/env bash -lc 'python3 -m uvceed_api.db_migrate && python3 -m uvceed_api.cli_refresh_requested --days $DAYS' >> $OUT_LOG 2>&1"
+CRON_LINE="15 6 * * * cd $REPO_ROOT && /usr/bin/env bash -lc 'python3 -m uvceed_api.db_migrate && (python3 -m uvceed_alerts.coverage --rebuild || true) && UVCEED_REFRESH_WORKERS=$REFRESH_WORKERS python3 -m uvceed_api.cli_refresh_requested --days $DAYS --concurrency $CONCURRENCY' >> $OUT_LOG 2>&1"
 
 ( crontab -l 2>/dev/null | grep -v 'uvceed_api.cli_refresh_requested' || true; echo "$CRON_LINE" ) | crontab -
 
@@ -0,0 +1,117 @@
+-- Phase 3 baseline: the schema ensure_phase3_schema used to create inline (idempotent, so it
+-- also applies cleanly to databases created before schema_migrations existed).
+CREATE TABLE IF NOT EXISTS signal_snapshots (
+  id bigserial PRIMARY KEY,
+  zip_code text NOT NULL,
+  signal_type text NOT NULL,
+  generated_at timestamptz NOT NULL,
+  payload jsonb NOT NULL,
+  pathogen text,
+  geo_level text,
+  geo_id text,
+  state text,
+  county_fips text,
+  risk_level text,
+  trend text,
+  confidence text,
+  composite_score double precision,
+  source_version text,
+  checked_at timestamptz,
+  data_as_of date
+);
+
+-- Columns added after the initial Phase 3 rollout
+ALTER TABLE signal_snapshots ADD COLUMN IF NOT EXISTS source_version text;
+ALTER TABLE signal_snapshots ADD COLUMN IF NOT EXISTS checked_at timestamptz;
+ALTER TABLE signal_snapshots ADD COLUMN IF NOT EXISTS data_as_of date;
+
+CREATE INDEX IF NOT EXISTS idx_signal_snapshots_zip_type_time
+  ON signal_snapshots(zip_code, signal_type, generated_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_signal_snapshots_geo_time
+  ON signal_snapshots(signal_type, geo_level, geo_id, generated_at DESC);
+
+CREATE TABLE IF NOT EXISTS zip_requests (
+  zip_code text PRIMARY KEY,
+  first_requested_at timestamptz NOT NULL DEFAULT now(),
+  last_requested_at timestamptz NOT NULL DEFAULT now(),
+  last_refreshed_at timestamptz,
+  request_count bigint NOT NULL DEFAULT 0,
+  popularity double precision NOT NULL DEFAULT 0
+);
+
+ALTER TABLE zip_requests ADD COLUMN IF NOT EXISTS request_count bigint NOT NULL DEFAULT 0;
+ALTER TABLE zip_requests ADD COLUMN IF NOT EXISTS popularity double precision NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_zip_requests_last_requested
+  ON zip_requests(last_requested_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_zip_requests_last_refreshed
+  ON zip_requests(last_refreshed_at DESC);
+
+CREATE TABLE IF NOT EXISTS refresh_jobs (
+  id bigserial PRIMARY KEY,
+  geo_key text NOT NULL,
+  signal_type text NOT NULL,
+  priority integer NOT NULL DEFAULT 0,
+  force boolean NOT NULL DEFAULT false,
+  status text NOT NULL DEFAULT 'queued',
+  attempts integer NOT NULL DEFAULT 0,
+  max_attempts integer NOT NULL DEFAULT 3,
+  run_after timestamptz NOT NULL DEFAULT now(),
+  locked_by text,
+  locked_at timestamptz,
+  last_error text,
+  created_at timestamptz NOT NULL DEFAULT now(),
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- At most one queued job per (geo, signal); re-enqueueing merges into it
+CREATE UNIQUE INDEX IF NOT EXISTS uq_refresh_jobs_queued
+  ON refresh_jobs(geo_key, signal_type) WHERE status = 'queued';
+
+CREATE INDEX IF NOT EXISTS idx_refresh_jobs_claim
+  ON refresh_jobs(priority DESC, run_after, id) WHERE status = 'queued';
+
+-- Refresh ownership per (geo key, signal); expires so a crashed owner can't wedge it
+CREATE TABLE IF NOT EXISTS refresh_leases (
+  lock_key text PRIMARY KEY,
+  owner text NOT NULL,
+  acquired_at timestamptz NOT NULL DEFAULT now(),
+  expires_at timestamptz NOT NULL
+);
+
+-- ZIP -> county/state resolution cache (upstream geo lookups are slow and rarely change)
+CREATE TABLE IF NOT EXISTS zip_geo (
+  zip_code text PRIMARY KEY,
+  place text,
+  state_abbr text NOT NULL,
+  state_name text NOT NULL,
+  latitude double precision,
+  longitude double precision,
+  county_name text,
+  county_fips text NOT NULL,
+  resolved_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- cli_refresh_requested checkpoints (resumable nightly runs)
+CREATE TABLE IF NOT EXISTS refresh_runs (
+  id bigserial PRIMARY KEY,
+  started_at timestamptz NOT NULL DEFAULT now(),
+  finished_at timestamptz,
+  status text NOT NULL DEFAULT 'running',
+  days integer NOT NULL,
+  force boolean NOT NULL DEFAULT false,
+  total integer NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS refresh_run_items (
+  run_id bigint NOT NULL REFERENCES refresh_runs(id) ON DELETE CASCADE,
+  zip_code text NOT NULL,
+  seq integer NOT NULL,
+  status text NOT NULL DEFAULT 'pending',
+  refreshed boolean NOT NULL DEFAULT false,
+  error text,
+  finished_at timestamptz,
+  PRIMARY KEY (run_id, zip_code)
+);
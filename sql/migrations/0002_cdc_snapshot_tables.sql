@@ -0,0 +1,54 @@
+-- Per-module snapshot tables written by the uvceed_alerts CLIs (--save).
+-- The modules still carry this DDL for standalone use but run it at most once per process.
+CREATE TABLE IF NOT EXISTS nssp_ed_visits_snapshots (
+  id BIGSERIAL PRIMARY KEY,
+  zip_code TEXT NOT NULL,
+  state_abbr TEXT NOT NULL,
+  pathogen TEXT NOT NULL,
+  lookback_weeks INT NOT NULL,
+  generated_at TIMESTAMPTZ NOT NULL,
+  payload JSONB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS nssp_ed_trajectories_snapshots (
+  id bigserial PRIMARY KEY,
+  zip_code text NOT NULL,
+  state_abbr text NOT NULL,
+  pathogen text NOT NULL,
+  weeks_requested int NOT NULL,
+  generated_at timestamptz NOT NULL,
+  payload jsonb NOT NULL,
+  UNIQUE(zip_code, state_abbr, pathogen, weeks_requested, generated_at)
+);
+
+CREATE TABLE IF NOT EXISTS nssp_ed_county_snapshots (
+  id bigserial PRIMARY KEY,
+  county_fips text NOT NULL,
+  state_abbr text NOT NULL,
+  pathogen text NOT NULL,
+  weeks_requested int NOT NULL,
+  generated_at timestamptz NOT NULL,
+  payload jsonb NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_nssp_ed_county_snapshots_fips_time
+  ON nssp_ed_county_snapshots(county_fips, pathogen, generated_at DESC);
+
+CREATE TABLE IF NOT EXISTS fluview_severity_snapshots (
+  id bigserial PRIMARY KEY,
+  zip_code text NOT NULL,
+  state_abbr text NOT NULL,
+  weeks_requested int NOT NULL,
+  generated_at timestamptz NOT NULL,
+  payload jsonb NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS fluview_ilinet_snapshots (
+  id bigserial PRIMARY KEY,
+  zip_code text NOT NULL,
+  state_abbr text NOT NULL,
+  lookback_weeks int NOT NULL,
+  weeks_requested int NOT NULL,
+  generated_at timestamptz NOT NULL,
+  payload jsonb NOT NULL
+);
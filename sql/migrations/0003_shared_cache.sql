@@ -0,0 +1,11 @@
+-- Key/value table for uvceed_alerts.shared_cache (UVCEED_CACHE_URL=db:// or a postgres URL).
+-- UNLOGGED: no WAL traffic, emptied after a crash -- acceptable for a cache.
+CREATE UNLOGGED TABLE IF NOT EXISTS shared_cache (
+  key text PRIMARY KEY,
+  value bytea NOT NULL,
+  expires_at timestamptz NOT NULL,
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_shared_cache_expires_at ON shared_cache(expires_at);
+CREATE INDEX IF NOT EXISTS idx_shared_cache_updated_at ON shared_cache(updated_at);
@@ -0,0 +1,12 @@
+-- refresh_jobs are deduplicated per (signal, geography) instead of per requesting ZIP:
+-- geo_key becomes "geo_level:geo_id" (as in refresh_leases) and zip_code is the ZIP
+-- the worker refreshes it through (the first one that enqueued it).
+ALTER TABLE refresh_jobs ADD COLUMN IF NOT EXISTS zip_code text;
+
+-- Rows enqueued before this migration are keyed by their ZIP
+UPDATE refresh_jobs
+SET zip_code = geo_key,
+    geo_key = 'zip:' || geo_key
+WHERE zip_code IS NULL;
+
+ALTER TABLE refresh_jobs ALTER COLUMN zip_code SET NOT NULL;
@@ -0,0 +1,8 @@
+-- cli_refresh_requested workers claim refresh_run_items one at a time (status
+-- 'running'), so two processes resuming the same run never refresh the same ZIP.
+-- claimed_at lets a later resume take back items orphaned by a process that died.
+ALTER TABLE refresh_run_items ADD COLUMN IF NOT EXISTS claimed_at timestamptz;
+
+CREATE INDEX IF NOT EXISTS refresh_run_items_open_idx
+  ON refresh_run_items (run_id, seq)
+  WHERE status IN ('pending', 'running');
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Bulk backfill of CDC Socrata datasets into Postgres via CSV + COPY.
+
+Instead of JSON -> Python dicts -> row-by-row INSERT, this module:
+- requests Socrata's CSV export for a projected column set (paged by :id)
+- streams the response bytes straight into `COPY ... FROM STDIN` on a text staging table
+- casts + swaps the staged rows into the typed target table in one transaction
+
+Python never materializes rows, so memory stays flat and a multi-million-row
+load takes roughly as long as the download.
+
+Targets:
+  wastewater -> cdc_wastewater_rows   (dataset j9g8-acpt)
+  nssp       -> cdc_nssp_ed_rows      (dataset rdmq-nq56)
+
+Usage:
+  python -m uvceed_alerts.bulk_load wastewater --since 2025-01-01
+  python -m uvceed_alerts.bulk_load nssp --since 2025-06-01 --page-size 50000
+  python -m uvceed_alerts.bulk_load wastewater --replace      # full reload (truncate + load)
+  python -m uvceed_alerts.bulk_load nssp --since 2025-06-01 --max-pages 2 --dry-run   # stage only
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from uvceed_alerts.config import CDC_APP_TOKEN
+from uvceed_alerts.db import connect
+
+SODA_BASE = "https://data.cdc.gov/resource"
+DEFAULT_PAGE_SIZE = 50000
+DEFAULT_TIMEOUT = 120
+READ_CHUNK = 1 << 16
+
+
+@dataclass(frozen=True)
+class BulkDataset:
+    name: str
+    dataset_id: str
+    table: str
+    columns: Tuple[Tuple[str, str], ...]  # (column, postgres type)
+    date_column: str
+
+
+DATASETS: Dict[str, BulkDataset] = {
+    "wastewater": BulkDataset(
+        name="wastewater",
+        dataset_id="j9g8-acpt",
+        table="cdc_wastewater_rows",
+        columns=(
+            ("sewershed_id", "text"),
+            ("sample_collect_date", "date"),
+            ("county_fips", "text"),
+            ("pcr_target", "text"),
+            ("pcr_target_avg_conc", "double precision"),
+            ("pcr_target_avg_conc_lin", "double precision"),
+        ),
+        date_column="sample_collect_date",
+    ),
+    "nssp": BulkDataset(
+        name="nssp",
+        dataset_id="rdmq-nq56",
+        table="cdc_nssp_ed_rows",
+        columns=(
+            ("week_end", "date"),
+            ("geography", "text"),
+            ("county", "text"),
+            ("fips", "text"),
+            ("percent_visits_covid", "double precision"),
+            ("percent_visits_influenza", "double precision"),
+            ("percent_visits_rsv", "double precision"),
+            ("ed_trends_covid", "text"),
+            ("ed_trends_influenza", "text"),
+            ("ed_trends_rsv", "text"),
+        ),
+        date_column="week_end",
+    ),
+}
+
+
+def _target_ddl(ds: BulkDataset) -> str:
+    cols = ",\n  ".join(f"{c} {t}" for c, t in ds.columns)
+    return f"""
+CREATE TABLE IF NOT EXISTS {ds.table} (
+  {cols},
+  loaded_at timestamptz NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS idx_{ds.table}_{ds.date_column}
+  ON {ds.table}({ds.date_column});
+"""
+
+
+class _StreamReader:
+    """File-like adapter: lets COPY pull decoded bytes straight off the HTTP socket."""
+
+    def __init__(self, resp: requests.Response):
+        self._raw = resp.raw
+        self.bytes_read = 0
+
+    def read(self, size: int = READ_CHUNK) -> bytes:
+        chunk = self._raw.read(size if size and size > 0 else READ_CHUNK, decode_content=True)
+        if chunk:
+            self.bytes_read += len(chunk)
+        return chunk or b""
+
+
+def _soql_since(since: str) -> str:
+    """Validate --since (a date or ISO datetime) as a SoQL floating timestamp literal.
+
+    It is pasted into $where, so anything that doesn't parse is rejected rather than quoted.
+    """
+    text = since.strip()
+    try:
+        if len(text) == 10:
+            value = dt.datetime.combine(dt.date.fromisoformat(text), dt.time())
+        else:
+            value = dt.datetime.fromisoformat(text[:-1] + "+00:00" if text.endswith("Z") else text)
+    except ValueError:
+        raise ValueError(f"--since must be a date (YYYY-MM-DD) or ISO datetime, got {since!r}") from None
+    if value.tzinfo is not None:
+        value = value.astimezone(dt.timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _csv_params(ds: BulkDataset, since: Optional[str], offset: int, page_size: int) -> Dict[str, Any]:
+    params: Dict[str, Any] = {
+        "$select": ",".join(c for c, _ in ds.columns),
+        "$order": ":id",
+        "$limit": page_size,
+        "$offset": offset,
+    }
+    if since:
+        params["$where"] = f"{ds.date_column} >= '{since}'"
+    return params
+
+
+def _copy_page(cur, ds: BulkDataset, staging: str, params: Dict[str, Any]) -> Tuple[int, int]:
+    """COPY one CSV page into staging. Returns (rows, bytes)."""
+    headers = {"Accept": "text/csv"}
+    if CDC_APP_TOKEN:
+        headers["X-App-Token"] = CDC_APP_TOKEN
+
+    url = f"{SODA_BASE}/{ds.dataset_id}.csv"
+    with requests.get(url, params=params, headers=headers, stream=True, timeout=DEFAULT_TIMEOUT) as r:
+        r.raise_for_status()
+        reader = _StreamReader(r)
+        cols = ",".join(c for c, _ in ds.columns)
+        cur.copy_expert(f"COPY {staging} ({cols}) FROM STDIN WITH (FORMAT csv, HEADER true)", reader, size=READ_CHUNK)
+
+    # COPY's own row count; counting newlines would miscount quoted fields that contain them
+    rows = cur.rowcount
+    if rows is None or rows < 0:
+        raise RuntimeError(f"COPY into {staging} did not report a row count")
+    return rows, reader.bytes_read
+
+
+def bulk_load(
+    ds: BulkDataset,
+    *,
+    since: Optional[str] = None,
+    replace: bool = False,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    max_pages: Optional[int] = None,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """Stream `ds` into Postgres. Returns a summary dict.
+
+    dry_run stages and type-checks the rows but leaves the target table untouched.
+    """
+    if not since and not replace:
+        raise ValueError("Refusing a full-table load without --replace (or pass --since).")
+    since = _soql_since(since) if since else None
+    if max_pages and not dry_run:
+        # Pages are ordered by :id, not date: a partial load can't be swapped in without
+        # deleting rows of the window that were never staged.
+        raise ValueError("--max-pages stages a partial window; use it with --dry-run.")
+
+    staging = f"_stg_{ds.table}"
+    started = time.monotonic()
+    total_rows = 0
+    total_bytes = 0
+    pages = 0
+
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(_target_ddl(ds))
+            # Text-only staging: no parsing in Python, no COPY failures on odd values.
+            text_cols = ", ".join(f"{c} text" for c, _ in ds.columns)
+            cur.execute(f"CREATE TEMP TABLE {staging} ({text_cols}) ON COMMIT DROP;")
+
+            offset = 0
+            while True:
+                rows, nbytes = _copy_page(cur, ds, staging, _csv_params(ds, since, offset, page_size))
+                pages += 1
+                total_rows += rows
+                total_bytes += nbytes
+                print(
+                    f"[bulk_load] {ds.name}: page={pages} rows={rows} total_rows={total_rows} "
+                    f"mb={total_bytes / 1e6:.1f} elapsed={time.monotonic() - started:.1f}s",
+                    file=sys.stderr,
+                )
+                if rows < page_size or (max_pages and pages >= max_pages):
+                    break
+                offset += page_size
+
+            cols = ", ".join(c for c, _ in ds.columns)
+            casts = ", ".join(f"NULLIF({c}, '')::{t}" for c, t in ds.columns)
+            if dry_run:
+                # Runs the casts the swap would, so bad values surface without touching the target
+                cur.execute(f"SELECT count(*) FROM (SELECT {casts} FROM {staging}) t;")
+                inserted = 0
+            else:
+                # Swap: replace the loaded window (or the whole table) atomically.
+                if replace and not since:
+                    cur.execute(f"TRUNCATE {ds.table};")
+                else:
+                    cur.execute(f"DELETE FROM {ds.table} WHERE {ds.date_column} >= %s;", (since,))
+                cur.execute(f"INSERT INTO {ds.table} ({cols}) SELECT {casts} FROM {staging};")
+                inserted = cur.rowcount
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    elapsed = time.monotonic() - started
+    return {
+        "dataset": ds.name,
+        "dataset_id": ds.dataset_id,
+        "table": ds.table,
+        "since": since,
+        "replace": replace,
+        "dry_run": dry_run,
+        "pages": pages,
+        "rows_streamed": total_rows,
+        "rows_inserted": inserted,
+        "bytes_streamed": total_bytes,
+        "elapsed_s": round(elapsed, 2),
+        "rows_per_s": round(total_rows / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Bulk-load CDC Socrata datasets into Postgres (CSV -> COPY).")
+    ap.add_argument("dataset", choices=sorted(DATASETS), help="which dataset to load")
+    ap.add_argument("--since", default=None, help="only rows on/after this date (YYYY-MM-DD); replaces that window")
+    ap.add_argument("--replace", action="store_true", help="full reload: truncate target and load everything")
+    ap.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="rows per CSV page (default 50000)")
+    ap.add_argument("--max-pages", type=int, default=None, help="stop after N pages (testing; requires --dry-run)")
+    ap.add_argument("--dry-run", action="store_true", help="stage and type-check rows, then roll back")
+    args = ap.parse_args(argv)
+
+    try:
+        summary = bulk_load(
+            DATASETS[args.dataset],
+            since=args.since,
+            replace=args.replace,
+            page_size=max(1, args.page_size),
+            max_pages=args.max_pages,
+            dry_run=args.dry_run,
+        )
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -27,6 +27,7 @@ from typing import Any, Dict, List, Optional, Tuple
 import requests
 from epiweeks import Week
 
+from uvceed_alerts import landing
 from uvceed_alerts.geo import zip_to_county
 
 
@@ -193,7 +194,9 @@ def _fetch_fluview(
                 raise RuntimeError(
                     f"Delphi fluview result={payload.get('result')} message={payload.get('message')}"
                 )
-            return payload.get("epidata", []) or []
+            epidata = payload.get("epidata", []) or []
+            landing.archive_fetch("delphi_fluview", region, epidata, params=params)
+            return epidata
         except Exception as e:
             last_err = e
             if attempt < retries:
@@ -357,6 +360,7 @@ CREATE TABLE IF NOT EXISTS fluview_ilinet_snapshots (
   payload jsonb NOT NULL
 );
 """
+_ddl_ready = False  # skip the DDL after the first successful save in this process
 
 def _db_connect():
     url = os.environ.get("DATABASE_URL", "").strip()
@@ -370,9 +374,11 @@ def _db_connect():
 
 
 def db_save_ilinet(payload: Dict[str, Any]) -> int:
+    global _ddl_ready
     with _db_connect() as conn:
         with conn.cursor() as cur:
-            cur.execute(DDL_ILINET)
+            if not _ddl_ready:
+                cur.execute(DDL_ILINET)
             cur.execute(
                 """
                 INSERT INTO fluview_ilinet_snapshots
@@ -392,22 +398,14 @@ def db_save_ilinet(payload: Dict[str, Any]) -> int:
             )
             new_id = int(cur.fetchone()[0])
             conn.commit()
+            _ddl_ready = True
             return new_id
 
-def main() -> int:
-    ap = argparse.ArgumentParser(description="CDC FluView / ILINet ingestion (state-level) for a ZIP code.")
-    ap.add_argument("zip_code", help="5-digit ZIP code")
-    ap.add_argument("--weeks", type=int, default=12, help="How many recent epiweeks to print (default: 12)")
-    ap.add_argument("--lookback-weeks", type=int, default=104, help="Lookback window for baselining (default: 104)")
-    ap.add_argument("--json", action="store_true", help="also print JSON payload")
-    ap.add_argument("--json-only", action="store_true", help="print JSON only (no human summary)")
-    ap.add_argument("--db", action="store_true", help="save JSON snapshot to Postgres via DATABASE_URL")
-    args = ap.parse_args()
-
+def _build_payload(zip_code: str, *, weeks: int, lookback_weeks: int) -> Tuple[Dict[str, Any], ILINetResult, Dict[str, Any]]:
     header, ilinet = build_ilinet_summary_for_zip(
-        zip_code=args.zip_code,
-        weeks=max(1, args.weeks),
-        lookback_weeks=max(12, args.lookback_weeks),
+        zip_code=zip_code,
+        weeks=weeks,
+        lookback_weeks=lookback_weeks,
     )
 
     generated_at = dt.datetime.now(dt.timezone.utc).isoformat()
@@ -417,7 +415,7 @@ def main() -> int:
         "generated_at": generated_at,
         "generated_date": str(date.today()),
         "source": "delphi_epidata_fluview",
-        "weeks_requested": args.weeks,
+        "weeks_requested": weeks,
         "results": {
             "region": ilinet.region,
             "metric": ilinet.metric,
@@ -433,6 +431,31 @@ def main() -> int:
         },
         "db": None,
     }
+    return header, ilinet, payload
+
+
+def build_payload(zip_code: str, *, weeks: int = 12, lookback_weeks: int = 104) -> Dict[str, Any]:
+    """Library API: the same dict `--json-only` prints (no DB write)."""
+    _, _, payload = _build_payload(zip_code, weeks=max(1, weeks), lookback_weeks=max(12, lookback_weeks))
+    return payload
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="CDC FluView / ILINet ingestion (state-level) for a ZIP code.")
+    ap.add_argument("zip_code", help="5-digit ZIP code")
+    ap.add_argument("--weeks", type=int, default=12, help="How many recent epiweeks to print (default: 12)")
+    ap.add_argument("--lookback-weeks", type=int, default=104, help="Lookback window for baselining (default: 104)")
+    ap.add_argument("--json", action="store_true", help="also print JSON payload")
+    ap.add_argument("--json-only", action="store_true", help="print JSON only (no human summary)")
+    ap.add_argument("--db", action="store_true", help="save JSON snapshot to Postgres via DATABASE_URL")
+    args = ap.parse_args()
+
+    header, ilinet, payload = _build_payload(
+        args.zip_code,
+        weeks=max(1, args.weeks),
+        lookback_weeks=max(12, args.lookback_weeks),
+    )
+    payload["weeks_requested"] = args.weeks
 
     if args.db:
         try:
@@ -28,6 +28,7 @@ import requests
 
 # IMPORTANT: your project currently uses zip_to_county (per your earlier smoke script).
 # We keep this import compatible with your repo.
+from uvceed_alerts import landing
 from uvceed_alerts.geo import zip_to_county  # returns GeoResult dataclass
 
 # Delphi Epidata FluView Clinical endpoint docs:
@@ -154,8 +155,14 @@ def fetch_fluview_clinical_percent_positive(state_abbr: str, weeks_lookback: int
     if data.get("result") != 1 or not data.get("epidata"):
         return []
 
+    landing.archive_fetch("delphi_fluview_clinical", region, data["epidata"], params=params)
+    return clinical_rows_from_epidata(data["epidata"], region)
+
+
+def clinical_rows_from_epidata(epidata: List[Dict[str, Any]], region: str) -> List[Dict[str, Any]]:
+    """Normalize raw Delphi fluview_clinical rows for one region (sorted by epiweek)."""
     out: List[Dict[str, Any]] = []
-    for row in data["epidata"]:
+    for row in epidata:
         if row.get("region") != region:
             continue
         out.append(
@@ -172,8 +179,18 @@ def fetch_fluview_clinical_percent_positive(state_abbr: str, weeks_lookback: int
 
 
 def build_lab_positivity_summary(state_abbr: str, weeks_lookback: int, recent_weeks: int) -> LabPositivitySummary:
-    region = state_abbr.lower()
     rows = fetch_fluview_clinical_percent_positive(state_abbr, weeks_lookback)
+    return lab_positivity_from_rows(state_abbr, rows, weeks_lookback, recent_weeks)
+
+
+def lab_positivity_from_rows(
+    state_abbr: str,
+    rows: List[Dict[str, Any]],
+    weeks_lookback: int,
+    recent_weeks: int,
+) -> LabPositivitySummary:
+    """Score normalized fluview_clinical rows (no network)."""
+    region = state_abbr.lower()
 
     series = [(r["epiweek"], r.get("percent_positive")) for r in rows if _is_finite(r.get("percent_positive"))]
     if not series:
@@ -258,6 +275,7 @@ CREATE TABLE IF NOT EXISTS fluview_severity_snapshots (
   payload jsonb NOT NULL
 );
 """
+_ddl_ready = False  # skip the DDL after the first successful save in this process
 
 def _db_connect():
     url = os.environ.get("DATABASE_URL", "").strip()
@@ -271,9 +289,11 @@ def _db_connect():
 
 
 def db_save_severity(payload: Dict[str, Any]) -> int:
+    global _ddl_ready
     with _db_connect() as conn:
         with conn.cursor() as cur:
-            cur.execute(DDL_SEVERITY)
+            if not _ddl_ready:
+                cur.execute(DDL_SEVERITY)
             cur.execute(
                 """
                 INSERT INTO fluview_severity_snapshots
@@ -292,8 +312,54 @@ def db_save_severity(payload: Dict[str, Any]) -> int:
             )
             new_id = int(cur.fetchone()[0])
             conn.commit()
+            _ddl_ready = True
             return new_id
 
+def _build_payload(
+    zip_code: str,
+    *,
+    weeks: int,
+    recent: int,
+) -> Tuple[Any, LabPositivitySummary, HospSummary, Dict[str, Any]]:
+    geo = zip_to_county(zip_code)
+
+    lab = build_lab_positivity_summary(geo.state_abbr, weeks, recent)
+    hosp = build_hospitalization_summary(geo.state_abbr, weeks)
+
+    generated_at = dt.datetime.now(dt.timezone.utc).isoformat()
+
+    payload = {
+        "zip_code": geo.zip_code,
+        "place": geo.place,
+        "state_name": geo.state_name,
+        "state_abbr": geo.state_abbr,
+        "county_name": geo.county_name,
+        "county_fips": geo.county_fips,
+        "generated_at": generated_at,
+        "generated_date": date.today().isoformat(),
+        "source": "delphi_epidata_fluview_clinical",
+        "weeks_requested": weeks,
+        "results": {
+            "lab_positivity": asdict(lab),
+            "hospitalizations": asdict(hosp),
+        },
+        "db": None,
+    }
+
+    return geo, lab, hosp, payload
+
+
+def build_payload(
+    zip_code: str,
+    *,
+    weeks: int = DEFAULT_WEEKS_LOOKBACK,
+    recent: int = DEFAULT_RECENT_WEEKS_SHOWN,
+) -> Dict[str, Any]:
+    """Library API: the same dict `--json-only` prints (no DB write)."""
+    _, _, _, payload = _build_payload(zip_code, weeks=weeks, recent=recent)
+    return payload
+
+
 def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("zip_code", help="5-digit ZIP code")
@@ -304,7 +370,7 @@ def main() -> int:
     ap.add_argument("--db", action="store_true", help="save JSON snapshot to Postgres via DATABASE_URL")
     args = ap.parse_args()
 
-    geo = zip_to_county(args.zip_code)
+    geo, lab, hosp, payload = _build_payload(args.zip_code, weeks=args.weeks, recent=args.recent)
 
     print(f"ZIP: {geo.zip_code} -> {geo.place}, {geo.state_name} ({geo.state_abbr})")
     print(f"County: {geo.county_name} | FIPS: {geo.county_fips}")
@@ -312,9 +378,6 @@ def main() -> int:
     print("CDC FluView “Severity” (state-level)")
     print("")
 
-    lab = build_lab_positivity_summary(geo.state_abbr, args.weeks, args.recent)
-    hosp = build_hospitalization_summary(geo.state_abbr, args.weeks)
-
     print("Lab positivity (clinical labs)")
     print(f"Region: {geo.state_abbr} (state-level)")
     print("Metric used: percent_positive")
@@ -341,26 +404,6 @@ def main() -> int:
         print(f"Note: {hosp.note}")
     print("")
 
-    generated_at = dt.datetime.now(dt.timezone.utc).isoformat()
-
-    payload = {
-        "zip_code": geo.zip_code,
-        "place": geo.place,
-        "state_name": geo.state_name,
-        "state_abbr": geo.state_abbr,
-        "county_name": geo.county_name,
-        "county_fips": geo.county_fips,
-        "generated_at": generated_at,
-        "generated_date": date.today().isoformat(),
-        "source": "delphi_epidata_fluview_clinical",
-        "weeks_requested": args.weeks,
-        "results": {
-            "lab_positivity": asdict(lab),
-            "hospitalizations": asdict(hosp),
-        },
-        "db": None,
-    }
-
     if args.db:
         try:
             snapshot_id = db_save_severity(payload)
@@ -16,10 +16,14 @@ This module:
 - Computes last3 / prev3 medians + simple risk/trend/confidence
 - Prints human-readable output (default) or JSON (--json)
 - Provides --describe to help validate columns/coverage
+- County mode (--granularity county): one state-wide pull, every county's series
+  computed in a single pass and keyed by county FIPS (rdmq-nq56 `fips` column)
 
 Usage:
   python -m uvceed_alerts.cdc_nssp_ed_trajectories 60614 --pathogen flu --weeks 16
   python -m uvceed_alerts.cdc_nssp_ed_trajectories 60614 --pathogen combined --weeks 16 --json
+  python -m uvceed_alerts.cdc_nssp_ed_trajectories 60614 --granularity county --json
+  python -m uvceed_alerts.cdc_nssp_ed_trajectories --county-all --state IL --db
   python -m uvceed_alerts.cdc_nssp_ed_trajectories --describe --state IL
 """
 
@@ -30,7 +34,9 @@ import json
 import os
 import statistics
 import sys
+import threading
 import time
+from concurrent.futures import Future
 from dataclasses import asdict
 import datetime as dt
 from datetime import date, datetime, timedelta, timezone
@@ -38,8 +44,9 @@ from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 
+from uvceed_alerts import coverage, freshness, landing
 from uvceed_alerts.config import SOCRATA_APP_TOKEN
-from uvceed_alerts.geo import zip_to_county  # returns GeoResult dataclass
+from uvceed_alerts.geo import GeoResult, zip_to_county  # returns GeoResult dataclass
 
 
 # ------------------------------------------------------------
@@ -211,8 +218,22 @@ def _socrata_get_with_retries(
 ) -> List[Dict[str, Any]]:
     """
     Socrata can throw occasional 500s / coordinator hiccups.
-    We'll retry with small backoff.
+    We'll retry with small backoff. Responses are shared per dataset version
+    (freshness.versioned_fetch).
     """
+    return freshness.versioned_fetch(
+        f"socrata:{dataset_id}",
+        params,
+        lambda: _socrata_get_uncached(dataset_id, params, max_attempts, sleep_base),
+    )
+
+
+def _socrata_get_uncached(
+    dataset_id: str,
+    params: Dict[str, str],
+    max_attempts: int,
+    sleep_base: float,
+) -> List[Dict[str, Any]]:
     url = f"{SOCRATA_BASE}/{dataset_id}.json"
     headers = {"Accept": "application/json"}
     if SOCRATA_APP_TOKEN:
@@ -258,22 +279,9 @@ def _compute_series_from_rows(
         if "week_end" not in row:
             continue
         wk = _parse_week_end(row["week_end"])
-
-        if pathogen == "combined":
-            c = _to_float(row.get("percent_visits_covid"))
-            f = _to_float(row.get("percent_visits_influenza"))
-            r = _to_float(row.get("percent_visits_rsv"))
-            if c is None and f is None and r is None:
-                continue
-            val = (c or 0.0) + (f or 0.0) + (r or 0.0)
-        else:
-            field = PATHOGEN_TO_FIELD.get(pathogen)
-            if not field:
-                continue
-            val = _to_float(row.get(field))
-            if val is None:
-                continue
-
+        val = _row_value(row, pathogen)
+        if val is None:
+            continue
         buckets.setdefault(wk, []).append(val)
 
     series: List[Tuple[date, float]] = []
@@ -287,6 +295,59 @@ def _compute_series_from_rows(
     return series
 
 
+def _row_value(row: Dict[str, Any], pathogen: str) -> Optional[float]:
+    if pathogen == "combined":
+        c = _to_float(row.get("percent_visits_covid"))
+        f = _to_float(row.get("percent_visits_influenza"))
+        r = _to_float(row.get("percent_visits_rsv"))
+        if c is None and f is None and r is None:
+            return None
+        return (c or 0.0) + (f or 0.0) + (r or 0.0)
+    field = PATHOGEN_TO_FIELD.get(pathogen)
+    if not field:
+        return None
+    return _to_float(row.get(field))
+
+
+def _normalize_fips(v: Any) -> Optional[str]:
+    s = str(v or "").strip()
+    if not s.isdigit():
+        return None
+    return s.zfill(5)
+
+
+def _compute_county_series_from_rows(
+    rows: List[Dict[str, Any]],
+    pathogen: str,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Convert state-wide Socrata rows -> {county_fips: {"county": name, "series": [(week_end, value)]}}
+    in one pass. Duplicate rows for the same county/week are median'd.
+    """
+    buckets: Dict[str, Dict[date, List[float]]] = {}
+    names: Dict[str, str] = {}
+
+    for row in rows:
+        if "week_end" not in row:
+            continue
+        fips = _normalize_fips(row.get("fips"))
+        if not fips:
+            continue
+        val = _row_value(row, pathogen)
+        if val is None:
+            continue
+        wk = _parse_week_end(row["week_end"])
+        buckets.setdefault(fips, {}).setdefault(wk, []).append(val)
+        names.setdefault(fips, str(row.get("county") or "").strip())
+
+    out: Dict[str, Dict[str, Any]] = {}
+    for fips, by_week in buckets.items():
+        series = [(wk, med) for wk, vals in by_week.items() if (med := _median(vals)) is not None]
+        series.sort(key=lambda t: t[0], reverse=True)
+        out[fips] = {"county": names.get(fips) or "", "series": series}
+    return out
+
+
 # ------------------------------------------------------------
 # Core logic
 # ------------------------------------------------------------
@@ -316,6 +377,9 @@ def fetch_state_weekly_percent_visits(
         "percent_visits_influenza,percent_visits_rsv"
     )
 
+    # Coverage catalog: skip the strict query when we already know there are no rollup rows
+    has_rollup = coverage.nssp_has_state_rollup(geography)
+
     # 1) strict rollup
     where_strict = (
         f"geography = '{geography}' "
@@ -328,11 +392,14 @@ def fetch_state_weekly_percent_visits(
         "$order": "week_end DESC",
         "$limit": str(max(weeks * 2, 40)),
     }
-    rows = _socrata_get_with_retries(DATASET_ID, params_strict)
-    series = _compute_series_from_rows(rows, pathogen)
+    rows: Optional[List[Dict[str, Any]]] = None
+    if has_rollup is not False:
+        rows = _socrata_get_with_retries(DATASET_ID, params_strict)
+        landing.archive_fetch(DATASET_ID, geography, rows, key="strict", params=params_strict)
 
-    if len(series) >= 2:
-        return geography, series[:weeks], None
+        series, note = series_from_state_rows(rows, None, weeks, pathogen)
+        if note is None:
+            return geography, series, note
 
     # 2) fallback: all rows in geography; aggregate by week_end
     where_fallback = (
@@ -346,16 +413,36 @@ def fetch_state_weekly_percent_visits(
         "$limit": str(max(weeks * 250, 2000)),  # plenty; many rows per week
     }
     rows_fb = _socrata_get_with_retries(DATASET_ID, params_fb)
-    series_fb = _compute_series_from_rows(rows_fb, pathogen)
+    landing.archive_fetch(DATASET_ID, geography, rows_fb, key="fallback", params=params_fb)
+
+    series, note = series_from_state_rows(rows, rows_fb, weeks, pathogen)
+    return geography, series, note
+
 
+def series_from_state_rows(
+    strict_rows: Optional[List[Dict[str, Any]]],
+    fallback_rows: Optional[List[Dict[str, Any]]],
+    weeks: int,
+    pathogen: str,
+) -> Tuple[List[Tuple[date, float]], Optional[str]]:
+    """
+    Apply the strict-rollup-then-fallback rule to already-fetched rows (no network).
+    Returns: (series, note)
+    """
+    if strict_rows:
+        series = _compute_series_from_rows(strict_rows, pathogen)
+        if len(series) >= 2:
+            return series[:weeks], None
+
+    series_fb = _compute_series_from_rows(fallback_rows or [], pathogen)
     if series_fb:
         note = (
             "State rollup rows (county='All') were missing or sparse; "
             "used median rollup across geography rows per week_end."
         )
-        return geography, series_fb[:weeks], note
+        return series_fb[:weeks], note
 
-    return geography, [], "no ED-visit % data returned for this state / window (possible dataset coverage gap)"
+    return [], "no ED-visit % data returned for this state / window (possible dataset coverage gap)"
 
 
 def summarize_series(
@@ -394,26 +481,13 @@ def summarize_series(
     }
 
 
-def build_nssp_ed_trajectories_for_zip(
-    zip_code: str,
+def result_from_series(
+    region: str,
+    series: List[Tuple[date, float]],
     pathogen: str,
     weeks: int,
-) -> Tuple[str, Dict[str, Any]]:
-    """
-    Returns:
-      header_text, result_dict
-    """
-    geo = zip_to_county(zip_code)
-    state_abbr = getattr(geo, "state_abbr", "").upper()
-    state_name = getattr(geo, "state_name", _state_name_from_abbr(state_abbr))
-
-    geography_used, series, fetch_note = fetch_state_weekly_percent_visits(
-        state_abbr=state_abbr,
-        state_name=state_name,
-        weeks=weeks,
-        pathogen=pathogen,
-    )
-
+    fetch_note: Optional[str] = None,
+) -> Dict[str, Any]:
     summary = summarize_series(series, pathogen)
     if fetch_note:
         # combine notes
@@ -424,8 +498,8 @@ def build_nssp_ed_trajectories_for_zip(
 
     recent = [{"week_end": d.isoformat(), "value": v} for d, v in series]
 
-    result = {
-        "region": f"{state_abbr} (geography='{geography_used}')",
+    return {
+        "region": region,
         "pathogen": pathogen,
         "metric": summary["metric"],
         "lookback_weeks": weeks,
@@ -439,6 +513,177 @@ def build_nssp_ed_trajectories_for_zip(
         "recent": recent,
     }
 
+
+# (state_name, weeks) -> (fetched_at monotonic, rows); shared by every county/ZIP in a state
+_STATE_COUNTY_ROWS_CACHE: Dict[Tuple[str, int], Tuple[float, List[Dict[str, Any]]]] = {}
+# (state_name, weeks) -> pull in progress; concurrent callers wait on it instead of pulling again
+_STATE_COUNTY_ROWS_INFLIGHT: Dict[Tuple[str, int], Future] = {}
+_STATE_COUNTY_ROWS_LOCK = threading.Lock()
+STATE_COUNTY_ROWS_CACHE_SECONDS = 600
+
+
+def fetch_state_county_rows(state_name: str, weeks: int) -> List[Dict[str, Any]]:
+    """
+    One state-wide pull of per-county rows (county != 'All') for the lookback window.
+    Cached briefly in-process and single-flight per (state, weeks), so every ZIP/county
+    in the state -- planner, refresh and API threads alike -- reuses the same fetch.
+    """
+    key = (state_name.strip(), weeks)
+    with _STATE_COUNTY_ROWS_LOCK:
+        hit = _STATE_COUNTY_ROWS_CACHE.get(key)
+        if hit and time.monotonic() - hit[0] < STATE_COUNTY_ROWS_CACHE_SECONDS:
+            return hit[1]
+        fut = _STATE_COUNTY_ROWS_INFLIGHT.get(key)
+        joined = fut is not None
+        if not joined:
+            fut = Future()
+            fut.set_running_or_notify_cancel()
+            _STATE_COUNTY_ROWS_INFLIGHT[key] = fut
+    if joined:
+        return fut.result()
+
+    try:
+        rows = _pull_state_county_rows(key[0], weeks)
+    except BaseException as e:
+        with _STATE_COUNTY_ROWS_LOCK:
+            del _STATE_COUNTY_ROWS_INFLIGHT[key]
+        fut.set_exception(e)
+        raise
+    with _STATE_COUNTY_ROWS_LOCK:
+        _STATE_COUNTY_ROWS_CACHE[key] = (time.monotonic(), rows)
+        del _STATE_COUNTY_ROWS_INFLIGHT[key]
+    fut.set_result(rows)
+    return rows
+
+
+def _pull_state_county_rows(geography: str, weeks: int) -> List[Dict[str, Any]]:
+    start_date = (date.today() - timedelta(days=(weeks + 8) * 7)).isoformat()
+    params = {
+        "$select": (
+            "week_end,geography,county,fips,percent_visits_covid,"
+            "percent_visits_influenza,percent_visits_rsv"
+        ),
+        "$where": (
+            f"geography = '{geography}' "
+            f"AND county != 'All' "
+            f"AND week_end >= '{start_date}T00:00:00.000'"
+        ),
+        "$order": "week_end DESC",
+        # ~254 counties max per state (TX) per week
+        "$limit": str(max((weeks + 8) * 300, 2000)),
+    }
+    rows = _socrata_get_with_retries(DATASET_ID, params)
+    landing.archive_fetch(DATASET_ID, geography, rows, key="county", params=params)
+    return rows
+
+
+def build_county_trajectories_for_state(
+    state_abbr: str,
+    pathogen: str,
+    weeks: int,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Returns {county_fips: result_dict} for every county in the state,
+    from a single upstream fetch.
+    """
+    state_abbr = (state_abbr or "").strip().upper()
+    rows = fetch_state_county_rows(_state_name_from_abbr(state_abbr), weeks)
+    return county_results_from_rows(state_abbr, rows, pathogen, weeks)
+
+
+def county_results_from_rows(
+    state_abbr: str,
+    rows: List[Dict[str, Any]],
+    pathogen: str,
+    weeks: int,
+) -> Dict[str, Dict[str, Any]]:
+    """Score a state-wide county pull into {county_fips: result_dict} (no network)."""
+    by_county = _compute_county_series_from_rows(rows, pathogen)
+
+    out: Dict[str, Dict[str, Any]] = {}
+    for fips, item in sorted(by_county.items()):
+        result = result_from_series(
+            region=f"{state_abbr} county='{item['county']}' (fips={fips})",
+            series=item["series"][:weeks],
+            pathogen=pathogen,
+            weeks=weeks,
+        )
+        result["geo_level"] = "county"
+        result["county_fips"] = fips
+        result["county"] = item["county"]
+        out[fips] = result
+    return out
+
+
+def county_result_from_rows(
+    state_abbr: str,
+    county_fips: str,
+    rows: List[Dict[str, Any]],
+    pathogen: str,
+    weeks: int,
+) -> Dict[str, Any]:
+    """
+    One county's result from a state-wide county pull (no network). A county without
+    rows gets the median across all of the state's county rows per week_end instead
+    (geo_level "state"), the same rollup the state series uses when county='All' rows
+    are missing.
+    """
+    counties = county_results_from_rows(state_abbr, rows, pathogen, weeks)
+    result = counties.get(_normalize_fips(county_fips) or "")
+    if result is not None:
+        return result
+    result = result_from_series(
+        region=f"{state_abbr} (median across county rows)",
+        series=_compute_series_from_rows(rows, pathogen)[:weeks],
+        pathogen=pathogen,
+        weeks=weeks,
+        fetch_note=(
+            f"No county-level rows for FIPS {county_fips}; "
+            "used the median across the state's county rows per week_end."
+        ),
+    )
+    result["geo_level"] = "state"
+    return result
+
+
+def build_nssp_ed_trajectories_for_zip(
+    zip_code: str,
+    pathogen: str,
+    weeks: int,
+    granularity: str = "state",
+    geo: Optional[GeoResult] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Returns:
+      header_text, result_dict
+
+    granularity="county" answers from the state-wide county pull
+    (county_result_from_rows, including its fallback for a county without rows).
+    """
+    geo = geo or zip_to_county(zip_code)
+    state_abbr = getattr(geo, "state_abbr", "").upper()
+    state_name = getattr(geo, "state_name", _state_name_from_abbr(state_abbr))
+
+    if granularity == "county":
+        rows = fetch_state_county_rows(state_name, weeks)
+        result = county_result_from_rows(state_abbr, geo.county_fips, rows, pathogen, weeks)
+    else:
+        geography_used, series, fetch_note = fetch_state_weekly_percent_visits(
+            state_abbr=state_abbr,
+            state_name=state_name,
+            weeks=weeks,
+            pathogen=pathogen,
+        )
+        result = result_from_series(
+            region=f"{state_abbr} (geography='{geography_used}')",
+            series=series,
+            pathogen=pathogen,
+            weeks=weeks,
+            fetch_note=fetch_note,
+        )
+        result["geo_level"] = "state"
+
+    recent = result["recent"]
     header = (
         f"ZIP: {zip_code} -> {geo.place}, {geo.state_name} ({geo.state_abbr})\n"
         f"County: {geo.county_name} | FIPS: {geo.county_fips}\n\n"
@@ -537,6 +782,24 @@ CREATE TABLE IF NOT EXISTS nssp_ed_trajectories_snapshots (
   UNIQUE(zip_code, state_abbr, pathogen, weeks_requested, generated_at)
 );
 """
+# Each DDL block runs on the first save of a process only (sql/migrations creates these on deploy)
+_traj_ddl_ready = False
+
+DDL_COUNTY = r"""
+CREATE TABLE IF NOT EXISTS nssp_ed_county_snapshots (
+  id bigserial PRIMARY KEY,
+  county_fips text NOT NULL,
+  state_abbr text NOT NULL,
+  pathogen text NOT NULL,
+  weeks_requested int NOT NULL,
+  generated_at timestamptz NOT NULL,
+  payload jsonb NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_nssp_ed_county_snapshots_fips_time
+  ON nssp_ed_county_snapshots(county_fips, pathogen, generated_at DESC);
+"""
+_county_ddl_ready = False
 
 def _db_connect():
     url = os.environ.get("DATABASE_URL", "").strip()
@@ -550,9 +813,11 @@ def _db_connect():
 
 
 def db_save_trajectories(payload: Dict[str, Any]) -> int:
+    global _traj_ddl_ready
     with _db_connect() as conn:
         with conn.cursor() as cur:
-            cur.execute(DDL_TRAJ)
+            if not _traj_ddl_ready:
+                cur.execute(DDL_TRAJ)
             cur.execute(
                 """
                 INSERT INTO nssp_ed_trajectories_snapshots
@@ -572,12 +837,168 @@ def db_save_trajectories(payload: Dict[str, Any]) -> int:
             )
             new_id = int(cur.fetchone()[0])
             conn.commit()
+            _traj_ddl_ready = True
             return new_id
 
+
+def db_save_county_trajectories(
+    state_abbr: str,
+    pathogen: str,
+    weeks: int,
+    generated_at: str,
+    results: Dict[str, Dict[str, Any]],
+) -> int:
+    """Insert one row per county (single round trip). Returns rows inserted."""
+    global _county_ddl_ready
+    if not results:
+        return 0
+    from psycopg2.extras import execute_values  # type: ignore
+
+    rows = [
+        (fips, state_abbr, pathogen, weeks, generated_at, json.dumps(result, default=str))
+        for fips, result in results.items()
+    ]
+    with _db_connect() as conn:
+        with conn.cursor() as cur:
+            if not _county_ddl_ready:
+                cur.execute(DDL_COUNTY)
+            execute_values(
+                cur,
+                """
+                INSERT INTO nssp_ed_county_snapshots
+                  (county_fips, state_abbr, pathogen, weeks_requested, generated_at, payload)
+                VALUES %s
+                """,
+                rows,
+            )
+            conn.commit()
+            _county_ddl_ready = True
+    return len(rows)
+
+# ------------------------------------------------------------
+# Library API
+# ------------------------------------------------------------
+
+def _build_header_and_payload(
+    zip_code: str,
+    *,
+    pathogen: str,
+    weeks: int,
+    granularity: str,
+) -> Tuple[str, Dict[str, Any]]:
+    geo = zip_to_county(zip_code)
+    header, result = build_nssp_ed_trajectories_for_zip(
+        zip_code=zip_code,
+        pathogen=pathogen,
+        weeks=weeks,
+        granularity=granularity,
+        geo=geo,
+    )
+    return header, _zip_payload(zip_code, geo, result, pathogen=pathogen, weeks=weeks)
+
+
+def _zip_payload(zip_code: str, geo: Any, result: Dict[str, Any], *, pathogen: str, weeks: int) -> Dict[str, Any]:
+    return {
+        "zip_code": zip_code,
+        "place": geo.place,
+        "state_name": geo.state_name,
+        "state_abbr": geo.state_abbr,
+        "county_name": geo.county_name,
+        "county_fips": geo.county_fips,
+        "generated_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+        "generated_date": date.today().isoformat(),
+        "source": "cdc_socrata_nssp_ed_trajectories_numeric",
+        "dataset_id": DATASET_ID,
+        "weeks_requested": weeks,
+        "pathogen": pathogen,
+        "granularity": result.get("geo_level", "state"),
+        "results": result,
+        "db": None,
+    }
+
+
+def county_payload_from_rows(
+    zip_code: str,
+    geo: Any,
+    rows: List[Dict[str, Any]],
+    *,
+    pathogen: str,
+    weeks: int,
+) -> Dict[str, Any]:
+    """
+    County-granularity payload for a ZIP from an already-fetched fetch_state_county_rows
+    pull (no network; see county_result_from_rows for the no-rows fallback).
+    """
+    state_abbr = (geo.state_abbr or "").strip().upper()
+    result = county_result_from_rows(state_abbr, geo.county_fips, rows, pathogen, weeks)
+    return _zip_payload(zip_code, geo, result, pathogen=pathogen, weeks=weeks)
+
+
+def build_payload(
+    zip_code: str,
+    *,
+    pathogen: str = "combined",
+    weeks: int = 16,
+    granularity: str = "state",
+) -> Dict[str, Any]:
+    """Library API: the same dict `--json-only` prints (no DB write)."""
+    _, payload = _build_header_and_payload(zip_code, pathogen=pathogen, weeks=weeks, granularity=granularity)
+    return payload
+
+
+def build_county_payload(zip_code: str, *, pathogen: str = "combined", weeks: int = 16) -> Dict[str, Any]:
+    """Library API: county-granularity payload for a ZIP from the (cached) state-wide county pull."""
+    geo = zip_to_county(zip_code)
+    rows = fetch_state_county_rows(geo.state_name, weeks)
+    return county_payload_from_rows(zip_code, geo, rows, pathogen=pathogen, weeks=weeks)
+
+
 # ------------------------------------------------------------
 # CLI
 # ------------------------------------------------------------
 
+def _main_county_all(args: argparse.Namespace) -> int:
+    state_abbr = args.state.strip().upper()
+    generated_at = dt.datetime.now(dt.timezone.utc).isoformat()
+    counties = build_county_trajectories_for_state(state_abbr, args.pathogen, args.weeks)
+
+    payload: Dict[str, Any] = {
+        "state_abbr": state_abbr,
+        "state_name": _state_name_from_abbr(state_abbr),
+        "generated_at": generated_at,
+        "source": "cdc_socrata_nssp_ed_trajectories_numeric",
+        "dataset_id": DATASET_ID,
+        "weeks_requested": args.weeks,
+        "pathogen": args.pathogen,
+        "granularity": "county",
+        "counties": counties,
+        "db": None,
+    }
+
+    if args.db:
+        try:
+            n = db_save_county_trajectories(state_abbr, args.pathogen, args.weeks, generated_at, counties)
+            payload["db"] = {"rows_inserted": n}
+        except Exception as e:
+            payload["db"] = {"error": f"DB save failed: {e}"}
+
+    if args.json_only:
+        print(json.dumps(payload, indent=2, default=str))
+        return 0
+
+    print(f"CDC NSSP ED Visit Trajectories — county level ({state_abbr}, {len(counties)} counties, one fetch)")
+    print(f"Dataset: {DATASET_ID} | Pathogen: {args.pathogen} | Lookback: {args.weeks} weeks\n")
+    for fips, r in counties.items():
+        print(f"- {fips} {r['county']}: risk={r['risk']} trend={r['trend']} confidence={r['confidence']} points={r['recent_points']}")
+    if payload["db"]:
+        print(f"\nDB: {payload['db']}")
+
+    if args.json:
+        print("\n" + json.dumps(payload, indent=2, default=str))
+
+    return 0
+
+
 def main(argv: Optional[List[str]] = None) -> int:
     parser = argparse.ArgumentParser(
         prog="uvceed_alerts.cdc_nssp_ed_trajectories",
@@ -615,6 +1036,18 @@ def main(argv: Optional[List[str]] = None) -> int:
         help="save JSON snapshot to Postgres via DATABASE_URL",
     )
 
+    parser.add_argument(
+        "--granularity",
+        default="state",
+        choices=["state", "county"],
+        help="Series geography for a ZIP: state rollup (default) or the ZIP's county",
+    )
+    parser.add_argument(
+        "--county-all",
+        action="store_true",
+        help="Compute every county in --state from one state-wide pull",
+    )
+
     parser.add_argument(
         "--describe",
         action="store_true",
@@ -623,7 +1056,7 @@ def main(argv: Optional[List[str]] = None) -> int:
     parser.add_argument(
         "--state",
         default=None,
-        help="State abbreviation for --describe (e.g. IL)",
+        help="State abbreviation for --describe / --county-all (e.g. IL)",
     )
 
     args = parser.parse_args(argv)
@@ -634,35 +1067,23 @@ def main(argv: Optional[List[str]] = None) -> int:
             return 2
         return describe_dataset(args.state)
 
+    if args.county_all:
+        if not args.state:
+            print("ERROR: --county-all requires --state (e.g. --county-all --state IL)", file=sys.stderr)
+            return 2
+        return _main_county_all(args)
+
     if not args.zip_code:
         print("ERROR: zip_code is required unless using --describe", file=sys.stderr)
         return 2
 
-    header, result = build_nssp_ed_trajectories_for_zip(
-        zip_code=args.zip_code,
+    header, payload = _build_header_and_payload(
+        args.zip_code,
         pathogen=args.pathogen,
         weeks=args.weeks,
+        granularity=args.granularity,
     )
-
-    geo = zip_to_county(args.zip_code)
-    generated_at = dt.datetime.now(dt.timezone.utc).isoformat()
-
-    payload = {
-        "zip_code": args.zip_code,
-        "place": geo.place,
-        "state_name": geo.state_name,
-        "state_abbr": geo.state_abbr,
-        "county_name": geo.county_name,
-        "county_fips": geo.county_fips,
-        "generated_at": generated_at,
-        "generated_date": date.today().isoformat(),
-        "source": "cdc_socrata_nssp_ed_trajectories_numeric",
-        "dataset_id": DATASET_ID,
-        "weeks_requested": args.weeks,
-        "pathogen": args.pathogen,
-        "results": result,
-        "db": None,
-    }
+    result = payload["results"]
 
     if args.db:
         try:
@@ -31,6 +31,7 @@ from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 
+from uvceed_alerts import coverage, freshness, landing
 from uvceed_alerts.geo import zip_to_county
 
 
@@ -87,6 +88,10 @@ def _escape_soql_literal(s: str) -> str:
 
 
 def _get_json(dataset_id: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return freshness.versioned_fetch(f"socrata:{dataset_id}", params, lambda: _fetch_json(dataset_id, params))
+
+
+def _fetch_json(dataset_id: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
     r = requests.get(
         _endpoint(dataset_id),
         params=params,
@@ -193,6 +198,11 @@ def _append_note(existing: Optional[str], extra: str) -> str:
 
 def _fetch_trend_rows_for_state(state_name: str, weeks: int) -> List[Dict[str, Any]]:
     state_name_escaped = _escape_soql_literal(state_name)
+    where = f"geography = '{state_name_escaped}'"
+    # Route to the state rollup rows when the coverage catalog says they exist;
+    # otherwise keep the original geography-only query.
+    if coverage.nssp_has_state_rollup(state_name):
+        where += " AND county = 'All'"
     params = {
         "$select": ",".join(
             [
@@ -203,12 +213,14 @@ def _fetch_trend_rows_for_state(state_name: str, weeks: int) -> List[Dict[str, A
                 "ed_trends_rsv",
             ]
         ),
-        "$where": f"geography = '{state_name_escaped}'",
+        "$where": where,
         "$order": "week_end DESC",
         "$limit": max(weeks, 4) * 4,  # cushion (dataset sometimes returns multiple rows per week)
         "$offset": 0,
     }
-    return _get_json(DATASET_ID, params)
+    rows = _get_json(DATASET_ID, params)
+    landing.archive_fetch(DATASET_ID, state_name, rows, key="trends", params=params)
+    return rows
 
 
 def _pick_metric(pathogen: str) -> Tuple[str, str]:
@@ -239,8 +251,12 @@ def _combined_from_three(covid: str, flu: str, rsv: str) -> str:
 
 def build_summary_for_zip(zip_code: str, *, pathogen: str, weeks: int) -> Summary:
     geo = zip_to_county(zip_code)
-
     rows = _fetch_trend_rows_for_state(geo.state_name, weeks=weeks)
+    return summarize_rows(zip_code, geo, rows, pathogen=pathogen, weeks=weeks)
+
+
+def summarize_rows(zip_code: str, geo: Any, rows: List[Dict[str, Any]], *, pathogen: str, weeks: int) -> Summary:
+    """Score already-fetched trend rows (newest first) into a Summary (no network)."""
     metric_field, pathogen_norm = _pick_metric(pathogen)
 
     # De-dupe by week_end: keep the first row we see for a given week_end after ordering DESC.
@@ -305,6 +321,24 @@ def build_summary_for_zip(zip_code: str, *, pathogen: str, weeks: int) -> Summar
     )
 
 
+def fetch_rows_for_state(state_name: str, *, weeks: int = 16) -> List[Dict[str, Any]]:
+    """Raw trend rows for one state (input to payload_from_rows)."""
+    return _fetch_trend_rows_for_state(state_name, weeks=weeks)
+
+
+def payload_from_rows(zip_code: str, geo: Any, rows: List[Dict[str, Any]], *, pathogen: str, weeks: int) -> Dict[str, Any]:
+    """JSON-safe payload for one ZIP from already-fetched state rows (no network)."""
+    summary = summarize_rows(zip_code, geo, rows, pathogen=pathogen, weeks=weeks)
+    return json.loads(json.dumps(asdict(summary), default=str))
+
+
+def build_payload(zip_code: str, *, pathogen: str = "combined", weeks: int = 16) -> Dict[str, Any]:
+    """Library API: the same JSON-safe dict `--json-only` prints (no DB write)."""
+    geo = zip_to_county(zip_code)
+    rows = fetch_rows_for_state(geo.state_name, weeks=weeks)
+    return payload_from_rows(zip_code, geo, rows, pathogen=pathogen, weeks=weeks)
+
+
 # ---------------------------
 # DB persistence (Postgres)
 # ---------------------------
@@ -320,6 +354,7 @@ CREATE TABLE IF NOT EXISTS nssp_ed_visits_snapshots (
   payload JSONB NOT NULL
 );
 """
+_ddl_ready = False  # DDL runs once per process; deployed DBs get it from sql/migrations
 
 
 def _db_connect():
@@ -340,12 +375,14 @@ def _db_connect():
 
 
 def db_save(summary: Summary) -> int:
+    global _ddl_ready
     payload = asdict(summary)
     payload["db"] = None  # don't store db field inside itself
 
     with _db_connect() as conn:
         with conn.cursor() as cur:
-            cur.execute(DDL)
+            if not _ddl_ready:
+                cur.execute(DDL)
             cur.execute(
                 """
                 INSERT INTO nssp_ed_visits_snapshots
@@ -365,6 +402,7 @@ def db_save(summary: Summary) -> int:
             )
             new_id = int(cur.fetchone()[0])
             conn.commit()
+            _ddl_ready = True
             return new_id
 
 
@@ -18,6 +18,7 @@ from typing import Dict, List, Optional
 import psycopg2
 import requests
 
+from uvceed_alerts import coverage, freshness, landing
 from uvceed_alerts.geo import lookup_zip
 from uvceed_alerts.config import (
     CDC_APP_TOKEN,
@@ -41,7 +42,7 @@ PATHOGENS = {
 # Utilities
 # -----------------------------
 
-def socrata_get(params: Dict) -> List[Dict]:
+def _socrata_get(params: Dict) -> List[Dict]:
     headers = {}
     if CDC_APP_TOKEN:
         headers["X-App-Token"] = CDC_APP_TOKEN
@@ -51,6 +52,11 @@ def socrata_get(params: Dict) -> List[Dict]:
     return r.json()
 
 
+def socrata_get(params: Dict) -> List[Dict]:
+    # Same query + same dataset version -> same rows, from whichever process fetched them first
+    return freshness.versioned_fetch(f"socrata:{DATASET_ID}", params, lambda: _socrata_get(params))
+
+
 def risk_from_value(val: Optional[float]) -> str:
     if val is None:
         return "unknown"
@@ -100,7 +106,9 @@ def fetch_wastewater(
         "$limit": 5000,
     }
 
-    return socrata_get(params)
+    rows = socrata_get(params)
+    landing.archive_fetch(DATASET_ID, county_fips, rows, key=pcr_target, params=params)
+    return rows
 
 
 def analyze_series(rows: List[Dict]) -> Dict:
@@ -112,6 +120,7 @@ def analyze_series(rows: List[Dict]) -> Dict:
             "risk": "unknown",
             "trend": "unknown",
             "confidence": "low",
+            "last_sample_date": None,
         }
 
     values = []
@@ -129,6 +138,7 @@ def analyze_series(rows: List[Dict]) -> Dict:
             "risk": "unknown",
             "trend": "unknown",
             "confidence": "low",
+            "last_sample_date": None,
         }
 
     last7 = values[-7:]
@@ -148,6 +158,79 @@ def analyze_series(rows: List[Dict]) -> Dict:
         "risk": risk,
         "trend": trend,
         "confidence": confidence,
+        "last_sample_date": max(str(r.get("sample_collect_date") or "")[:10] for r in rows) or None,
+    }
+
+
+def build_snapshot(zip_code: str, geo: Dict, rows_by_pathogen: Dict[str, List[Dict]]) -> Dict:
+    """Score already-fetched rows into the snapshot payload (no network).
+
+    rows_by_pathogen maps PATHOGENS keys -> raw Socrata rows, in PATHOGENS order.
+    """
+    results = []
+    scores = {}
+
+    for pathogen, rows in rows_by_pathogen.items():
+        pcr = PATHOGENS[pathogen]
+        analysis = analyze_series(rows)
+
+        risk_score = 0.6 if analysis["risk"] == "moderate" else 1.0 if analysis["risk"] == "high" else 0.0
+        trend_score = -0.25 if analysis["trend"] == "falling" else 0.25 if analysis["trend"] == "rising" else 0.0
+        conf_score = 1.0 if analysis["confidence"] == "high" else 0.5 if analysis["confidence"] == "moderate" else 0.25
+
+        composite = round((risk_score + conf_score + trend_score) / 2, 4)
+
+        scores[pathogen] = composite
+
+        results.append({
+            "pathogen": pathogen,
+            "dataset_id": DATASET_ID,
+            "pcr_target": pcr,
+            "window_days": DEFAULT_WINDOW_DAYS,
+            "daily_points": analysis["daily_points"],
+            "metric": "pcr_target_avg_conc_lin",
+            "last7_median": analysis["last7_median"],
+            "prev7_median": analysis["prev7_median"],
+            "last_sample_date": analysis["last_sample_date"],
+            "risk": analysis["risk"],
+            "trend": analysis["trend"],
+            "confidence": analysis["confidence"],
+            "note": None if rows else "no wastewater data returned",
+            "risk_score": risk_score,
+            "trend_score": trend_score,
+            "confidence_score": conf_score,
+            "composite_score": composite,
+        })
+
+    overall_score = round(max(scores.values()), 4)
+    overall_level = "high" if overall_score >= 0.75 else "moderate" if overall_score >= 0.4 else "low"
+    sample_dates = [r["last_sample_date"] for r in results if r["last_sample_date"]]
+
+    return {
+        "zip_code": zip_code,
+        "place": geo["place"],
+        "state_name": geo["state_name"],
+        "state_abbr": geo["state_abbr"],
+        "county_name": geo["county_name"],
+        "county_fips": geo["county_fips"],
+        "generated_at": dt.datetime.utcnow().isoformat(timespec="seconds"),
+        "days_requested": DEFAULT_WINDOW_DAYS,
+        "data_as_of": max(sample_dates) if sample_dates else None,
+        "results": results,
+        "rollup": {
+            "overall_level": overall_level,
+            "overall_trend": results[0]["trend"],
+            "overall_confidence": results[0]["confidence"],
+            "overall_score": overall_score,
+            "suggestion": (
+                "High respiratory activity detected. Increase disinfection frequency."
+                if overall_level == "high"
+                else "Moderate respiratory activity detected. Consider extra disinfection."
+                if overall_level == "moderate"
+                else "Low respiratory activity detected."
+            ),
+            "per_pathogen_scores": scores,
+        },
     }
 
 
@@ -203,96 +286,55 @@ def save_to_db(snapshot: Dict) -> int:
 
 
 # -----------------------------
-# CLI
+# Library API
 # -----------------------------
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("zip", help="ZIP code")
-    parser.add_argument("--json", action="store_true")
-    parser.add_argument("--db", action="store_true")
-    parser.add_argument("--all", action="store_true")
-    args = parser.parse_args()
-
-    geo = lookup_zip(args.zip)
-
-    results = []
-    scores = {}
+def fetch_rows_for_county(county_fips: str, *, all_pathogens: bool = False) -> Dict[str, List[Dict]]:
+    """Fetch raw rows per pathogen for one county (input to build_snapshot)."""
+    rows_by_pathogen: Dict[str, List[Dict]] = {}
 
     for pathogen, pcr in PATHOGENS.items():
-        rows = fetch_wastewater(
-            geo["county_fips"],
+        # Coverage catalog tells us which windows can return anything (all of them if unknown)
+        windows = coverage.wastewater_windows(
+            county_fips,
             pcr,
-            DEFAULT_WINDOW_DAYS,
+            [DEFAULT_WINDOW_DAYS, FALLBACK_WINDOW_DAYS],
         )
 
-        if not rows:
-            rows = fetch_wastewater(
-                geo["county_fips"],
-                pcr,
-                FALLBACK_WINDOW_DAYS,
-            )
+        rows = []
+        for window in windows:
+            rows = fetch_wastewater(county_fips, pcr, window)
+            if rows:
+                break
 
-        analysis = analyze_series(rows)
+        rows_by_pathogen[pathogen] = rows
 
-        risk_score = 0.6 if analysis["risk"] == "moderate" else 1.0 if analysis["risk"] == "high" else 0.0
-        trend_score = -0.25 if analysis["trend"] == "falling" else 0.25 if analysis["trend"] == "rising" else 0.0
-        conf_score = 1.0 if analysis["confidence"] == "high" else 0.5 if analysis["confidence"] == "moderate" else 0.25
+        if not all_pathogens:
+            break
 
-        composite = round((risk_score + conf_score + trend_score) / 2, 4)
+    return rows_by_pathogen
 
-        scores[pathogen] = composite
 
-        results.append({
-            "pathogen": pathogen,
-            "dataset_id": DATASET_ID,
-            "pcr_target": pcr,
-            "window_days": DEFAULT_WINDOW_DAYS,
-            "daily_points": analysis["daily_points"],
-            "metric": "pcr_target_avg_conc_lin",
-            "last7_median": analysis["last7_median"],
-            "prev7_median": analysis["prev7_median"],
-            "risk": analysis["risk"],
-            "trend": analysis["trend"],
-            "confidence": analysis["confidence"],
-            "note": None if rows else "no wastewater data returned",
-            "risk_score": risk_score,
-            "trend_score": trend_score,
-            "confidence_score": conf_score,
-            "composite_score": composite,
-        })
+def build_payload(zip_code: str, *, all_pathogens: bool = False) -> Dict:
+    """Resolve ZIP, fetch and score wastewater; returns the same dict `--json` prints."""
+    geo = lookup_zip(zip_code)
+    rows_by_pathogen = fetch_rows_for_county(geo["county_fips"], all_pathogens=all_pathogens)
+    return build_snapshot(zip_code, geo, rows_by_pathogen)
 
-        if not args.all:
-            break
 
-    overall_score = round(max(scores.values()), 4)
-    overall_level = "high" if overall_score >= 0.75 else "moderate" if overall_score >= 0.4 else "low"
+# -----------------------------
+# CLI
+# -----------------------------
 
-    snapshot = {
-        "zip_code": args.zip,
-        "place": geo["place"],
-        "state_name": geo["state_name"],
-        "state_abbr": geo["state_abbr"],
-        "county_name": geo["county_name"],
-        "county_fips": geo["county_fips"],
-        "generated_at": dt.datetime.utcnow().isoformat(timespec="seconds"),
-        "days_requested": DEFAULT_WINDOW_DAYS,
-        "results": results,
-        "rollup": {
-            "overall_level": overall_level,
-            "overall_trend": results[0]["trend"],
-            "overall_confidence": results[0]["confidence"],
-            "overall_score": overall_score,
-            "suggestion": (
-                "High respiratory activity detected. Increase disinfection frequency."
-                if overall_level == "high"
-                else "Moderate respiratory activity detected. Consider extra disinfection."
-                if overall_level == "moderate"
-                else "Low respiratory activity detected."
-            ),
-            "per_pathogen_scores": scores,
-        },
-    }
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("zip", help="ZIP code")
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--db", action="store_true")
+    parser.add_argument("--all", action="store_true")
+    args = parser.parse_args()
+
+    snapshot = build_payload(args.zip, all_pathogens=args.all)
 
     if args.db:
         db_id = save_to_db(snapshot)
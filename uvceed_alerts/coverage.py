@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Dataset coverage catalog: which geographies actually have data upstream.
+
+Built from cheap Socrata aggregate queries (`$select ... count(*)` + `$group`):
+- wastewater (j9g8-acpt): per county_fips x pcr_target -> first/last sample_collect_date, row count
+- NSSP (rdmq-nq56): per state geography -> whether county='All' rollup rows exist, last week_end
+
+Ingestion consults the catalog before fetching so it can skip doomed queries
+(counties with no wastewater sites) or route them (state rollup vs per-county
+rows). A missing or expired catalog means "unknown": callers fall back to
+their original query strategy.
+
+Usage:
+  python -m uvceed_alerts.coverage --rebuild
+  python -m uvceed_alerts.coverage --county 17031
+  python -m uvceed_alerts.coverage --state Illinois
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from uvceed_alerts.config import CDC_APP_TOKEN
+
+SODA_BASE = "https://data.cdc.gov/resource"
+WASTEWATER_DATASET_ID = "j9g8-acpt"
+NSSP_DATASET_ID = "rdmq-nq56"
+DEFAULT_TIMEOUT = 120
+
+CATALOG_PATH = Path(
+    os.getenv("UVCEED_COVERAGE_PATH", "").strip()
+    or Path(__file__).resolve().parents[1] / ".cache" / "coverage_catalog.json"
+)
+CATALOG_MAX_AGE_HOURS = float(os.getenv("UVCEED_COVERAGE_MAX_AGE_HOURS", "48"))
+
+_lock = threading.Lock()
+_loaded: Dict[str, Any] = {"mtime": None, "catalog": None}
+
+
+# ---------------------------
+# Build
+# ---------------------------
+
+def _soda_get(dataset_id: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    headers = {"Accept": "application/json"}
+    if CDC_APP_TOKEN:
+        headers["X-App-Token"] = CDC_APP_TOKEN
+    r = requests.get(f"{SODA_BASE}/{dataset_id}.json", params=params, headers=headers, timeout=DEFAULT_TIMEOUT)
+    r.raise_for_status()
+    data = r.json()
+    if not isinstance(data, list):
+        raise RuntimeError("Unexpected CDC response type (expected JSON list).")
+    return [x for x in data if isinstance(x, dict)]
+
+
+def _day(v: Any) -> Optional[str]:
+    s = str(v or "").strip()
+    return s[:10] if len(s) >= 10 else None
+
+
+def build_wastewater_coverage() -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """{county_fips: {pcr_target: {"first": date, "last": date, "rows": n}}}"""
+    rows = _soda_get(
+        WASTEWATER_DATASET_ID,
+        {
+            "$select": (
+                "county_fips,pcr_target,min(sample_collect_date) AS first_date,"
+                "max(sample_collect_date) AS last_date,count(*) AS n"
+            ),
+            "$group": "county_fips,pcr_target",
+            "$limit": 50000,
+        },
+    )
+    out: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for r in rows:
+        fips = str(r.get("county_fips") or "").strip()
+        target = str(r.get("pcr_target") or "").strip()
+        if not fips or not target:
+            continue
+        out.setdefault(fips, {})[target] = {
+            "first": _day(r.get("first_date")),
+            "last": _day(r.get("last_date")),
+            "rows": int(float(r.get("n") or 0)),
+        }
+    return out
+
+
+def build_nssp_rollup_coverage() -> Dict[str, Dict[str, Any]]:
+    """{geography: {"rollup_rows": n, "last_week_end": date}} for states with county='All' rows."""
+    rows = _soda_get(
+        NSSP_DATASET_ID,
+        {
+            "$select": "geography,count(*) AS n,max(week_end) AS last_week_end",
+            "$where": "county = 'All'",
+            "$group": "geography",
+            "$limit": 5000,
+        },
+    )
+    out: Dict[str, Dict[str, Any]] = {}
+    for r in rows:
+        geo = str(r.get("geography") or "").strip()
+        if not geo:
+            continue
+        out[geo] = {
+            "rollup_rows": int(float(r.get("n") or 0)),
+            "last_week_end": _day(r.get("last_week_end")),
+        }
+    return out
+
+
+def rebuild_catalog(path: Path = CATALOG_PATH) -> Dict[str, Any]:
+    catalog = {
+        "built_at": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+        "wastewater": build_wastewater_coverage(),
+        "nssp_rollups": build_nssp_rollup_coverage(),
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(catalog))
+    os.replace(tmp, path)  # atomic swap; readers never see a half-written file
+    return catalog
+
+
+# ---------------------------
+# Lookup
+# ---------------------------
+
+def load_catalog(path: Path = CATALOG_PATH) -> Optional[Dict[str, Any]]:
+    """Return the catalog if present and not expired; re-reads only when the file changes."""
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return None
+
+    with _lock:
+        if _loaded["mtime"] != mtime:
+            try:
+                _loaded["catalog"] = json.loads(path.read_text())
+            except Exception:
+                _loaded["catalog"] = None
+            _loaded["mtime"] = mtime
+        catalog = _loaded["catalog"]
+
+    if not catalog:
+        return None
+    try:
+        built = dt.datetime.fromisoformat(catalog["built_at"])
+    except Exception:
+        return None
+    if dt.datetime.now(dt.timezone.utc) - built > dt.timedelta(hours=CATALOG_MAX_AGE_HOURS):
+        return None
+    return catalog
+
+
+def wastewater_windows(county_fips: str, pcr_target: str, windows: List[int]) -> List[int]:
+    """
+    Which lookback windows (days, ascending) are worth querying for this county/target.
+
+    Unknown (no catalog) -> all windows, i.e. the original try-60-then-180 behavior.
+    Known -> only the smallest window that reaches the last sample, or [] if none can.
+    """
+    catalog = load_catalog()
+    if catalog is None:
+        return list(windows)
+
+    entry = (catalog.get("wastewater") or {}).get(county_fips, {}).get(pcr_target)
+    if not entry or not entry.get("last"):
+        return []
+
+    try:
+        last = dt.date.fromisoformat(entry["last"])
+    except Exception:
+        return list(windows)
+
+    age_days = (dt.date.today() - last).days
+    for w in sorted(windows):
+        if age_days <= w:
+            return [w]
+    return []
+
+
+def nssp_has_state_rollup(state_name: str) -> Optional[bool]:
+    """True/False if the catalog knows whether county='All' rows exist; None if unknown."""
+    catalog = load_catalog()
+    if catalog is None:
+        return None
+    entry = (catalog.get("nssp_rollups") or {}).get(state_name.strip())
+    return bool(entry and entry.get("rollup_rows"))
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Build / inspect the CDC dataset coverage catalog.")
+    ap.add_argument("--rebuild", action="store_true", help="rebuild the catalog from upstream aggregates")
+    ap.add_argument("--county", default=None, help="show wastewater coverage for a county FIPS")
+    ap.add_argument("--state", default=None, help="show NSSP rollup coverage for a state name (e.g. Illinois)")
+    args = ap.parse_args(argv)
+
+    if args.rebuild:
+        catalog = rebuild_catalog()
+        print(
+            f"OK: coverage catalog rebuilt at {CATALOG_PATH} "
+            f"(wastewater counties={len(catalog['wastewater'])}, "
+            f"nssp rollup states={len(catalog['nssp_rollups'])})"
+        )
+
+    catalog = load_catalog()
+    if catalog is None:
+        print(f"No usable catalog at {CATALOG_PATH} (missing or older than {CATALOG_MAX_AGE_HOURS:g}h).", file=sys.stderr)
+        return 1 if not args.rebuild else 0
+
+    if args.county:
+        print(json.dumps((catalog.get("wastewater") or {}).get(args.county, {}), indent=2))
+    if args.state:
+        print(json.dumps((catalog.get("nssp_rollups") or {}).get(args.state, None), indent=2))
+    if not (args.rebuild or args.county or args.state):
+        print(f"built_at={catalog.get('built_at')} path={CATALOG_PATH}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
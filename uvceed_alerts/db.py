@@ -58,10 +58,21 @@ def connect():
     return psycopg2.connect(get_db_url(), cursor_factory=RealDictCursor)
 
 
+_schema_ready = False
+
+
 def ensure_signal_schema(conn) -> None:
+    """Create signal_snapshots if needed; runs the DDL at most once per process.
+
+    Deployed databases get the full schema from sql/migrations (uvceed_api.db_migrate).
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
     with conn.cursor() as cur:
         cur.execute(SIGNAL_SNAPSHOTS_DDL)
     conn.commit()
+    _schema_ready = True
 
 
 def insert_signal_snapshot(
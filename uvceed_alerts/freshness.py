@@ -0,0 +1,171 @@
+# uvceed_alerts/freshness.py
+"""Cheap upstream freshness checks (dataset metadata only, no data rows).
+
+Each signal is backed by one upstream source:
+  - CDC Socrata datasets expose `rowsUpdatedAt` (epoch seconds) via the views API.
+  - Delphi Epidata exposes the latest FluView `issue` (epiweek) via fluview_meta.
+
+`source_version(source)` returns an opaque string that changes whenever the
+upstream publishes new rows. Results are cached in-process and in the shared
+cache (UVCEED_CACHE_URL) for UVCEED_FRESHNESS_CACHE_SECONDS so a refresh cycle
+hits each source at most once per host.
+
+`versioned_fetch` caches upstream responses under the source version, so the
+same query is fetched once per upstream publication and shared by all processes.
+
+Usage:
+  python -m uvceed_alerts.freshness
+  python -m uvceed_alerts.freshness --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+
+from uvceed_alerts import shared_cache
+from uvceed_alerts.config import CDC_APP_TOKEN
+
+SOCRATA_VIEWS_URL_TMPL = "https://data.cdc.gov/api/views/{dataset_id}.json"
+DELPHI_FLUVIEW_META_URL = "https://api.delphi.cmu.edu/epidata/fluview_meta/"
+
+DEFAULT_TIMEOUT = 10
+CACHE_SECONDS = float(os.getenv("UVCEED_FRESHNESS_CACHE_SECONDS", "900"))
+UPSTREAM_CACHE_SECONDS = float(os.getenv("UVCEED_CACHE_UPSTREAM_TTL_HOURS", "24")) * 3600.0
+
+# signal_type -> upstream source key ("<kind>:<id>")
+SIGNAL_SOURCES: Dict[str, str] = {
+    "wastewater": "socrata:j9g8-acpt",
+    "nssp_ed_visits": "socrata:rdmq-nq56",
+    "nssp_ed_county": "socrata:rdmq-nq56",
+    "nssp_ed_trajectories": "socrata:rdmq-nq56",
+    "fluview_ilinet": "delphi:fluview",
+    # fluview_clinical is published alongside fluview; fluview_meta is the closest marker.
+    "fluview_severity": "delphi:fluview",
+}
+
+_cache: Dict[str, Tuple[float, Optional[str]]] = {}
+_cache_lock = threading.Lock()
+
+
+def socrata_rows_updated_at(dataset_id: str, *, timeout: int = DEFAULT_TIMEOUT) -> Optional[int]:
+    """Return the dataset's `rowsUpdatedAt` (epoch seconds) from the Socrata views API."""
+    headers = {"Accept": "application/json"}
+    if CDC_APP_TOKEN:
+        headers["X-App-Token"] = CDC_APP_TOKEN
+    r = requests.get(SOCRATA_VIEWS_URL_TMPL.format(dataset_id=dataset_id), headers=headers, timeout=timeout)
+    r.raise_for_status()
+    value = r.json().get("rowsUpdatedAt")
+    try:
+        return int(value) if value is not None else None
+    except Exception:
+        return None
+
+
+def delphi_fluview_latest_issue(*, timeout: int = DEFAULT_TIMEOUT) -> Optional[int]:
+    """Return the latest FluView `issue` (epiweek YYYYWW) from Delphi's fluview_meta endpoint."""
+    r = requests.get(DELPHI_FLUVIEW_META_URL, timeout=timeout)
+    r.raise_for_status()
+    data = r.json()
+    if data.get("result") != 1:
+        return None
+    issues = []
+    for row in data.get("epidata") or []:
+        try:
+            issues.append(int(row.get("latest_issue")))
+        except Exception:
+            continue
+    return max(issues) if issues else None
+
+
+def _fetch_source_version(source: str) -> Optional[str]:
+    kind, _, ident = source.partition(":")
+    if kind == "socrata":
+        v = socrata_rows_updated_at(ident)
+    elif kind == "delphi":
+        v = delphi_fluview_latest_issue()
+    else:
+        raise ValueError(f"Unknown freshness source: {source!r}")
+    return f"{source}@{v}" if v is not None else None
+
+
+def source_version(source: str, *, max_age_s: float = CACHE_SECONDS) -> Optional[str]:
+    """Cached upstream version marker for `source`; None when it can't be determined.
+
+    Errors are cached as None too, so a flaky metadata endpoint doesn't add a
+    round trip per signal; callers treat None as "unknown -> refresh".
+    """
+    now = time.monotonic()
+    with _cache_lock:
+        hit = _cache.get(source)
+        if hit and now - hit[0] < max_age_s:
+            return hit[1]
+
+    shared = shared_cache.get_cache()
+    raw = shared.get(f"freshness:{source}")
+    if raw is not None:
+        version = raw.decode("utf-8")
+    else:
+        try:
+            version = _fetch_source_version(source)
+        except Exception:
+            version = None
+        if version is not None:
+            shared.set(f"freshness:{source}", version.encode("utf-8"), max_age_s)
+
+    with _cache_lock:
+        _cache[source] = (now, version)
+    return version
+
+
+def signal_source_version(signal_type: str, *, max_age_s: float = CACHE_SECONDS) -> Optional[str]:
+    source = SIGNAL_SOURCES.get(signal_type)
+    if not source:
+        return None
+    return source_version(source, max_age_s=max_age_s)
+
+
+def versioned_fetch(source: str, params: Dict[str, Any], fetch: Callable[[], Any]) -> Any:
+    """fetch() through the shared cache, keyed by the source's current version and params.
+
+    A new upstream publication changes the version and so the key; while the
+    version is unknown (or no shared cache is configured), fetch() runs uncached.
+    """
+    cache = shared_cache.get_cache()
+    if not cache.enabled:
+        return fetch()
+    version = source_version(source)
+    if version is None:
+        return fetch()
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:32]
+    return cache.cached_json(f"upstream:{version}:{digest}", UPSTREAM_CACHE_SECONDS, fetch)
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Show upstream dataset freshness markers per signal.")
+    ap.add_argument("--json", action="store_true", help="print JSON only")
+    args = ap.parse_args(argv)
+
+    out = {st: signal_source_version(st) for st in SIGNAL_SOURCES}
+    if args.json:
+        print(json.dumps(out, indent=2))
+        return 0
+    for st, v in out.items():
+        print(f"- {st}: {v or 'unknown'}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,19 +1,25 @@
 # uvceed_alerts/geo.py
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from typing import Optional, Tuple
 from pathlib import Path
+import os
 import re
 
 import requests
 
+from uvceed_alerts import shared_cache
+
 ZIPPOTAM_URL_TMPL = "https://api.zippopotam.us/us/{zip}"
 FCC_BLOCK_URL = "https://geo.fcc.gov/api/census/block/find"
 
 UA_API = "uvceed-alerts-geo/0.1 (+uvceed)"
 DEFAULT_TIMEOUT = 20
 
+# ZIP -> county rarely changes; resolved ZIPs are shared across processes via shared_cache
+GEO_CACHE_SECONDS = float(os.getenv("UVCEED_CACHE_GEO_TTL_HOURS", "720")) * 3600.0
+
 
 @dataclass(frozen=True)
 class GeoResult:
@@ -99,11 +105,21 @@ def latlon_to_county(lat: float, lon: float, *, timeout: int = DEFAULT_TIMEOUT)
 def zip_to_county(zip_code: str, *, timeout: int = DEFAULT_TIMEOUT) -> GeoResult:
     """
     Convenience: ZIP -> GeoResult (place/state + county FIPS).
+    Successful lookups are kept in the shared cache; GeoError is not cached.
     """
+    cache = shared_cache.get_cache()
+    key = f"geo:zip:{zip_code.strip()}"
+    hit = cache.get_json(key)
+    if isinstance(hit, dict):
+        try:
+            return GeoResult(**hit)
+        except TypeError:
+            pass
+
     place, state_abbr, state_name, lat, lon = zip_to_place_latlon(zip_code, timeout=timeout)
     county_name, county_fips = latlon_to_county(lat, lon, timeout=timeout)
 
-    return GeoResult(
+    res = GeoResult(
         zip_code=zip_code.strip(),
         place=place,
         state_abbr=state_abbr,
@@ -113,6 +129,8 @@ def zip_to_county(zip_code: str, *, timeout: int = DEFAULT_TIMEOUT) -> GeoResult
         county_name=county_name,
         county_fips=county_fips,
     )
+    cache.set_json(key, asdict(res), GEO_CACHE_SECONDS)
+    return res
 
 
 
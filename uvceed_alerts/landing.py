@@ -0,0 +1,122 @@
+# uvceed_alerts/landing.py
+"""Raw landing zone: every upstream response archived as gzip'd NDJSON.
+
+Layout (under UVCEED_LANDING_DIR; archiving is disabled when unset):
+
+  <root>/<dataset>/geo=<geo>/date=<YYYY-MM-DD>/<key>__<HHMMSSffffff>-<pid>.ndjson.gz
+
+The first line of each file is a `{"_meta": {...}}` record (dataset, geo, key,
+fetched_at, params, rows); every following line is one upstream row, verbatim.
+`key` distinguishes multiple queries against the same dataset/geo (e.g. the
+wastewater pcr_target, or NSSP strict vs fallback pulls).
+
+Archiving is best-effort: a full disk or bad permissions never fails ingestion.
+Offline re-scoring reads these files back (see uvceed_api.cli_reprocess).
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import gzip
+import json
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+LANDING_DIR = os.getenv("UVCEED_LANDING_DIR", "").strip()
+
+_SAFE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def _safe(part: str) -> str:
+    return _SAFE.sub("_", str(part).strip()) or "_"
+
+
+def landing_root() -> Optional[Path]:
+    return Path(LANDING_DIR) if LANDING_DIR else None
+
+
+def archive_fetch(
+    dataset: str,
+    geo: str,
+    rows: List[Dict[str, Any]],
+    *,
+    key: str = "all",
+    params: Optional[Dict[str, Any]] = None,
+    fetched_at: Optional[dt.datetime] = None,
+) -> Optional[Path]:
+    """Write one upstream response to the landing zone. Returns the path, or None if disabled/failed."""
+    root = landing_root()
+    if root is None:
+        return None
+
+    fetched_at = fetched_at or dt.datetime.now(dt.timezone.utc)
+    part_dir = root / _safe(dataset) / f"geo={_safe(geo)}" / f"date={fetched_at.date().isoformat()}"
+    name = f"{_safe(key)}__{fetched_at.strftime('%H%M%S%f')}-{os.getpid()}.ndjson.gz"
+
+    meta = {
+        "dataset": dataset,
+        "geo": geo,
+        "key": key,
+        "fetched_at": fetched_at.isoformat(),
+        "params": params or {},
+        "rows": len(rows),
+    }
+    try:
+        part_dir.mkdir(parents=True, exist_ok=True)
+        tmp = part_dir / f".{name}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as fh:
+            fh.write(json.dumps({"_meta": meta}, default=str) + "\n")
+            for row in rows:
+                fh.write(json.dumps(row, default=str) + "\n")
+        path = part_dir / name
+        os.replace(tmp, path)
+        return path
+    except Exception as e:
+        print(f"[landing] archive failed for {dataset}/{geo}/{key}: {e}", file=sys.stderr)
+        return None
+
+
+def read_archive(path: Path) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Return (meta, rows) for one archived response."""
+    meta: Dict[str, Any] = {}
+    rows: List[Dict[str, Any]] = []
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        for i, line in enumerate(fh):
+            line = line.strip()
+            if not line:
+                continue
+            obj = json.loads(line)
+            if i == 0 and isinstance(obj, dict) and "_meta" in obj:
+                meta = obj["_meta"]
+                continue
+            rows.append(obj)
+    return meta, rows
+
+
+def iter_archives(dataset: str, geo: str, *, key: Optional[str] = None) -> Iterator[Path]:
+    """All archive files for dataset/geo (optionally one key), newest first."""
+    root = landing_root()
+    if root is None:
+        return iter(())
+    geo_dir = root / _safe(dataset) / f"geo={_safe(geo)}"
+    if not geo_dir.is_dir():
+        return iter(())
+
+    prefix = f"{_safe(key)}__" if key else ""
+    files: List[Tuple[str, str, Path]] = []
+    for date_dir in geo_dir.iterdir():
+        if not date_dir.is_dir() or not date_dir.name.startswith("date="):
+            continue
+        for f in date_dir.iterdir():
+            if f.name.endswith(".ndjson.gz") and f.name.startswith(prefix):
+                stamp = f.name.split("__", 1)[-1]
+                files.append((date_dir.name, stamp, f))
+    files.sort(reverse=True)
+    return iter(f for _, _, f in files)
+
+
+def latest_archive(dataset: str, geo: str, *, key: Optional[str] = None) -> Optional[Path]:
+    return next(iter_archives(dataset, geo, key=key), None)
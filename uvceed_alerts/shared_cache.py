@@ -0,0 +1,560 @@
+# uvceed_alerts/shared_cache.py
+"""Cache shared by every process on a host (API workers, cron, ingestion subprocesses).
+
+Selected by UVCEED_CACHE_URL:
+  (unset)                 disabled; every lookup misses
+  memory://               in-process LRU (per process; useful for single-process runs)
+  postgres://... / postgresql://...
+                          UNLOGGED key/value table `shared_cache` in that database
+  db://                   same, in DATABASE_URL
+  redis://host:port/N     any Redis-protocol server (Redis, Valkey, or
+                          `python -m uvceed_alerts.shared_cache serve` locally)
+
+Values are bytes with a TTL; get_json/set_json/cached_json wrap JSON values.
+Limits: UVCEED_CACHE_MAX_ENTRIES (memory/Postgres; oldest evicted first) and
+UVCEED_CACHE_MAX_VALUE_BYTES (all backends; larger values are not cached).
+Redis enforces its own maxmemory policy.
+
+A cache failure never fails the caller: errors are counted and treated as misses.
+
+Usage:
+  python -m uvceed_alerts.shared_cache stats
+  python -m uvceed_alerts.shared_cache clear
+  python -m uvceed_alerts.shared_cache serve --port 6390
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import psycopg2
+
+CACHE_URL = os.getenv("UVCEED_CACHE_URL", "").strip()
+MAX_ENTRIES = int(os.getenv("UVCEED_CACHE_MAX_ENTRIES", "50000"))
+MAX_VALUE_BYTES = int(os.getenv("UVCEED_CACHE_MAX_VALUE_BYTES", str(2 * 1024 * 1024)))
+
+KEY_PREFIX = "uvceed:"
+
+class SharedCache:
+    """Base backend: always misses. Subclasses implement _get/_set/_delete/_clear."""
+
+    name = "none"
+    enabled = False
+    # False when get/set never block on I/O (async callers can skip the threadpool)
+    blocking = False
+
+    def __init__(self, max_value_bytes: int = MAX_VALUE_BYTES):
+        self.max_value_bytes = max_value_bytes
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "sets": 0, "too_large": 0, "errors": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _get(self, key: str) -> Optional[bytes]:
+        return None
+
+    def _set(self, key: str, value: bytes, ttl_s: float) -> None:
+        pass
+
+    def _delete(self, key: str) -> None:
+        pass
+
+    def _clear(self) -> int:
+        return 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            value = self._get(KEY_PREFIX + key)
+        except Exception:
+            self._count("errors")
+            value = None
+        self._count("hits" if value is not None else "misses")
+        return value
+
+    def set(self, key: str, value: bytes, ttl_s: float) -> None:
+        if ttl_s <= 0:
+            return
+        if len(value) > self.max_value_bytes:
+            self._count("too_large")
+            return
+        try:
+            self._set(KEY_PREFIX + key, value, ttl_s)
+            self._count("sets")
+        except Exception:
+            self._count("errors")
+
+    def delete(self, key: str) -> None:
+        try:
+            self._delete(KEY_PREFIX + key)
+        except Exception:
+            self._count("errors")
+
+    def clear(self) -> int:
+        """Drop every uvceed key; returns how many were removed (if the backend knows)."""
+        return self._clear()
+
+    def get_json(self, key: str) -> Any:
+        raw = self.get(key)
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def set_json(self, key: str, value: Any, ttl_s: float) -> None:
+        self.set(key, json.dumps(value, separators=(",", ":"), default=str).encode("utf-8"), ttl_s)
+
+    def cached_json(self, key: str, ttl_s: float, compute: Callable[[], Any]) -> Any:
+        """get_json, else compute() and store it (None results and exceptions are not cached)."""
+        hit = self.get_json(key)
+        if hit is not None:
+            return hit
+        value = compute()
+        if value is not None:
+            self.set_json(key, value, ttl_s)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": self.name, "max_value_bytes": self.max_value_bytes, **self._counters}
+
+
+class MemoryCache(SharedCache):
+    """Thread-safe LRU with per-key expiry."""
+
+    name = "memory"
+    enabled = True
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_value_bytes: int = MAX_VALUE_BYTES):
+        super().__init__(max_value_bytes)
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._evictions = 0
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            if hit[0] <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return hit[1]
+
+    def _set(self, key: str, value: bytes, ttl_s: float) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl_s, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def _clear(self) -> int:
+        with self._lock:
+            n = len(self._data)
+            self._data.clear()
+            return n
+
+    def scan(self, prefix: str = "") -> List[str]:
+        now = time.monotonic()
+        with self._lock:
+            return [k for k, (exp, _) in self._data.items() if exp > now and k.startswith(prefix)]
+
+    def ttl_ms(self, key: str) -> int:
+        with self._lock:
+            hit = self._data.get(key)
+        if hit is None:
+            return -2
+        return max(0, int((hit[0] - time.monotonic()) * 1000))
+
+    def stats(self) -> Dict[str, Any]:
+        out = super().stats()
+        with self._lock:
+            out.update(entries=len(self._data), max_entries=self.max_entries, evictions=self._evictions)
+        return out
+
+
+class PostgresCache(SharedCache):
+    """UNLOGGED table: no WAL, truncated after a crash -- fine for a cache.
+
+    The table comes from sql/migrations (0003_shared_cache); until it exists every
+    call fails and is counted as an error/miss.
+
+    One autocommit connection per process, serialized by a lock and reopened after
+    errors. Every PRUNE_EVERY sets, expired rows are deleted and the table is cut
+    back to max_entries (oldest written first).
+    """
+
+    name = "postgres"
+    enabled = True
+    blocking = True
+    PRUNE_EVERY = 200
+
+    def __init__(self, dsn: str, max_entries: int = MAX_ENTRIES, max_value_bytes: int = MAX_VALUE_BYTES):
+        super().__init__(max_value_bytes)
+        self.dsn = dsn
+        self.max_entries = max(1, max_entries)
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        self._sets_since_prune = 0
+        self._evictions = 0
+
+    def _run(self, fn: Callable[[Any], Any]) -> Any:
+        with self._conn_lock:
+            if self._conn is None or self._conn.closed:
+                conn = psycopg2.connect(self.dsn)
+                conn.autocommit = True
+                self._conn = conn
+            try:
+                with self._conn.cursor() as cur:
+                    return fn(cur)
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                try:
+                    self._conn.close()
+                except Exception:
+                    pass
+                self._conn = None
+                raise
+
+    def _get(self, key: str) -> Optional[bytes]:
+        def q(cur) -> Optional[bytes]:
+            cur.execute("SELECT value FROM shared_cache WHERE key = %s AND expires_at > now();", (key,))
+            row = cur.fetchone()
+            return bytes(row[0]) if row else None
+        return self._run(q)
+
+    def _prune(self, cur) -> None:
+        cur.execute("DELETE FROM shared_cache WHERE expires_at <= now();")
+        cur.execute("SELECT count(*) FROM shared_cache;")
+        excess = int(cur.fetchone()[0]) - self.max_entries
+        if excess > 0:
+            cur.execute(
+                """
+                DELETE FROM shared_cache
+                WHERE key IN (SELECT key FROM shared_cache ORDER BY updated_at LIMIT %s);
+                """,
+                (excess,),
+            )
+            self._evictions += excess
+
+    def _set(self, key: str, value: bytes, ttl_s: float) -> None:
+        def q(cur) -> None:
+            cur.execute(
+                """
+                INSERT INTO shared_cache(key, value, expires_at)
+                VALUES (%s, %s, now() + %s * interval '1 second')
+                ON CONFLICT (key)
+                DO UPDATE SET value = EXCLUDED.value, expires_at = EXCLUDED.expires_at, updated_at = now();
+                """,
+                (key, psycopg2.Binary(value), ttl_s),
+            )
+            self._sets_since_prune += 1
+            if self._sets_since_prune >= self.PRUNE_EVERY:
+                self._sets_since_prune = 0
+                self._prune(cur)
+        self._run(q)
+
+    def _delete(self, key: str) -> None:
+        self._run(lambda cur: cur.execute("DELETE FROM shared_cache WHERE key = %s;", (key,)))
+
+    def _clear(self) -> int:
+        def q(cur) -> int:
+            cur.execute("DELETE FROM shared_cache WHERE key LIKE %s;", (KEY_PREFIX + "%",))
+            return cur.rowcount
+        return self._run(q)
+
+    def stats(self) -> Dict[str, Any]:
+        out = super().stats()
+        out.update(max_entries=self.max_entries, evictions=self._evictions)
+        return out
+
+
+# -----------------------------
+# Redis protocol (RESP2)
+# -----------------------------
+
+class RespError(RuntimeError):
+    """Error reply from a Redis-protocol server."""
+
+
+def _encode_command(*args: Any) -> bytes:
+    out = [b"*%d\r\n" % len(args)]
+    for a in args:
+        b = a if isinstance(a, bytes) else str(a).encode("utf-8")
+        out.append(b"$%d\r\n%s\r\n" % (len(b), b))
+    return b"".join(out)
+
+
+def _read_reply(f) -> Any:
+    line = f.readline()
+    if not line:
+        raise ConnectionError("connection closed by server")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode("utf-8")
+    if kind == b"-":
+        raise RespError(rest.decode("utf-8", "replace"))
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        n = int(rest)
+        if n < 0:
+            return None
+        data = f.read(n + 2)
+        return data[:-2]
+    if kind == b"*":
+        n = int(rest)
+        return None if n < 0 else [_read_reply(f) for _ in range(n)]
+    raise ConnectionError(f"unexpected RESP reply: {line[:40]!r}")
+
+
+class RedisCache(SharedCache):
+    """Minimal RESP2 client (GET / SET PX / DEL / SCAN); one socket per process, under a lock."""
+
+    name = "redis"
+    enabled = True
+    blocking = True
+
+    def __init__(self, url: str, max_value_bytes: int = MAX_VALUE_BYTES, timeout_s: float = 2.0):
+        super().__init__(max_value_bytes)
+        u = urlparse(url)
+        self.host = u.hostname or "127.0.0.1"
+        self.port = u.port or 6379
+        self.password = u.password
+        self.db = int((u.path or "/0").lstrip("/") or 0)
+        self.timeout_s = timeout_s
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+        self._conn_lock = threading.Lock()
+
+    def _connect(self) -> None:
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout_s)
+        self._file = self._sock.makefile("rb")
+        if self.password:
+            self._call_locked("AUTH", self.password)
+        if self.db:
+            self._call_locked("SELECT", self.db)
+
+    def _close(self) -> None:
+        for c in (self._file, self._sock):
+            try:
+                if c is not None:
+                    c.close()
+            except Exception:
+                pass
+        self._sock = self._file = None
+
+    def _call_locked(self, *args: Any) -> Any:
+        self._sock.sendall(_encode_command(*args))
+        return _read_reply(self._file)
+
+    def call(self, *args: Any) -> Any:
+        with self._conn_lock:
+            try:
+                if self._sock is None:
+                    self._connect()
+                return self._call_locked(*args)
+            except RespError:
+                raise
+            except Exception:
+                self._close()
+                raise
+
+    def _get(self, key: str) -> Optional[bytes]:
+        return self.call("GET", key)
+
+    def _set(self, key: str, value: bytes, ttl_s: float) -> None:
+        self.call("SET", key, value, "PX", max(1, int(ttl_s * 1000)))
+
+    def _delete(self, key: str) -> None:
+        self.call("DEL", key)
+
+    def _clear(self) -> int:
+        removed, cursor = 0, "0"
+        while True:
+            cursor, keys = self.call("SCAN", cursor, "MATCH", KEY_PREFIX + "*", "COUNT", 500)
+            cursor = cursor.decode("utf-8") if isinstance(cursor, bytes) else str(cursor)
+            if keys:
+                removed += int(self.call("DEL", *keys))
+            if cursor == "0":
+                return removed
+
+    def stats(self) -> Dict[str, Any]:
+        out = super().stats()
+        out.update(server=f"{self.host}:{self.port}/{self.db}")
+        return out
+
+
+def open_cache(url: str = CACHE_URL) -> SharedCache:
+    """Backend for a UVCEED_CACHE_URL value (see module docstring)."""
+    scheme = urlparse(url).scheme.lower() if url else ""
+    if not scheme:
+        return SharedCache()
+    if scheme == "memory":
+        return MemoryCache()
+    if scheme in ("postgres", "postgresql"):
+        return PostgresCache(url)
+    if scheme == "db":
+        dsn = os.getenv("DATABASE_URL", "").strip()
+        if not dsn:
+            raise RuntimeError("UVCEED_CACHE_URL=db:// needs DATABASE_URL")
+        return PostgresCache(dsn)
+    if scheme == "redis":
+        return RedisCache(url)
+    raise ValueError(f"Unsupported UVCEED_CACHE_URL scheme: {scheme!r}")
+
+
+_cache: Optional[SharedCache] = None
+_cache_pid: Optional[int] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> SharedCache:
+    """Process-wide backend from UVCEED_CACHE_URL (re-created after fork: sockets aren't shared)."""
+    global _cache, _cache_pid
+    if _cache is None or _cache_pid != os.getpid():
+        with _cache_lock:
+            if _cache is None or _cache_pid != os.getpid():
+                _cache = open_cache(CACHE_URL)
+                _cache_pid = os.getpid()
+    return _cache
+
+
+# -----------------------------
+# Local Redis-protocol stand-in
+# -----------------------------
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    def _reply(self, value: Any) -> None:
+        if value is None:
+            self.wfile.write(b"$-1\r\n")
+        elif isinstance(value, bool):
+            self.wfile.write(b"+OK\r\n")
+        elif isinstance(value, int):
+            self.wfile.write(b":%d\r\n" % value)
+        elif isinstance(value, bytes):
+            self.wfile.write(b"$%d\r\n%s\r\n" % (len(value), value))
+        elif isinstance(value, list):
+            self.wfile.write(b"*%d\r\n" % len(value))
+            for v in value:
+                self._reply(v if not isinstance(v, str) else v.encode("utf-8"))
+        else:
+            self.wfile.write(b"+%s\r\n" % str(value).encode("utf-8"))
+
+    def _command(self, args: List[bytes]) -> Any:
+        store: MemoryCache = self.server.store  # type: ignore[attr-defined]
+        cmd = args[0].decode("utf-8").upper()
+        if cmd == "PING":
+            return "PONG"
+        if cmd in ("SELECT", "AUTH"):
+            return True
+        if cmd == "GET":
+            return store._get(args[1].decode("utf-8"))
+        if cmd == "SET":
+            ttl_s = 365 * 86400.0
+            opts = [a.decode("utf-8").upper() for a in args[3:]]
+            if "PX" in opts:
+                ttl_s = int(opts[opts.index("PX") + 1]) / 1000.0
+            elif "EX" in opts:
+                ttl_s = float(opts[opts.index("EX") + 1])
+            if len(args[2]) > store.max_value_bytes:
+                raise RespError("value exceeds stand-in max_value_bytes")
+            store._set(args[1].decode("utf-8"), args[2], ttl_s)
+            return True
+        if cmd == "DEL":
+            found = [k for k in (a.decode("utf-8") for a in args[1:]) if store._get(k) is not None]
+            for k in found:
+                store._delete(k)
+            return len(found)
+        if cmd == "PTTL":
+            return store.ttl_ms(args[1].decode("utf-8"))
+        if cmd == "DBSIZE":
+            return len(store.scan())
+        if cmd == "FLUSHDB":
+            store._clear()
+            return True
+        if cmd == "SCAN":
+            opts = [a.decode("utf-8") for a in args[2:]]
+            pattern = opts[opts.index("MATCH") + 1] if "MATCH" in opts else "*"
+            # Single page: only trailing-* prefix patterns are supported
+            return [b"0", store.scan(pattern.rstrip("*"))]
+        raise RespError(f"unknown command '{cmd}'")
+
+    def handle(self) -> None:
+        while True:
+            try:
+                args = _read_reply(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            try:
+                if not isinstance(args, list) or not args:
+                    raise RespError("expected a command array")
+                reply = self._command(args)
+            except RespError as e:
+                self.wfile.write(b"-ERR %s\r\n" % str(e).encode("utf-8"))
+            except (IndexError, ValueError):
+                self.wfile.write(b"-ERR syntax error\r\n")
+            else:
+                self._reply(reply)
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    """Redis-protocol server backed by a MemoryCache (local dev / tests; not for production)."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6390, store: Optional[MemoryCache] = None):
+        super().__init__((host, port), _RespHandler)
+        self.store = store or MemoryCache()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Inspect the shared cache or run a local Redis-protocol stand-in.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats", help="print backend counters for UVCEED_CACHE_URL")
+    sub.add_parser("clear", help="drop every uvceed key from UVCEED_CACHE_URL")
+    sp = sub.add_parser("serve", help="serve RESP on a port (point UVCEED_CACHE_URL=redis://host:port at it)")
+    sp.add_argument("--host", default="127.0.0.1")
+    sp.add_argument("--port", type=int, default=6390)
+    sp.add_argument("--max-entries", type=int, default=MAX_ENTRIES)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "serve":
+        server = RespServer(args.host, args.port, MemoryCache(max_entries=args.max_entries))
+        print(f"[shared_cache] serving RESP on {args.host}:{args.port} (max_entries={args.max_entries})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return 0
+
+    cache = get_cache()
+    if args.cmd == "clear":
+        print(f"removed {cache.clear()} keys from {cache.name}")
+        return 0
+    print(json.dumps(cache.stats(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
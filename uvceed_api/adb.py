@@ -0,0 +1,93 @@
+"""Async request path: psycopg 3 AsyncConnectionPool for the event loop.
+
+The hot /signals/latest path (register + read latest snapshots) runs here with
+`await`, so a worker serves many concurrent cache hits without tying up
+threadpool slots. Anything that still blocks -- upstream ingestion, refreshes,
+queue waits, the psycopg2 helpers in db.py -- is offloaded by the routes with
+run_in_threadpool.
+
+Statements and parameters are shared with db.py so both paths stay identical.
+Connections are autocommit. The pool is opened/closed by the app's startup/shutdown
+hooks (UVCEED_ASYNC_DB); psycopg 3 is only imported then, so the app runs on
+psycopg2 alone with UVCEED_ASYNC_DB=0.
+"""
+
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from . import config
+from .db import (
+    REGISTER_AND_READ_HEADS_SQL,
+    REGISTER_AND_READ_LATEST_SQL,
+    SNAPSHOT_PAYLOADS_SQL,
+    get_database_url,
+    parse_register_result,
+    register_params,
+)
+
+_apool: Optional[Any] = None  # psycopg_pool.AsyncConnectionPool once opened
+
+async def open_pool() -> Any:
+    global _apool
+    if _apool is None:
+        try:
+            from psycopg.rows import dict_row
+            from psycopg_pool import AsyncConnectionPool
+        except ImportError as e:
+            raise RuntimeError(
+                "UVCEED_ASYNC_DB needs psycopg 3 with psycopg_pool (pip install 'psycopg[binary,pool]'); "
+                "set UVCEED_ASYNC_DB=0 to use psycopg2 only"
+            ) from e
+        _apool = AsyncConnectionPool(
+            conninfo=get_database_url(),
+            min_size=config.DB_POOL_MIN,
+            max_size=max(config.DB_POOL_MIN, config.ASYNC_DB_POOL_MAX),
+            timeout=config.DB_POOL_TIMEOUT_SECONDS,
+            max_lifetime=config.DB_POOL_MAX_LIFETIME_SECONDS,
+            max_idle=config.DB_POOL_MAX_IDLE_SECONDS,
+            kwargs={"autocommit": True, "row_factory": dict_row},
+            check=AsyncConnectionPool.check_connection,
+            name="uvceed-async",
+            open=False,
+        )
+        await _apool.open()
+    return _apool
+
+async def close_pool() -> None:
+    global _apool
+    if _apool is not None:
+        pool, _apool = _apool, None
+        await pool.close()
+
+def apool_stats() -> Optional[Dict[str, Any]]:
+    return _apool.get_stats() if _apool is not None else None
+
+@asynccontextmanager
+async def adb_conn() -> AsyncIterator[Any]:
+    """Autocommit connection from the async pool (returned to it on exit)."""
+    pool = _apool if _apool is not None else await open_pool()
+    async with pool.connection() as conn:
+        yield conn
+
+async def aregister_and_read_latest(
+    conn,
+    zip_code: str,
+    signal_geo_level: Dict[str, str],
+    half_life_hours: float = 72.0,
+    geo_max_age_days: int = 90,
+    payloads: bool = True,
+) -> Optional[Tuple[Dict[str, Tuple[str, str]], Dict[str, Optional[Dict[str, Any]]]]]:
+    """Async db.register_and_read_latest: one statement, None when the ZIP's geo isn't cached."""
+    async with conn.cursor() as cur:
+        await cur.execute(
+            REGISTER_AND_READ_LATEST_SQL if payloads else REGISTER_AND_READ_HEADS_SQL,
+            register_params(zip_code, signal_geo_level, half_life_hours, geo_max_age_days),
+        )
+        return parse_register_result(await cur.fetchall())
+
+async def asnapshot_payloads(conn, zip_code: str, ids: List[int]) -> Dict[int, str]:
+    if not ids:
+        return {}
+    async with conn.cursor() as cur:
+        await cur.execute(SNAPSHOT_PAYLOADS_SQL, (zip_code, list(ids)))
+        return {int(r["id"]): r["payload"] for r in await cur.fetchall()}
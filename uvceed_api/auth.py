@@ -1,7 +1,7 @@
 from fastapi import Header, HTTPException
 from .config import UVCEED_API_KEY
 
-def require_api_key(authorization: str | None = Header(default=None)) -> None:
+async def require_api_key(authorization: str | None = Header(default=None)) -> None:
     if not UVCEED_API_KEY:
         # In development you might run without a key; keep endpoint open if unset.
         return
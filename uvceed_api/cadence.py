@@ -0,0 +1,89 @@
+"""Publication-aware staleness.
+
+A snapshot can only change when upstream publishes data newer than the
+snapshot's data_as_of marker (latest NSSP week_end / latest wastewater
+sample_collect_date it was computed from). Each signal has a simple model of
+that cadence:
+
+  next data_as_of  = data_as_of + period
+  expected publish = next data_as_of + lag
+
+A snapshot is fresh until the expected publication time. Once past it, it is
+re-checked at most every `retry` (the freshness gate makes a check that finds
+nothing new cheap), so refreshes cluster just after publication and are skipped
+in between. `max_age` caps how long any snapshot is trusted without a check.
+
+Rows without data_as_of (written before this existed) fall back to the fixed
+UVCEED_TTL_HOURS_* TTLs.
+"""
+
+import datetime as dt
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from . import config
+
+UTC = dt.timezone.utc
+
+@dataclass(frozen=True)
+class Cadence:
+    period: dt.timedelta  # spacing between successive data_as_of values
+    lag: dt.timedelta     # data_as_of -> typical publication delay
+    retry: dt.timedelta   # re-check interval once publication is overdue
+    max_age: dt.timedelta
+
+CADENCES: Dict[str, Cadence] = {
+    # NSSP ED visits: weekly rows keyed by the Saturday week_end, published the following week
+    "nssp_ed_visits": Cadence(
+        period=dt.timedelta(days=7),
+        lag=dt.timedelta(hours=config.CADENCE_LAG_HOURS_NSSP_ED_VISITS),
+        retry=dt.timedelta(hours=config.CADENCE_RETRY_HOURS),
+        max_age=dt.timedelta(hours=config.CADENCE_MAX_AGE_HOURS),
+    ),
+    # NSSP county series: same dataset and weekly publication as nssp_ed_visits
+    "nssp_ed_county": Cadence(
+        period=dt.timedelta(days=7),
+        lag=dt.timedelta(hours=config.CADENCE_LAG_HOURS_NSSP_ED_VISITS),
+        retry=dt.timedelta(hours=config.CADENCE_RETRY_HOURS),
+        max_age=dt.timedelta(hours=config.CADENCE_MAX_AGE_HOURS),
+    ),
+    # NWSS wastewater: near-daily sample dates, reported a few days after collection
+    "wastewater": Cadence(
+        period=dt.timedelta(days=1),
+        lag=dt.timedelta(hours=config.CADENCE_LAG_HOURS_WASTEWATER),
+        retry=dt.timedelta(hours=config.CADENCE_RETRY_HOURS),
+        max_age=dt.timedelta(hours=config.CADENCE_MAX_AGE_HOURS),
+    ),
+}
+
+def _as_datetime(value: Any) -> Optional[dt.datetime]:
+    if isinstance(value, dt.datetime):
+        return value if value.tzinfo else value.replace(tzinfo=UTC)
+    if isinstance(value, dt.date):
+        return dt.datetime(value.year, value.month, value.day, tzinfo=UTC)
+    if isinstance(value, str) and value.strip():
+        try:
+            return _as_datetime(dt.date.fromisoformat(value.strip()[:10]))
+        except ValueError:
+            return None
+    return None
+
+def next_check_at(signal_type: str, row: Dict[str, Any]) -> Optional[dt.datetime]:
+    """When row should next be refreshed, or None if the cadence model doesn't apply."""
+    cadence = CADENCES.get(signal_type)
+    as_of = _as_datetime(row.get("data_as_of"))
+    checked = _as_datetime(row.get("checked_at") or row.get("generated_at"))
+    if cadence is None or as_of is None or checked is None:
+        return None
+    due = as_of + cadence.period + cadence.lag
+    if checked >= due:
+        # Already looked after the expected publication and found nothing newer: upstream is late
+        due = checked + cadence.retry
+    return min(due, checked + cadence.max_age)
+
+def is_due(signal_type: str, row: Dict[str, Any], now: Optional[dt.datetime] = None) -> Optional[bool]:
+    """True/False per the cadence model; None when the caller should fall back to a fixed TTL."""
+    due = next_check_at(signal_type, row)
+    if due is None:
+        return None
+    return (now or dt.datetime.now(UTC)) >= due
@@ -1,43 +1,281 @@
 import argparse
 import datetime as dt
-from typing import List
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
 
+from . import config
 from .db import db_conn, ensure_phase3_schema
+from .geo import cached_geo_keys
+from .jobs import PRIORITY_CRON, enqueue_refresh
+from .planner import build_plan, execute_plan
 from .refresh import refresh_zip
 
 UTC = dt.timezone.utc
 
+# Unfinished runs older than this are abandoned instead of resumed
+RESUME_WITHIN_HOURS = 20
+# A claimed run item not checkpointed within this long is assumed orphaned (its process died)
+RECLAIM_AFTER_MINUTES = 30
+
+def _requested_zips(conn, days: int) -> List[str]:
+    cutoff = dt.datetime.now(UTC) - dt.timedelta(days=days)
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT zip_code
+            FROM zip_requests
+            WHERE last_requested_at >= %s
+            ORDER BY last_requested_at DESC;
+            """,
+            (cutoff,),
+        )
+        return [r["zip_code"] for r in cur.fetchall()]
+
+def _start_or_resume_run(conn, days: int, force: bool, resume: bool) -> Dict:
+    """Return {"run_id", "resumed", "total", "pending"} and checkpoint the ZIP list.
+
+    pending is a count: workers claim the run's items one at a time (claim_run_item),
+    so several processes resuming the same run split its ZIPs instead of repeating them.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE refresh_runs
+            SET status = 'abandoned', finished_at = now()
+            WHERE status = 'running' AND started_at < now() - %s * interval '1 hour';
+            """,
+            (RESUME_WITHIN_HOURS,),
+        )
+        if resume:
+            cur.execute(
+                """
+                SELECT id, total
+                FROM refresh_runs
+                WHERE status = 'running' AND days = %s AND force = %s
+                ORDER BY started_at DESC
+                LIMIT 1;
+                """,
+                (days, force),
+            )
+            row = cur.fetchone()
+            if row:
+                cur.execute(
+                    """
+                    SELECT count(*) AS n
+                    FROM refresh_run_items
+                    WHERE run_id = %s AND status IN ('pending', 'running');
+                    """,
+                    (row["id"],),
+                )
+                pending = int(cur.fetchone()["n"])
+                return {"run_id": int(row["id"]), "resumed": True, "total": int(row["total"]), "pending": pending}
+
+    zips = _requested_zips(conn, days)
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO refresh_runs(days, force, total)
+            VALUES (%s, %s, %s)
+            RETURNING id;
+            """,
+            (days, force, len(zips)),
+        )
+        run_id = int(cur.fetchone()["id"])
+        cur.execute(
+            """
+            INSERT INTO refresh_run_items(run_id, zip_code, seq)
+            SELECT %s, z, s FROM unnest(%s::text[]) WITH ORDINALITY AS t(z, s);
+            """,
+            (run_id, zips),
+        )
+    return {"run_id": run_id, "resumed": False, "total": len(zips), "pending": len(zips)}
+
+def claim_run_item(conn, run_id: int) -> Optional[str]:
+    """Atomically mark the run's next pending (or orphaned) ZIP as running and return it."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            WITH next AS (
+              SELECT zip_code
+              FROM refresh_run_items
+              WHERE run_id = %s
+                AND (status = 'pending'
+                     OR (status = 'running' AND claimed_at < now() - %s * interval '1 minute'))
+              ORDER BY seq
+              LIMIT 1
+              FOR UPDATE SKIP LOCKED
+            )
+            UPDATE refresh_run_items i
+            SET status = 'running', claimed_at = now()
+            FROM next
+            WHERE i.run_id = %s AND i.zip_code = next.zip_code
+            RETURNING i.zip_code;
+            """,
+            (run_id, RECLAIM_AFTER_MINUTES, run_id),
+        )
+        row = cur.fetchone()
+    return row["zip_code"] if row else None
+
+def _checkpoint(conn, run_id: int, zip_code: str, refreshed: bool, errors: Dict[str, str]) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE refresh_run_items
+            SET status = %s, refreshed = %s, error = %s, finished_at = now()
+            WHERE run_id = %s AND zip_code = %s;
+            """,
+            ("error" if errors else "done", refreshed, (str(errors)[:1200] if errors else None), run_id, zip_code),
+        )
+    conn.commit()
+
+def _finish_run(conn, run_id: int) -> Dict[str, int]:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT
+              count(*) FILTER (WHERE status IN ('done', 'error')) AS processed,
+              count(*) FILTER (WHERE refreshed) AS refreshed,
+              count(*) FILTER (WHERE status = 'error') AS errors,
+              count(*) FILTER (WHERE status IN ('pending', 'running')) AS pending
+            FROM refresh_run_items
+            WHERE run_id = %s;
+            """,
+            (run_id,),
+        )
+        stats = dict(cur.fetchone())
+        if not stats["pending"]:
+            cur.execute("UPDATE refresh_runs SET status = 'done', finished_at = now() WHERE id = %s;", (run_id,))
+    return stats
+
+def _worker(run_id: int, force: bool, progress: Dict, lock: threading.Lock) -> None:
+    while True:
+        # Pooled, so a connection per claim/checkpoint is cheap and keeps the pool free for refresh_zip
+        try:
+            with db_conn() as conn:
+                z = claim_run_item(conn, run_id)
+        except Exception as e:
+            print(f"WARN run={run_id}: claiming next ZIP failed, worker stopping: {str(e)[:300]}")
+            return
+        if z is None:
+            return
+        try:
+            refreshed, errors = refresh_zip(z, force=force)
+        except Exception as e:
+            refreshed, errors = False, {"_": str(e)[:1200]}
+        try:
+            with db_conn() as conn:
+                _checkpoint(conn, run_id, z, refreshed, errors)
+        except Exception as e:
+            # The item stays 'running' and is reclaimed by a later --resume after RECLAIM_AFTER_MINUTES
+            errors = {**errors, "_checkpoint": str(e)[:300]}
+        with lock:
+            progress["done"] += 1
+            progress["refreshed"] += int(bool(refreshed))
+            progress["errors"] += int(bool(errors))
+        if errors:
+            print(f"WARN {z}: {errors}")
+
 def main():
     ap = argparse.ArgumentParser(description="Refresh all requested ZIP codes (for cron).")
     ap.add_argument("--days", type=int, default=30, help="Only refresh zips requested within last N days")
     ap.add_argument("--force", action="store_true", help="Force refresh regardless of TTL")
+    ap.add_argument(
+        "--enqueue",
+        action=argparse.BooleanOptionalAction,
+        default=config.REFRESH_QUEUE,
+        help="Only enqueue refresh_jobs for uvceed_api.worker (default: UVCEED_REFRESH_QUEUE)",
+    )
+    ap.add_argument("--concurrency", type=int, default=1, help="ZIPs refreshed in parallel")
+    ap.add_argument(
+        "--resume",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help=f"Continue the last unfinished run (started <{RESUME_WITHIN_HOURS}h ago) instead of starting over",
+    )
+    ap.add_argument("--progress-every", type=float, default=30.0, help="Seconds between progress lines")
+    ap.add_argument("--plan", action="store_true", help="Group ZIPs by geography and fetch each (signal, county/state) once")
+    ap.add_argument("--dry-run", action="store_true", help="With --plan: print planned vs naive fetch counts and exit")
     args = ap.parse_args()
 
-    cutoff = dt.datetime.now(UTC) - dt.timedelta(days=args.days)
-
     with db_conn() as conn:
         ensure_phase3_schema(conn)
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT zip_code
-                FROM zip_requests
-                WHERE last_requested_at >= %s
-                ORDER BY last_requested_at DESC;
-                """,
-                (cutoff,),
+
+        if args.enqueue:
+            zips = _requested_zips(conn, args.days)
+            # ZIPs sharing a county/state merge into one queued job per signal
+            geo_keys = cached_geo_keys(conn, zips, list(config.SIGNAL_TYPES))
+            for z in zips:
+                enqueue_refresh(conn, z, geo_keys[z], priority=PRIORITY_CRON, force=args.force)
+            jobs = len({(st, key) for keys in geo_keys.values() for st, key in keys.items()})
+            print(f"OK: enqueued={len(zips)} zips x {len(config.SIGNAL_TYPES)} signals as {jobs} jobs")
+            return
+
+        if args.plan:
+            started = time.monotonic()
+            zips = _requested_zips(conn, args.days)
+            plan = build_plan(conn, zips, force=args.force, concurrency=max(1, args.concurrency))
+            conn.commit()
+            print(
+                f"plan: zips={len(zips)} unresolved={len(plan.unresolved)} "
+                f"naive_fetches={plan.naive_fetches} planned_fetches={plan.planned_fetches}",
+                file=sys.stderr,
             )
-            zips = [r["zip_code"] for r in cur.fetchall()]
+            if args.dry_run:
+                return
+            stats = execute_plan(conn, plan, concurrency=max(1, args.concurrency))
+            print(
+                "OK: " + " ".join(f"{k}={v}" for k, v in stats.items())
+                + f" elapsed={time.monotonic() - started:.1f}s"
+            )
+            return
+
+        run = _start_or_resume_run(conn, args.days, args.force, args.resume)
+
+    run_id, pending = run["run_id"], run["pending"]
+    concurrency = max(1, args.concurrency)
+    print(
+        f"run={run_id} {'resumed' if run['resumed'] else 'started'} "
+        f"total={run['total']} pending={pending} concurrency={concurrency}",
+        file=sys.stderr,
+    )
+    if concurrency * min(len(config.SIGNAL_TYPES), config.REFRESH_MAX_PARALLEL) > config.REFRESH_WORKERS:
+        print(f"hint: raise UVCEED_REFRESH_WORKERS (now {config.REFRESH_WORKERS}) to keep all ZIP workers busy", file=sys.stderr)
+    if config.DB_POOL and concurrency > config.DB_POOL_MAX:
+        print(f"hint: raise UVCEED_DB_POOL_MAX (now {config.DB_POOL_MAX}) to at least --concurrency", file=sys.stderr)
 
-        refreshed_total = 0
-        for z in zips:
-            refreshed, errors = refresh_zip(conn, z, force=args.force)
-            if refreshed:
-                refreshed_total += 1
-            if errors:
-                print(f"WARN {z}: {errors}")
+    progress = {"done": 0, "refreshed": 0, "errors": 0}
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=_worker, args=(run_id, args.force, progress, lock), name=f"uvceed-cron-{i}", daemon=True)
+        for i in range(concurrency)
+    ]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+
+    while any(t.is_alive() for t in threads):
+        for t in threads:
+            t.join(timeout=args.progress_every / len(threads))
+        elapsed = time.monotonic() - started
+        with lock:
+            done, refreshed, errors = progress["done"], progress["refreshed"], progress["errors"]
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (pending - done) / rate if rate > 0 else None
+        print(
+            f"progress run={run_id} {done}/{pending} refreshed={refreshed} errors={errors} "
+            f"rate={rate:.2f} zip/s eta={f'{eta:.0f}s' if eta is not None else '?'}",
+            file=sys.stderr,
+        )
+
+    with db_conn() as conn:
+        stats = _finish_run(conn, run_id)
 
-    print(f"OK: processed={len(zips)} refreshed_any={refreshed_total}")
+    print(
+        f"OK: run={run_id} processed={stats['processed']} refreshed_any={stats['refreshed']} "
+        f"errors={stats['errors']} pending={stats['pending']} elapsed={time.monotonic() - started:.1f}s"
+    )
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,344 @@
+"""Re-score signal snapshots offline from the raw landing zone (no network).
+
+For every (zip, signal) latest snapshot, load the newest archived upstream
+response for its geography from UVCEED_LANDING_DIR, re-run the module's
+scoring (risk_from_value, _risk_from_latest, _assess_simple_risk, ...) across
+a process pool, and insert a fresh snapshot. The new row keeps the original's
+staleness clock (checked_at) and source_version, so re-scoring never makes
+data look fresher than its last real fetch.
+
+Usage:
+  UVCEED_LANDING_DIR=/data/uvceed_landing python -m uvceed_api.cli_reprocess
+  python -m uvceed_api.cli_reprocess --signals wastewater,nssp_ed_visits --workers 8
+  python -m uvceed_api.cli_reprocess --dry-run
+"""
+
+import argparse
+import datetime as dt
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from uvceed_alerts import landing
+from uvceed_alerts import cdc_fluview_severity as severity
+from uvceed_alerts import cdc_nssp_ed_trajectories as trajectories
+from uvceed_alerts import cdc_nssp_ed_visits as nssp_visits
+from uvceed_alerts import cdc_wastewater as wastewater
+from uvceed_alerts.geo import GeoResult
+
+from .db import db_conn, ensure_phase3_schema, insert_signal_snapshot
+from .refresh import _extract_meta, _parse_dt
+
+UTC = dt.timezone.utc
+
+GEO_FIELDS = ("place", "state_name", "state_abbr", "county_name", "county_fips")
+
+
+# ---------------------------
+# Re-scoring (runs in worker processes; pure functions of payload + archive)
+# ---------------------------
+
+def _geo_header(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: payload.get(k) for k in GEO_FIELDS}
+
+
+def _archived_rows(dataset: str, geo: str, key: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    path = landing.latest_archive(dataset, geo, key=key)
+    if path is None:
+        return None
+    _, rows = landing.read_archive(path)
+    return rows
+
+
+def _rescore_wastewater(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    geo = _geo_header(payload)
+    rows_by_pathogen: Dict[str, List[Dict[str, Any]]] = {}
+    for res in payload.get("results") or []:
+        rows = _archived_rows(wastewater.DATASET_ID, geo["county_fips"], key=res.get("pcr_target"))
+        if rows is None:
+            return None
+        rows_by_pathogen[res["pathogen"]] = rows
+    if not rows_by_pathogen:
+        return None
+    return wastewater.build_snapshot(payload["zip_code"], geo, rows_by_pathogen)
+
+
+def _rescore_nssp_ed_visits(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    rows = _archived_rows(nssp_visits.DATASET_ID, payload["state_name"], key="trends")
+    if rows is None:
+        return None
+    geo = GeoResult(zip_code=payload["zip_code"], latitude=0.0, longitude=0.0, **_geo_header(payload))
+    summary = nssp_visits.summarize_rows(
+        payload["zip_code"],
+        geo,
+        rows,
+        pathogen=payload["pathogen"],
+        weeks=int(payload["lookback_weeks"]),
+    )
+    return json.loads(json.dumps(asdict(summary), default=str))
+
+
+def _rescore_nssp_ed_trajectories(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    state_name = payload["state_name"]
+    pathogen = payload["pathogen"]
+    weeks = int(payload.get("weeks_requested") or 16)
+    result: Optional[Dict[str, Any]] = None
+
+    if payload.get("granularity") == "county":
+        rows = _archived_rows(trajectories.DATASET_ID, state_name, key="county")
+        if rows is not None:
+            counties = trajectories.county_results_from_rows(payload["state_abbr"], rows, pathogen, weeks)
+            result = counties.get(str(payload.get("county_fips") or "").zfill(5))
+
+    if result is None:
+        strict = _archived_rows(trajectories.DATASET_ID, state_name, key="strict")
+        fallback = _archived_rows(trajectories.DATASET_ID, state_name, key="fallback")
+        if strict is None and fallback is None:
+            return None
+        series, note = trajectories.series_from_state_rows(strict, fallback, weeks, pathogen)
+        result = trajectories.result_from_series(
+            region=f"{payload['state_abbr']} (geography='{state_name}')",
+            series=series,
+            pathogen=pathogen,
+            weeks=weeks,
+            fetch_note=note,
+        )
+        result["geo_level"] = "state"
+
+    out = dict(payload)
+    out["results"] = result
+    out["granularity"] = result.get("geo_level", "state")
+    out["db"] = None
+    return out
+
+
+def _rescore_nssp_ed_county(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    rows = _archived_rows(trajectories.DATASET_ID, payload["state_name"], key="county")
+    if rows is None:
+        return None
+    geo = GeoResult(zip_code=payload["zip_code"], latitude=0.0, longitude=0.0, **_geo_header(payload))
+    return trajectories.county_payload_from_rows(
+        payload["zip_code"],
+        geo,
+        rows,
+        pathogen=payload["pathogen"],
+        weeks=int(payload.get("weeks_requested") or 16),
+    )
+
+
+def _rescore_fluview_severity(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    state_abbr = payload["state_abbr"]
+    raw = _archived_rows("delphi_fluview_clinical", state_abbr.lower())
+    if raw is None:
+        return None
+    rows = severity.clinical_rows_from_epidata(raw, state_abbr.lower())
+    weeks = int(payload.get("weeks_requested") or severity.DEFAULT_WEEKS_LOOKBACK)
+    lab = severity.lab_positivity_from_rows(state_abbr, rows, weeks, severity.DEFAULT_RECENT_WEEKS_SHOWN)
+
+    out = dict(payload)
+    out["results"] = dict(payload.get("results") or {})
+    out["results"]["lab_positivity"] = asdict(lab)
+    out["db"] = None
+    return out
+
+
+RESCORERS: Dict[str, Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]] = {
+    "wastewater": _rescore_wastewater,
+    "nssp_ed_visits": _rescore_nssp_ed_visits,
+    "nssp_ed_county": _rescore_nssp_ed_county,
+    "nssp_ed_trajectories": _rescore_nssp_ed_trajectories,
+    "fluview_severity": _rescore_fluview_severity,
+}
+
+
+def _rescore_task(task: Tuple[str, Dict[str, Any]]) -> Tuple[str, Dict[str, Any], Optional[Dict[str, Any]], Optional[str]]:
+    signal, row = task
+    try:
+        new_payload = RESCORERS[signal](row["payload"])
+        if new_payload is not None:
+            new_payload["generated_at"] = dt.datetime.now(UTC).isoformat(timespec="seconds")
+            new_payload["reprocessed"] = {"from_snapshot_id": row["id"]}
+        return signal, row, new_payload, None
+    except Exception as e:
+        return signal, row, None, str(e)[:300]
+
+
+# ---------------------------
+# DB: load latest snapshots / save re-scored ones
+# ---------------------------
+
+LATEST_SQL = {
+    "signal_snapshots": """
+        SELECT DISTINCT ON (signal_type, COALESCE(geo_level, 'zip'), COALESCE(geo_id, zip_code))
+               id, zip_code, signal_type, geo_level, geo_id, payload, generated_at, checked_at, source_version, data_as_of
+        FROM signal_snapshots
+        WHERE signal_type = ANY(%s)
+        ORDER BY signal_type, COALESCE(geo_level, 'zip'), COALESCE(geo_id, zip_code), generated_at DESC;
+    """,
+    "nssp_ed_trajectories": """
+        SELECT DISTINCT ON (zip_code, pathogen, weeks_requested)
+               id, zip_code, payload, generated_at
+        FROM nssp_ed_trajectories_snapshots
+        ORDER BY zip_code, pathogen, weeks_requested, generated_at DESC;
+    """,
+    "fluview_severity": """
+        SELECT DISTINCT ON (zip_code, weeks_requested)
+               id, zip_code, payload, generated_at
+        FROM fluview_severity_snapshots
+        ORDER BY zip_code, weeks_requested, generated_at DESC;
+    """,
+}
+
+SNAPSHOT_SIGNALS = ("wastewater", "nssp_ed_visits", "nssp_ed_county")
+
+
+def _load_tasks(conn, signals: List[str], zip_code: Optional[str]) -> List[Tuple[str, Dict[str, Any]]]:
+    tasks: List[Tuple[str, Dict[str, Any]]] = []
+    with conn.cursor() as cur:
+        snap_signals = [s for s in signals if s in SNAPSHOT_SIGNALS]
+        if snap_signals:
+            cur.execute(LATEST_SQL["signal_snapshots"], (snap_signals,))
+            tasks.extend((r["signal_type"], dict(r)) for r in cur.fetchall())
+        for st in signals:
+            if st in SNAPSHOT_SIGNALS:
+                continue
+            cur.execute("SELECT to_regclass(%s) AS t;", (f"{st}_snapshots",))
+            if not cur.fetchone()["t"]:
+                continue
+            cur.execute(LATEST_SQL[st])
+            tasks.extend((st, dict(r)) for r in cur.fetchall())
+    if zip_code:
+        tasks = [t for t in tasks if t[1]["zip_code"] == zip_code]
+    return tasks
+
+
+def _save(conn, signal: str, row: Dict[str, Any], payload: Dict[str, Any]) -> None:
+    if signal in SNAPSHOT_SIGNALS:
+        meta = _extract_meta(signal, payload)
+        insert_signal_snapshot(
+            conn,
+            zip_code=row["zip_code"],
+            signal_type=signal,
+            generated_at=_parse_dt(payload.get("generated_at")),
+            payload=payload,
+            risk_level=meta.get("risk_level"),
+            trend=meta.get("trend"),
+            confidence=meta.get("confidence"),
+            composite_score=meta.get("composite_score"),
+            pathogen=meta.get("pathogen"),
+            state=meta.get("state"),
+            county_fips=meta.get("county_fips"),
+            geo_level=row.get("geo_level"),
+            geo_id=row.get("geo_id"),
+            source_version=row.get("source_version"),
+            checked_at=row.get("checked_at") or row.get("generated_at"),
+            data_as_of=meta.get("data_as_of") or row.get("data_as_of"),
+        )
+        return
+
+    with conn.cursor() as cur:
+        if signal == "nssp_ed_trajectories":
+            cur.execute(
+                """
+                INSERT INTO nssp_ed_trajectories_snapshots
+                  (zip_code, state_abbr, pathogen, weeks_requested, generated_at, payload)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT DO NOTHING;
+                """,
+                (
+                    row["zip_code"],
+                    payload.get("state_abbr"),
+                    payload.get("pathogen"),
+                    int(payload.get("weeks_requested") or 0),
+                    payload.get("generated_at"),
+                    json.dumps(payload, default=str),
+                ),
+            )
+        elif signal == "fluview_severity":
+            cur.execute(
+                """
+                INSERT INTO fluview_severity_snapshots
+                  (zip_code, state_abbr, weeks_requested, generated_at, payload)
+                VALUES (%s, %s, %s, %s, %s);
+                """,
+                (
+                    row["zip_code"],
+                    payload.get("state_abbr"),
+                    int(payload.get("weeks_requested") or 0),
+                    payload.get("generated_at"),
+                    json.dumps(payload, default=str),
+                ),
+            )
+
+
+def _risk_of(signal: str, payload: Optional[Dict[str, Any]]) -> Optional[str]:
+    if not payload:
+        return None
+    if signal == "wastewater":
+        return (payload.get("rollup") or {}).get("overall_level")
+    if signal == "fluview_severity":
+        return ((payload.get("results") or {}).get("lab_positivity") or {}).get("risk")
+    if signal in ("nssp_ed_county", "nssp_ed_trajectories"):
+        return (payload.get("results") or {}).get("risk")
+    return payload.get("risk")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Re-score snapshots from the raw landing zone (no network).")
+    ap.add_argument("--signals", default=",".join(RESCORERS), help=f"comma list (default: {','.join(RESCORERS)})")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes (default: CPU count)")
+    ap.add_argument("--zip", default=None, help="only this ZIP")
+    ap.add_argument("--dry-run", action="store_true", help="re-score and report, but don't write snapshots")
+    args = ap.parse_args()
+
+    if landing.landing_root() is None:
+        raise SystemExit("UVCEED_LANDING_DIR is not set; nothing to reprocess.")
+
+    signals = [s.strip() for s in args.signals.split(",") if s.strip()]
+    unknown = [s for s in signals if s not in RESCORERS]
+    if unknown:
+        raise SystemExit(f"Unknown signals: {unknown} (choose from {list(RESCORERS)})")
+
+    started = time.monotonic()
+    counts = {"tasks": 0, "rescored": 0, "no_archive": 0, "errors": 0, "risk_changed": 0}
+
+    with db_conn() as conn:
+        ensure_phase3_schema(conn)
+        tasks = _load_tasks(conn, signals, args.zip)
+        counts["tasks"] = len(tasks)
+        print(f"reprocess: {len(tasks)} snapshots, workers={args.workers}, dry_run={args.dry_run}")
+
+        chunksize = max(1, len(tasks) // (max(1, args.workers) * 8))
+        with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            for i, (signal, row, new_payload, err) in enumerate(
+                pool.map(_rescore_task, tasks, chunksize=chunksize), start=1
+            ):
+                if err:
+                    counts["errors"] += 1
+                    print(f"WARN {signal} zip={row['zip_code']}: {err}")
+                    continue
+                if new_payload is None:
+                    counts["no_archive"] += 1
+                    continue
+
+                counts["rescored"] += 1
+                if _risk_of(signal, row["payload"]) != _risk_of(signal, new_payload):
+                    counts["risk_changed"] += 1
+                if not args.dry_run:
+                    _save(conn, signal, row, new_payload)
+                    if i % 500 == 0:
+                        conn.commit()
+
+    elapsed = time.monotonic() - started
+    print(
+        "OK: "
+        + " ".join(f"{k}={v}" for k, v in counts.items())
+        + f" elapsed={elapsed:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
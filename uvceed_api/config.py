@@ -13,19 +13,95 @@ def load_env() -> Path:
 
 ENV_PATH = load_env()
 
+# Apply pending sql/migrations when the API starts (off: only `python3 -m uvceed_api.db_migrate` does)
+MIGRATE_ON_STARTUP = os.getenv("UVCEED_MIGRATE_ON_STARTUP", "1").strip().lower() not in ("0", "false", "no")
+
+# Postgres connection pool (per process); UVCEED_DB_POOL=0 connects per db_conn() as before
+DB_POOL = os.getenv("UVCEED_DB_POOL", "1").strip().lower() not in ("0", "false", "no")
+DB_POOL_MIN = int(os.getenv("UVCEED_DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("UVCEED_DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("UVCEED_DB_POOL_TIMEOUT_SECONDS", "10"))
+DB_POOL_MAX_LIFETIME_SECONDS = float(os.getenv("UVCEED_DB_POOL_MAX_LIFETIME_SECONDS", "1800"))
+DB_POOL_MAX_IDLE_SECONDS = float(os.getenv("UVCEED_DB_POOL_MAX_IDLE_SECONDS", "300"))
+# probe a pooled connection with SELECT 1 if it sat idle longer than this
+DB_POOL_CHECK_AFTER_SECONDS = float(os.getenv("UVCEED_DB_POOL_CHECK_AFTER_SECONDS", "30"))
+
+# Async (psycopg 3) pool for the event-loop request path; UVCEED_ASYNC_DB=0 serves everything from the sync pool
+ASYNC_DB = os.getenv("UVCEED_ASYNC_DB", "1").strip().lower() not in ("0", "false", "no")
+ASYNC_DB_POOL_MAX = int(os.getenv("UVCEED_ASYNC_DB_POOL_MAX", "10"))
+
 # Auth
 UVCEED_API_KEY = os.getenv("UVCEED_API_KEY", "").strip()
 
 # Signals exposed by /signals/latest
-SIGNAL_TYPES = ["wastewater", "nssp_ed_visits"]
+SIGNAL_TYPES = ["wastewater", "nssp_ed_visits", "nssp_ed_county"]
+
+# Geography each signal is computed and cached at (snapshots are shared by all ZIPs in it)
+SIGNAL_GEO_LEVEL = {
+    "wastewater": os.getenv("UVCEED_GEO_LEVEL_WASTEWATER", "county").strip() or "county",
+    "nssp_ed_visits": os.getenv("UVCEED_GEO_LEVEL_NSSP_ED_VISITS", "state").strip() or "state",
+    # county series of the NSSP trajectories dataset (one state-wide pull serves every county)
+    "nssp_ed_county": "county",
+}
 
 # Refresh behavior
 REFRESH_TIMEOUT_SECONDS = int(os.getenv("UVCEED_REFRESH_TIMEOUT_SECONDS", "55"))
+# refresh leases outlive the timeout by this much before another process may take over
+REFRESH_LEASE_GRACE_SECONDS = int(os.getenv("UVCEED_REFRESH_LEASE_GRACE_SECONDS", "30"))
+# when another caller already holds the lease, wait this long for its snapshot instead of skipping
+REFRESH_INFLIGHT_WAIT_SECONDS = float(os.getenv("UVCEED_REFRESH_INFLIGHT_WAIT_SECONDS", str(REFRESH_TIMEOUT_SECONDS)))
+# "inprocess" (thread pool calling uvceed_alerts directly) or "subprocess" (legacy)
+REFRESH_ENGINE = (os.getenv("UVCEED_REFRESH_ENGINE", "inprocess") or "inprocess").strip().lower()
+REFRESH_WORKERS = int(os.getenv("UVCEED_REFRESH_WORKERS", "8"))
+# signals fetched at once for a single ZIP
+REFRESH_MAX_PARALLEL = int(os.getenv("UVCEED_REFRESH_MAX_PARALLEL", "4"))
+
+# Stale-while-revalidate: serve stale snapshots immediately and refresh in the background
+SWR_DEFAULT = os.getenv("UVCEED_SWR", "1").strip().lower() not in ("0", "false", "no")
+REFRESH_BACKGROUND_WORKERS = int(os.getenv("UVCEED_REFRESH_BACKGROUND_WORKERS", "4"))
+
+# API-wide cap on concurrent on-demand refreshes (per process); excess waits briefly in a bounded queue, then is shed
+REFRESH_LIMIT_CONCURRENT = int(os.getenv("UVCEED_REFRESH_LIMIT_CONCURRENT", "8"))
+REFRESH_LIMIT_QUEUE = int(os.getenv("UVCEED_REFRESH_LIMIT_QUEUE", "16"))
+REFRESH_LIMIT_WAIT_MS = int(os.getenv("UVCEED_REFRESH_LIMIT_WAIT_MS", "2000"))
+REFRESH_RETRY_AFTER_SECONDS = int(os.getenv("UVCEED_REFRESH_RETRY_AFTER_SECONDS", "30"))
+
+# Per-worker cache of fresh /signals/latest bodies, invalidated by NOTIFY on new snapshots
+RESPONSE_CACHE = os.getenv("UVCEED_RESPONSE_CACHE", "1").strip().lower() not in ("0", "false", "no")
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("UVCEED_RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("UVCEED_RESPONSE_CACHE_TTL_SECONDS", "300"))
+# cache hits still count towards zip_requests popularity; they are written in batches this often
+RESPONSE_CACHE_FLUSH_SECONDS = float(os.getenv("UVCEED_RESPONSE_CACHE_FLUSH_SECONDS", "5"))
+
+# Queue mode: API/cron only enqueue into refresh_jobs; `python -m uvceed_api.worker` does the ingestion
+REFRESH_QUEUE = os.getenv("UVCEED_REFRESH_QUEUE", "0").strip().lower() not in ("0", "false", "no")
+WORKER_CONCURRENCY = int(os.getenv("UVCEED_WORKER_CONCURRENCY", "4"))
+
+# Refresh-ahead daemon (`python -m uvceed_api.refresher`)
+POPULARITY_HALF_LIFE_HOURS = float(os.getenv("UVCEED_POPULARITY_HALF_LIFE_HOURS", "72"))
+REFRESHER_TICK_SECONDS = float(os.getenv("UVCEED_REFRESHER_TICK_SECONDS", "60"))
+# hot ZIPs are refreshed up to this long before they go stale; colder ZIPs proportionally later
+REFRESHER_LEAD_MINUTES = float(os.getenv("UVCEED_REFRESHER_LEAD_MINUTES", "60"))
+# decayed request score at which a ZIP counts as fully hot
+REFRESHER_HOT_SCORE = float(os.getenv("UVCEED_REFRESHER_HOT_SCORE", "10"))
+REFRESHER_MAX_PER_MINUTE = float(os.getenv("UVCEED_REFRESHER_MAX_PER_MINUTE", "30"))
+REFRESHER_CONCURRENCY = int(os.getenv("UVCEED_REFRESHER_CONCURRENCY", "2"))
+REFRESHER_DAYS = int(os.getenv("UVCEED_REFRESHER_DAYS", "30"))
 
 # per-signal cache TTL (staleness threshold)
 TTL_HOURS_WASTEWATER = float(os.getenv("UVCEED_TTL_HOURS_WASTEWATER", "12"))
 TTL_HOURS_NSSP_ED_VISITS = float(os.getenv("UVCEED_TTL_HOURS_NSSP_ED_VISITS", "12"))
 
+# Publication-aware staleness (uvceed_api.cadence); rows without data_as_of use the fixed TTLs above
+ADAPTIVE_TTL = os.getenv("UVCEED_ADAPTIVE_TTL", "1").strip().lower() not in ("0", "false", "no")
+CADENCE_LAG_HOURS_WASTEWATER = float(os.getenv("UVCEED_CADENCE_LAG_HOURS_WASTEWATER", "96"))
+CADENCE_LAG_HOURS_NSSP_ED_VISITS = float(os.getenv("UVCEED_CADENCE_LAG_HOURS_NSSP_ED_VISITS", "144"))
+CADENCE_RETRY_HOURS = float(os.getenv("UVCEED_CADENCE_RETRY_HOURS", "6"))
+CADENCE_MAX_AGE_HOURS = float(os.getenv("UVCEED_CADENCE_MAX_AGE_HOURS", "168"))
+
+# Skip re-ingestion when the upstream dataset hasn't changed since the last snapshot
+FRESHNESS_GATE = os.getenv("UVCEED_FRESHNESS_GATE", "1").strip().lower() not in ("0", "false", "no")
+
 # NSSP config
 NSSP_PATHOGEN = (os.getenv("UVCEED_NSSP_PATHOGEN", "combined") or "combined").strip()
 NSSP_WEEKS = int(os.getenv("UVCEED_NSSP_WEEKS", "16"))
@@ -1,11 +1,16 @@
 import os
+import threading
 import datetime as dt
 from contextlib import contextmanager
-from typing import Any, Dict, Iterable, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import psycopg2
 from psycopg2.extras import RealDictCursor, Json
 
+from . import config
+from .migrations import migrate
+from .pool import ConnectionPool
+
 UTC = dt.timezone.utc
 
 def get_database_url() -> str:
@@ -14,69 +19,293 @@ def get_database_url() -> str:
         raise RuntimeError("DATABASE_URL is not set")
     return url
 
+def _connect():
+    return psycopg2.connect(get_database_url(), cursor_factory=RealDictCursor)
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    _connect,
+                    min_size=config.DB_POOL_MIN,
+                    max_size=config.DB_POOL_MAX,
+                    max_lifetime_s=config.DB_POOL_MAX_LIFETIME_SECONDS,
+                    max_idle_s=config.DB_POOL_MAX_IDLE_SECONDS,
+                    check_after_s=config.DB_POOL_CHECK_AFTER_SECONDS,
+                    timeout_s=config.DB_POOL_TIMEOUT_SECONDS,
+                )
+    return _pool
+
+def pool_stats() -> Optional[Dict[str, Any]]:
+    return _pool.stats() if _pool is not None else None
+
 @contextmanager
 def db_conn():
-    conn = psycopg2.connect(get_database_url(), cursor_factory=RealDictCursor)
+    """Connection from the process pool; commits on success, rolls back on error."""
+    if not config.DB_POOL:
+        conn = _connect()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return
+
+    pool = get_pool()
+    conn = pool.getconn()
+    broken = False
     try:
         yield conn
         conn.commit()
     except Exception:
-        conn.rollback()
+        try:
+            conn.rollback()
+        except Exception:
+            broken = True
         raise
     finally:
-        conn.close()
+        pool.putconn(conn, discard=broken or bool(conn.closed))
 
 def ensure_phase3_schema(conn) -> None:
+    """Apply pending sql/migrations (deploy/startup and CLIs; request paths use check_schema_version)."""
+    migrate(conn)
+
+UPSERT_ZIP_REQUEST_SQL = """
+INSERT INTO zip_requests(zip_code, request_count, popularity)
+VALUES (%s, 1, 1)
+ON CONFLICT (zip_code)
+DO UPDATE SET
+  last_requested_at = now(),
+  request_count = zip_requests.request_count + 1,
+  popularity = zip_requests.popularity
+    * power(0.5, extract(epoch FROM now() - zip_requests.last_requested_at) / (%s * 3600.0))
+    + 1;
+"""
+
+def upsert_zip_request(conn, zip_code: str, half_life_hours: float = 72.0) -> None:
+    """Record a request: bump request_count and the exponentially decayed popularity score."""
     with conn.cursor() as cur:
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS signal_snapshots (
-          id bigserial PRIMARY KEY,
-          zip_code text NOT NULL,
-          signal_type text NOT NULL,
-          generated_at timestamptz NOT NULL,
-          payload jsonb NOT NULL,
-          pathogen text,
-          geo_level text,
-          geo_id text,
-          state text,
-          county_fips text,
-          risk_level text,
-          trend text,
-          confidence text,
-          composite_score double precision
-        );
-        """)
-        cur.execute("""
-        CREATE INDEX IF NOT EXISTS idx_signal_snapshots_zip_type_time
-          ON signal_snapshots(zip_code, signal_type, generated_at DESC);
-        """)
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS zip_requests (
-          zip_code text PRIMARY KEY,
-          first_requested_at timestamptz NOT NULL DEFAULT now(),
-          last_requested_at timestamptz NOT NULL DEFAULT now(),
-          last_refreshed_at timestamptz
-        );
-        """)
-        cur.execute("""
-        CREATE INDEX IF NOT EXISTS idx_zip_requests_last_requested
-          ON zip_requests(last_requested_at DESC);
-        """)
-        cur.execute("""
-        CREATE INDEX IF NOT EXISTS idx_zip_requests_last_refreshed
-          ON zip_requests(last_refreshed_at DESC);
-        """)
-
-def upsert_zip_request(conn, zip_code: str) -> None:
+        cur.execute(UPSERT_ZIP_REQUEST_SQL, (zip_code, half_life_hours))
+
+def record_zip_requests(conn, counts: Dict[str, int], half_life_hours: float = 72.0) -> None:
+    """Batched upsert_zip_request: add n requests per ZIP (response-cache hits are flushed this way)."""
+    if not counts:
+        return
+    zips = list(counts)
     with conn.cursor() as cur:
         cur.execute(
             """
-            INSERT INTO zip_requests(zip_code)
-            VALUES (%s)
+            INSERT INTO zip_requests(zip_code, request_count, popularity)
+            SELECT z, n, n FROM unnest(%s::text[], %s::int[]) AS t(z, n)
             ON CONFLICT (zip_code)
-            DO UPDATE SET last_requested_at = now();
+            DO UPDATE SET
+              last_requested_at = now(),
+              request_count = zip_requests.request_count + EXCLUDED.request_count,
+              popularity = zip_requests.popularity
+                * power(0.5, extract(epoch FROM now() - zip_requests.last_requested_at) / (%s * 3600.0))
+                + EXCLUDED.popularity;
             """,
-            (zip_code,),
+            (zips, [int(counts[z]) for z in zips], half_life_hours),
+        )
+
+# Read statements shared with the async request path (uvceed_api.adb)
+SNAPSHOT_COLUMNS = (
+    "id", "zip_code", "signal_type", "generated_at", "payload", "pathogen", "geo_level", "geo_id",
+    "state", "county_fips", "risk_level", "trend", "confidence", "composite_score",
+    "source_version", "checked_at", "data_as_of",
+)
+
+# Payload fields describing the ZIP a snapshot was computed for. County/state snapshots are
+# shared by every ZIP in that geography, so the read paths overwrite them from the
+# requesting ZIP's zip_geo row (payload text stays produced by Postgres, see render.py).
+ZIP_LOCATION_FIELDS = ("zip_code", "place", "state_name", "state_abbr", "county_name", "county_fips")
+
+def _local_payload_sql(s: str, g: str) -> str:
+    """payload::text of snapshot alias s with ZIP_LOCATION_FIELDS taken from zip_geo alias g."""
+    fields = ", ".join(f"'{f}', {g}.{f}" for f in ZIP_LOCATION_FIELDS)
+    return (
+        f"(CASE WHEN {s}.geo_level = 'zip' OR {g}.zip_code IS NULL THEN {s}.payload"
+        f" ELSE {s}.payload || jsonb_build_object({fields}) END)::text"
+    )
+
+def localize_payload(row: Optional[Dict[str, Any]], geo: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Python side of _local_payload_sql for a row read with SELECT * (payload decoded); geo is a zip_geo row."""
+    if not row or geo is None or row.get("geo_level") == "zip" or not isinstance(row.get("payload"), dict):
+        return row
+    payload = dict(row["payload"])
+    payload.update({f: geo.get(f) for f in ZIP_LOCATION_FIELDS})
+    return {**row, "payload": payload}
+
+def _register_and_read_sql(columns: Iterable[str]) -> str:
+    return """
+WITH req AS (
+  INSERT INTO zip_requests(zip_code, request_count, popularity)
+  VALUES (%(zip)s, 1, 1)
+  ON CONFLICT (zip_code)
+  DO UPDATE SET
+    last_requested_at = now(),
+    request_count = zip_requests.request_count + 1,
+    popularity = zip_requests.popularity
+      * power(0.5, extract(epoch FROM now() - zip_requests.last_requested_at) / (%(half_life)s * 3600.0))
+      + 1
+),
+g AS (
+  SELECT zip_code, place, state_name, state_abbr, county_name, county_fips
+  FROM zip_geo
+  WHERE zip_code = %(zip)s AND resolved_at >= now() - %(geo_age)s * interval '1 day'
+),
+k AS (
+  SELECT t.signal_type AS k_signal_type,
+         CASE WHEN t.lvl = 'county' AND coalesce(g.county_fips, '') <> '' THEN 'county'
+              WHEN t.lvl = 'state' AND coalesce(g.state_abbr, '') <> '' THEN 'state'
+              ELSE 'zip' END AS k_geo_level,
+         CASE WHEN t.lvl = 'county' AND coalesce(g.county_fips, '') <> '' THEN g.county_fips
+              WHEN t.lvl = 'state' AND coalesce(g.state_abbr, '') <> '' THEN g.state_abbr
+              ELSE %(zip)s END AS k_geo_id,
+         EXISTS (SELECT 1 FROM g) AS k_geo_cached
+  FROM unnest(%(types)s::text[], %(levels)s::text[]) AS t(signal_type, lvl)
+  LEFT JOIN g ON true
+)
+SELECT k.*, """ + ", ".join(f"g.{f} AS zip_geo_{f}" for f in ZIP_LOCATION_FIELDS) + ", " + ", ".join(
+    _local_payload_sql("s", "g") + " AS payload" if c == "payload" else f"s.{c}" for c in columns
+) + """
+FROM k
+LEFT JOIN g ON true
+LEFT JOIN LATERAL (
+  SELECT *
+  FROM signal_snapshots x
+  WHERE x.signal_type = k.k_signal_type AND x.geo_level = k.k_geo_level AND x.geo_id = k.k_geo_id
+  ORDER BY x.generated_at DESC
+  LIMIT 1
+) s ON true;
+"""
+
+REGISTER_AND_READ_LATEST_SQL = _register_and_read_sql(SNAPSHOT_COLUMNS)
+# Same without payloads: validators for conditional requests (ETag / If-Modified-Since)
+REGISTER_AND_READ_HEADS_SQL = _register_and_read_sql(c for c in SNAPSHOT_COLUMNS if c != "payload")
+
+SNAPSHOT_PAYLOADS_SQL = (
+    "SELECT s.id, " + _local_payload_sql("s", "g") + " AS payload"
+    " FROM signal_snapshots s LEFT JOIN zip_geo g ON g.zip_code = %s"
+    " WHERE s.id = ANY(%s);"
+)
+
+def register_params(
+    zip_code: str,
+    signal_geo_level: Dict[str, str],
+    half_life_hours: float = 72.0,
+    geo_max_age_days: int = 90,
+) -> Dict[str, Any]:
+    types = list(signal_geo_level)
+    return {
+        "zip": zip_code,
+        "half_life": half_life_hours,
+        "geo_age": geo_max_age_days,
+        "types": types,
+        "levels": [signal_geo_level[st] for st in types],
+    }
+
+def parse_register_result(
+    result: List[Dict[str, Any]],
+) -> Optional[Tuple[Dict[str, Tuple[str, str]], Dict[str, Optional[Dict[str, Any]]]]]:
+    if not result or not result[0]["k_geo_cached"]:
+        return None
+    geo = {f: result[0][f"zip_geo_{f}"] for f in ZIP_LOCATION_FIELDS}
+    keys: Dict[str, Tuple[str, str]] = {}
+    rows: Dict[str, Optional[Dict[str, Any]]] = {}
+    for r in result:
+        st = r["k_signal_type"]
+        keys[st] = (r["k_geo_level"], r["k_geo_id"])
+        rows[st] = {**{c: r[c] for c in SNAPSHOT_COLUMNS if c in r}, "zip_geo": geo} if r["id"] is not None else None
+    return keys, rows
+
+def register_and_read_latest(
+    conn,
+    zip_code: str,
+    signal_geo_level: Dict[str, str],
+    half_life_hours: float = 72.0,
+    geo_max_age_days: int = 90,
+    payloads: bool = True,
+) -> Optional[Tuple[Dict[str, Tuple[str, str]], Dict[str, Optional[Dict[str, Any]]]]]:
+    """One statement: record the request, map the ZIP to each signal's geo key, read the latest snapshots.
+
+    Returns (geo key per signal, latest row per signal), or None when the ZIP isn't
+    in the zip_geo cache yet (the caller resolves it upstream and reads again).
+    The request is recorded either way. Geo keys follow geo.geo_key. Row payloads
+    come back as JSON text (payload::text) for render.render_latest to pass through,
+    with ZIP_LOCATION_FIELDS set for zip_code; with payloads=False rows have no "payload" key (see snapshot_payloads).
+    Each row also carries "zip_geo", the zip_geo location it was localized from.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            REGISTER_AND_READ_LATEST_SQL if payloads else REGISTER_AND_READ_HEADS_SQL,
+            register_params(zip_code, signal_geo_level, half_life_hours, geo_max_age_days),
+        )
+        return parse_register_result(cur.fetchall())
+
+def snapshot_payloads(conn, zip_code: str, ids: List[int]) -> Dict[int, str]:
+    """id -> payload JSON text as served to zip_code, for rows read without payloads."""
+    if not ids:
+        return {}
+    with conn.cursor() as cur:
+        cur.execute(SNAPSHOT_PAYLOADS_SQL, (zip_code, list(ids)))
+        return {int(r["id"]): r["payload"] for r in cur.fetchall()}
+
+def requested_zip_popularity(conn, days: int, half_life_hours: float = 72.0) -> List[Dict[str, Any]]:
+    """ZIPs requested within `days` with their popularity decayed to now, most popular first."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT zip_code,
+                   request_count,
+                   popularity * power(0.5, extract(epoch FROM now() - last_requested_at) / (%s * 3600.0)) AS popularity
+            FROM zip_requests
+            WHERE last_requested_at >= now() - %s * interval '1 day'
+            ORDER BY popularity DESC;
+            """,
+            (half_life_hours, days),
+        )
+        return list(cur.fetchall())
+
+def get_zip_geos(conn, zip_codes: Iterable[str], max_age_days: int = 90) -> Dict[str, Dict[str, Any]]:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT *
+            FROM zip_geo
+            WHERE zip_code = ANY(%s)
+              AND resolved_at >= now() - %s * interval '1 day';
+            """,
+            (list(zip_codes), max_age_days),
+        )
+        return {r["zip_code"]: r for r in cur.fetchall()}
+
+def upsert_zip_geo(conn, geo: Dict[str, Any]) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO zip_geo(zip_code, place, state_abbr, state_name, latitude, longitude, county_name, county_fips)
+            VALUES (%(zip_code)s, %(place)s, %(state_abbr)s, %(state_name)s, %(latitude)s, %(longitude)s, %(county_name)s, %(county_fips)s)
+            ON CONFLICT (zip_code)
+            DO UPDATE SET
+              place = EXCLUDED.place,
+              state_abbr = EXCLUDED.state_abbr,
+              state_name = EXCLUDED.state_name,
+              latitude = EXCLUDED.latitude,
+              longitude = EXCLUDED.longitude,
+              county_name = EXCLUDED.county_name,
+              county_fips = EXCLUDED.county_fips,
+              resolved_at = now();
+            """,
+            geo,
         )
 
 def mark_zip_refreshed(conn, zip_code: str) -> None:
@@ -90,25 +319,101 @@ def mark_zip_refreshed(conn, zip_code: str) -> None:
             (zip_code,),
         )
 
-def latest_snapshots(conn, zip_code: str, signal_types: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+LATEST_GEO_SNAPSHOT_SQL = """
+SELECT *
+FROM signal_snapshots
+WHERE signal_type = %s AND geo_level = %s AND geo_id = %s
+ORDER BY generated_at DESC
+LIMIT 1;
+"""
+
+def latest_geo_snapshots(conn, keys: Dict[str, Tuple[str, str]]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Latest snapshot per signal for its (geo_level, geo_id) key, whichever ZIP computed it."""
     out: Dict[str, Optional[Dict[str, Any]]] = {}
     with conn.cursor() as cur:
-        for st in signal_types:
+        for st, (geo_level, geo_id) in keys.items():
+            cur.execute(LATEST_GEO_SNAPSHOT_SQL, (st, geo_level, geo_id))
+            out[st] = cur.fetchone()
+    return out
+
+def latest_snapshot_heads(conn, keys: Iterable[Tuple[str, str, str]]) -> Dict[Tuple[str, str, str], Dict[str, Any]]:
+    """(signal_type, geo_level, geo_id) -> freshness columns of its latest snapshot (no payload)."""
+    keys = list(keys)
+    if not keys:
+        return {}
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT DISTINCT ON (s.signal_type, s.geo_level, s.geo_id)
+                   s.id, s.signal_type, s.geo_level, s.geo_id, s.generated_at, s.checked_at, s.data_as_of
+            FROM signal_snapshots s
+            JOIN unnest(%s::text[], %s::text[], %s::text[]) AS k(signal_type, geo_level, geo_id)
+              ON s.signal_type = k.signal_type AND s.geo_level = k.geo_level AND s.geo_id = k.geo_id
+            ORDER BY s.signal_type, s.geo_level, s.geo_id, s.generated_at DESC;
+            """,
+            ([k[0] for k in keys], [k[1] for k in keys], [k[2] for k in keys]),
+        )
+        return {(r["signal_type"], r["geo_level"], r["geo_id"]): dict(r) for r in cur.fetchall()}
+
+def backfill_snapshot_geo(conn, signal_geo_level: Dict[str, str]) -> int:
+    """Fill geo_level/geo_id on rows written before geo-keyed storage (idempotent)."""
+    n = 0
+    with conn.cursor() as cur:
+        for st, level in signal_geo_level.items():
+            col = {"county": "county_fips", "state": "state"}.get(level, "zip_code")
             cur.execute(
-                """
-                SELECT *
-                FROM signal_snapshots
-                WHERE zip_code = %s AND signal_type = %s
-                ORDER BY generated_at DESC
-                LIMIT 1;
+                f"""
+                UPDATE signal_snapshots
+                SET geo_level = %s, geo_id = {col}
+                WHERE signal_type = %s AND geo_level IS NULL AND {col} IS NOT NULL;
                 """,
-                (zip_code, st),
+                (level if col != "zip_code" else "zip", st),
             )
-            out[st] = cur.fetchone()
-    return out
+            n += cur.rowcount
+    return n
 
-def insert_signal_snapshot(
-    conn,
+def backfill_snapshot_data_as_of(conn) -> int:
+    """Fill data_as_of on NSSP rows from their payload's latest week_end (idempotent).
+
+    Older wastewater payloads carry no sample dates; those rows keep the fixed TTL.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE signal_snapshots s
+            SET data_as_of = (
+              SELECT max(left(p->>'week_end', 10))::date
+              FROM jsonb_array_elements(s.payload->'points') p
+            )
+            WHERE s.signal_type = 'nssp_ed_visits'
+              AND s.data_as_of IS NULL
+              AND jsonb_typeof(s.payload->'points') = 'array'
+              AND jsonb_array_length(s.payload->'points') > 0;
+            """
+        )
+        return cur.rowcount
+
+INSERT_SIGNAL_SNAPSHOT_SQL = """
+INSERT INTO signal_snapshots(
+    zip_code, signal_type, generated_at, payload,
+    pathogen, geo_level, geo_id, state, county_fips,
+    risk_level, trend, confidence, composite_score,
+    source_version, checked_at, data_as_of
+)
+VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+RETURNING id;
+"""
+
+# NOTIFY channel for new snapshots; payload "signal_type:geo_level:geo_id" (response_cache listens)
+SNAPSHOT_CHANNEL = "uvceed_snapshots"
+SNAPSHOT_NOTIFY_SQL = "SELECT pg_notify(%s, %s);"
+
+def snapshot_notify_params(fields: Dict[str, Any]) -> Tuple[str, str]:
+    geo_level = fields.get("geo_level") or "zip"
+    geo_id = fields.get("geo_id") or fields["zip_code"]
+    return SNAPSHOT_CHANNEL, f"{fields['signal_type']}:{geo_level}:{geo_id}"
+
+def signal_snapshot_params(
     *,
     zip_code: str,
     signal_type: str,
@@ -123,49 +428,88 @@ def insert_signal_snapshot(
     county_fips: Optional[str] = None,
     geo_level: Optional[str] = None,
     geo_id: Optional[str] = None,
-) -> int:
+    source_version: Optional[str] = None,
+    checked_at: Optional[dt.datetime] = None,
+    data_as_of: Optional[str] = None,
+) -> Tuple[Any, ...]:
+    """INSERT_SIGNAL_SNAPSHOT_SQL parameters."""
     if generated_at.tzinfo is None:
         generated_at = generated_at.replace(tzinfo=UTC)
+    return (
+        zip_code,
+        signal_type,
+        generated_at,
+        Json(payload),
+        pathogen,
+        geo_level,
+        geo_id,
+        state,
+        county_fips,
+        risk_level,
+        trend,
+        confidence,
+        composite_score,
+        source_version,
+        checked_at,
+        data_as_of,
+    )
 
+def insert_signal_snapshot(conn, **fields: Any) -> int:
+    """Insert one signal_snapshots row (keyword fields as in signal_snapshot_params); returns its id."""
+    with conn.cursor() as cur:
+        cur.execute(INSERT_SIGNAL_SNAPSHOT_SQL, signal_snapshot_params(**fields))
+        row = cur.fetchone()
+        # Delivered on commit, so listeners never see a snapshot they can't read yet
+        cur.execute(SNAPSHOT_NOTIFY_SQL, snapshot_notify_params(fields))
+        return int(row["id"])
+
+def touch_snapshot(conn, snapshot_id: int) -> None:
+    """Extend a snapshot's validity (upstream unchanged) without re-ingesting."""
     with conn.cursor() as cur:
         cur.execute(
             """
-            INSERT INTO signal_snapshots(
-                zip_code, signal_type, generated_at, payload,
-                pathogen, geo_level, geo_id, state, county_fips,
-                risk_level, trend, confidence, composite_score
-            )
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            RETURNING id;
+            UPDATE signal_snapshots
+            SET checked_at = now()
+            WHERE id = %s;
             """,
-            (
-                zip_code,
-                signal_type,
-                generated_at,
-                Json(payload),
-                pathogen,
-                geo_level,
-                geo_id,
-                state,
-                county_fips,
-                risk_level,
-                trend,
-                confidence,
-                composite_score,
-            ),
+            (snapshot_id,),
         )
-        row = cur.fetchone()
-        return int(row["id"])
 
-def advisory_key(zip_code: str, signal_type: str) -> str:
-    return f"uvceed_refresh:{zip_code}:{signal_type}"
+def refresh_lock_key(scope: str, signal_type: str) -> str:
+    """scope is the geo key ("county:17031") or a ZIP."""
+    return f"uvceed_refresh:{scope}:{signal_type}"
+
+def acquire_lease(conn, lock_key: str, owner: str, ttl_seconds: float) -> bool:
+    """Take (or take over an expired) refresh lease. Commit promptly so others see it.
 
-def try_advisory_lock(conn, key: str) -> bool:
+    Unlike a session advisory lock, a lease survives the connection being
+    returned, so no connection has to be held while upstream work runs.
+    """
     with conn.cursor() as cur:
-        cur.execute("SELECT pg_try_advisory_lock(hashtext(%s)::bigint) AS locked;", (key,))
-        row = cur.fetchone()
-        return bool(row["locked"])
+        cur.execute(
+            """
+            INSERT INTO refresh_leases(lock_key, owner, acquired_at, expires_at)
+            VALUES (%s, %s, now(), now() + %s * interval '1 second')
+            ON CONFLICT (lock_key) DO UPDATE
+              SET owner = EXCLUDED.owner,
+                  acquired_at = EXCLUDED.acquired_at,
+                  expires_at = EXCLUDED.expires_at
+              WHERE refresh_leases.expires_at < now()
+            RETURNING owner;
+            """,
+            (lock_key, owner, ttl_seconds),
+        )
+        return cur.fetchone() is not None
+
+def release_lease(conn, lock_key: str, owner: str) -> None:
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM refresh_leases WHERE lock_key = %s AND owner = %s;", (lock_key, owner))
 
-def advisory_unlock(conn, key: str) -> None:
+def active_leases(conn, lock_keys: Iterable[str]) -> set:
+    """Subset of lock_keys currently leased (not expired)."""
     with conn.cursor() as cur:
-        cur.execute("SELECT pg_advisory_unlock(hashtext(%s)::bigint);", (key,))
+        cur.execute(
+            "SELECT lock_key FROM refresh_leases WHERE lock_key = ANY(%s) AND expires_at > now();",
+            (list(lock_keys),),
+        )
+        return {r["lock_key"] for r in cur.fetchall()}
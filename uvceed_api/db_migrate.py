@@ -1,9 +1,38 @@
-from .db import db_conn, ensure_phase3_schema
+import argparse
+
+from . import config
+from .db import backfill_snapshot_data_as_of, backfill_snapshot_geo, db_conn
+from .migrations import MIGRATIONS, SCHEMA_VERSION, applied_migrations, migrate
 
 def main():
+    ap = argparse.ArgumentParser(description="Apply pending sql/migrations and run data backfills.")
+    ap.add_argument("--status", action="store_true", help="List migrations and whether each is applied; change nothing")
+    args = ap.parse_args()
+
     with db_conn() as conn:
-        ensure_phase3_schema(conn)
-    print("OK: Phase 3 schema ensured (signal_snapshots + zip_requests + indexes).")
+        if args.status:
+            applied = applied_migrations(conn)
+            for m in MIGRATIONS:
+                row = applied.get(m.version)
+                if row is None:
+                    state = "pending"
+                elif row["checksum"] != m.checksum:
+                    state = f"applied {row['applied_at']:%Y-%m-%d} (file changed since)"
+                else:
+                    state = f"applied {row['applied_at']:%Y-%m-%d}"
+                print(f"{m.version:04d}_{m.name}: {state}")
+            return
+
+        done = migrate(conn)
+        backfilled = backfill_snapshot_geo(conn, config.SIGNAL_GEO_LEVEL)
+        as_of = backfill_snapshot_data_as_of(conn)
+    for m in done:
+        print(f"OK: applied migration {m.version:04d}_{m.name}")
+    print(f"OK: schema at version {SCHEMA_VERSION} (sql/migrations).")
+    if backfilled:
+        print(f"OK: backfilled geo_level/geo_id on {backfilled} signal_snapshots rows.")
+    if as_of:
+        print(f"OK: backfilled data_as_of on {as_of} signal_snapshots rows.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,110 @@
+"""ZIP -> geography resolution and per-signal geo keys.
+
+Signals are computed and stored per (signal_type, geo_level, geo_id), where
+the level comes from config.SIGNAL_GEO_LEVEL:
+
+  county -> geo_id = 5-digit county FIPS
+  state  -> geo_id = state abbreviation
+  zip    -> geo_id = the ZIP itself (also the fallback when a ZIP can't be resolved)
+
+ZIP resolutions are cached in the zip_geo table, so only the first request for
+a ZIP pays the upstream geo lookups.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+
+from uvceed_alerts.geo import GeoResult, zip_to_county
+
+from . import config
+from .db import db_conn, get_zip_geos, upsert_zip_geo
+
+GeoKey = Tuple[str, str]  # (geo_level, geo_id)
+
+def _geo_from_row(row: Dict[str, Any]) -> GeoResult:
+    return GeoResult(
+        zip_code=row["zip_code"],
+        place=row.get("place") or "",
+        state_abbr=row["state_abbr"],
+        state_name=row["state_name"],
+        latitude=float(row.get("latitude") or 0.0),
+        longitude=float(row.get("longitude") or 0.0),
+        county_name=row.get("county_name") or "",
+        county_fips=row["county_fips"],
+    )
+
+def _cache(conn, geo: GeoResult) -> None:
+    upsert_zip_geo(conn, {
+        "zip_code": geo.zip_code,
+        "place": geo.place,
+        "state_abbr": geo.state_abbr,
+        "state_name": geo.state_name,
+        "latitude": geo.latitude,
+        "longitude": geo.longitude,
+        "county_name": geo.county_name,
+        "county_fips": geo.county_fips,
+    })
+
+def resolve_zips(conn, zip_codes: List[str], concurrency: int = 8) -> Tuple[Dict[str, GeoResult], Dict[str, str]]:
+    """ZIP -> GeoResult from the zip_geo cache, resolving (and caching) misses upstream."""
+    cached = get_zip_geos(conn, zip_codes)
+    geos = {z: _geo_from_row(r) for z, r in cached.items()}
+    misses = [z for z in zip_codes if z not in geos]
+    errors: Dict[str, str] = {}
+    if not misses:
+        return geos, errors
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(misses))), thread_name_prefix="uvceed-geo") as pool:
+        futures = {pool.submit(zip_to_county, z): z for z in misses}
+        for fut in as_completed(futures):
+            z = futures[fut]
+            try:
+                geo = fut.result()
+            except Exception as e:
+                errors[z] = str(e)[:300]
+                continue
+            geos[z] = geo
+            _cache(conn, geo)
+    return geos, errors
+
+def resolve_zip(conn, zip_code: str) -> Optional[GeoResult]:
+    geos, _ = resolve_zips(conn, [zip_code], concurrency=1)
+    return geos.get(zip_code)
+
+def geo_key(signal_type: str, zip_code: str, geo: Optional[GeoResult]) -> GeoKey:
+    level = config.SIGNAL_GEO_LEVEL.get(signal_type, "zip")
+    if geo is not None:
+        if level == "county" and geo.county_fips:
+            return "county", geo.county_fips
+        if level == "state" and geo.state_abbr:
+            return "state", geo.state_abbr
+    return "zip", zip_code
+
+def signal_geo_keys(conn, zip_code: str, signal_types: List[str]) -> Dict[str, GeoKey]:
+    geo = resolve_zip(conn, zip_code)
+    return {st: geo_key(st, zip_code, geo) for st in signal_types}
+
+def zip_geo_keys(zip_code: str, signal_types: List[str]) -> Dict[str, GeoKey]:
+    """signal_geo_keys without holding a connection across the upstream lookup on a cache miss."""
+    with db_conn() as conn:
+        row = get_zip_geos(conn, [zip_code]).get(zip_code)
+    if row is not None:
+        geo: Optional[GeoResult] = _geo_from_row(row)
+    else:
+        try:
+            geo = zip_to_county(zip_code)
+        except Exception:
+            geo = None
+        if geo is not None:
+            with db_conn() as conn:
+                _cache(conn, geo)
+    return {st: geo_key(st, zip_code, geo) for st in signal_types}
+
+def cached_geo_keys(conn, zip_codes: List[str], signal_types: List[str]) -> Dict[str, Dict[str, GeoKey]]:
+    """Geo keys from the zip_geo cache only (no upstream lookups); unresolved ZIPs fall back to the ZIP key."""
+    cached = get_zip_geos(conn, zip_codes)
+    out: Dict[str, Dict[str, GeoKey]] = {}
+    for z in zip_codes:
+        geo = _geo_from_row(cached[z]) if z in cached else None
+        out[z] = {st: geo_key(st, z, geo) for st in signal_types}
+    return out
@@ -0,0 +1,172 @@
+"""Postgres-backed refresh job queue.
+
+The API and cron enqueue (geo_key, signal_type) jobs; `uvceed_api.worker`
+processes claim them with FOR UPDATE SKIP LOCKED, so any number of workers on
+any number of hosts can drain the same table without double work.
+
+geo_key is the signal's geography ("county:18097", "state:IN", "zip:46204"), so
+ZIPs sharing a county/state enqueue one job per signal. zip_code is the ZIP the
+worker refreshes it through (ingestors take a ZIP); the first enqueuer's wins.
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .db import db_conn, latest_geo_snapshots
+from .geo import GeoKey
+
+PRIORITY_INTERACTIVE = 100  # a client is waiting on a ZIP with no snapshot
+PRIORITY_STALE = 50         # served stale, refresh behind it
+PRIORITY_CRON = 0
+
+RETRY_BACKOFF_SECONDS = 60
+
+def job_geo_key(key: GeoKey) -> str:
+    return "{}:{}".format(*key)
+
+def enqueue_refresh(
+    conn,
+    zip_code: str,
+    keys: Dict[str, GeoKey],
+    *,
+    priority: int = PRIORITY_CRON,
+    force: bool = False,
+) -> int:
+    """Enqueue one job per (signal -> geo key); merges into an already-queued job (higher priority / force wins)."""
+    n = 0
+    with conn.cursor() as cur:
+        for st, key in keys.items():
+            cur.execute(
+                """
+                INSERT INTO refresh_jobs(geo_key, zip_code, signal_type, priority, force)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (geo_key, signal_type) WHERE status = 'queued'
+                DO UPDATE SET
+                  priority = GREATEST(refresh_jobs.priority, EXCLUDED.priority),
+                  force = refresh_jobs.force OR EXCLUDED.force,
+                  run_after = LEAST(refresh_jobs.run_after, now()),
+                  updated_at = now();
+                """,
+                (job_geo_key(key), zip_code, st, priority, force),
+            )
+            n += 1
+    return n
+
+def claim_jobs(conn, worker_id: str, limit: int = 1) -> List[Dict[str, Any]]:
+    """Atomically mark up to `limit` due jobs as running for this worker and return them."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            WITH next AS (
+              SELECT id
+              FROM refresh_jobs
+              WHERE status = 'queued' AND run_after <= now()
+              ORDER BY priority DESC, run_after, id
+              LIMIT %s
+              FOR UPDATE SKIP LOCKED
+            )
+            UPDATE refresh_jobs j
+            SET status = 'running',
+                attempts = j.attempts + 1,
+                locked_by = %s,
+                locked_at = now(),
+                updated_at = now()
+            FROM next
+            WHERE j.id = next.id
+            RETURNING j.*;
+            """,
+            (limit, worker_id),
+        )
+        return list(cur.fetchall())
+
+def complete_job(conn, job_id: int) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE refresh_jobs
+            SET status = 'done', last_error = NULL, updated_at = now()
+            WHERE id = %s;
+            """,
+            (job_id,),
+        )
+
+def fail_job(conn, job: Dict[str, Any], error: str) -> None:
+    """Requeue with linear backoff until max_attempts, then mark failed."""
+    retry = int(job["attempts"]) < int(job["max_attempts"])
+    with conn.cursor() as cur:
+        if retry:
+            # A fresh enqueue may already hold the queued slot; in that case just retire this row.
+            cur.execute(
+                """
+                UPDATE refresh_jobs
+                SET status = 'queued',
+                    run_after = now() + (%s * attempts) * interval '1 second',
+                    locked_by = NULL,
+                    locked_at = NULL,
+                    last_error = %s,
+                    updated_at = now()
+                WHERE id = %s
+                  AND NOT EXISTS (
+                    SELECT 1 FROM refresh_jobs q
+                    WHERE q.geo_key = %s AND q.signal_type = %s AND q.status = 'queued'
+                  );
+                """,
+                (RETRY_BACKOFF_SECONDS, error[:1200], job["id"], job["geo_key"], job["signal_type"]),
+            )
+            if cur.rowcount:
+                return
+        cur.execute(
+            """
+            UPDATE refresh_jobs
+            SET status = 'failed', last_error = %s, updated_at = now()
+            WHERE id = %s;
+            """,
+            (error[:1200], job["id"]),
+        )
+
+def requeue_stuck(conn, older_than_seconds: int) -> int:
+    """Return running jobs whose worker died (locked too long) to the queue."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE refresh_jobs j
+            SET status = 'queued', locked_by = NULL, locked_at = NULL, updated_at = now()
+            WHERE j.status = 'running'
+              AND j.locked_at < now() - %s * interval '1 second'
+              AND NOT EXISTS (
+                SELECT 1 FROM refresh_jobs q
+                WHERE q.geo_key = j.geo_key AND q.signal_type = j.signal_type AND q.status = 'queued'
+              );
+            """,
+            (older_than_seconds,),
+        )
+        return cur.rowcount
+
+def purge_finished(conn, older_than_days: int = 7) -> int:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            DELETE FROM refresh_jobs
+            WHERE status IN ('done', 'failed')
+              AND updated_at < now() - %s * interval '1 day';
+            """,
+            (older_than_days,),
+        )
+        return cur.rowcount
+
+def wait_for_snapshots(
+    keys: Dict[str, Tuple[str, str]],
+    timeout_s: float,
+    poll_s: float = 0.25,
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Poll until every (signal -> geo key) has a snapshot (or timeout); returns the latest rows either way.
+
+    Each poll uses its own short-lived connection; nothing is held while sleeping.
+    """
+    deadline = time.monotonic() + timeout_s
+    while True:
+        with db_conn() as conn:
+            rows = latest_geo_snapshots(conn, keys)
+        if all(rows.get(st) for st in keys) or time.monotonic() >= deadline:
+            return rows
+        time.sleep(poll_s)
@@ -0,0 +1,93 @@
+"""Process-wide cap on concurrent on-demand refreshes.
+
+At most `max_concurrent` refreshes run at once; up to `max_queue` more may wait
+(for at most `wait_s`) for a slot. Anything beyond that is shed immediately with
+Overloaded so the API can serve what it has (or a fast 503) instead of stacking
+ingestion work. Counters are exposed on /metrics to size the cap.
+
+The cap is per API process: with N uvicorn workers the host runs up to
+N * UVCEED_REFRESH_LIMIT_CONCURRENT refreshes.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+from . import config
+
+class Overloaded(Exception):
+    """No refresh slot available (queue full or wait timed out)."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class RefreshLimiter:
+    def __init__(self, max_concurrent: int, max_queue: int, wait_s: float, retry_after: int):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.wait_s = max(0.0, wait_s)
+        self.retry_after = retry_after
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._peak_waiting = 0
+        self._admitted = 0
+        self._shed_queue_full = 0
+        self._shed_timeout = 0
+
+    def _shed(self, reason: str) -> Overloaded:
+        if reason == "queue_full":
+            self._shed_queue_full += 1
+        else:
+            self._shed_timeout += 1
+        return Overloaded(reason, self.retry_after)
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold one refresh slot for the duration of the block, or raise Overloaded."""
+        with self._cond:
+            if self._active >= self.max_concurrent:
+                if self._waiting >= self.max_queue:
+                    raise self._shed("queue_full")
+                self._waiting += 1
+                self._peak_waiting = max(self._peak_waiting, self._waiting)
+                deadline = time.monotonic() + self.wait_s
+                try:
+                    while self._active >= self.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise self._shed("wait_timeout")
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._active += 1
+            self._admitted += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queued": self._waiting,
+                "peak_queued": self._peak_waiting,
+                "admitted": self._admitted,
+                "shed_queue_full": self._shed_queue_full,
+                "shed_wait_timeout": self._shed_timeout,
+            }
+
+refresh_limiter = RefreshLimiter(
+    config.REFRESH_LIMIT_CONCURRENT,
+    config.REFRESH_LIMIT_QUEUE,
+    config.REFRESH_LIMIT_WAIT_MS / 1000.0,
+    config.REFRESH_RETRY_AFTER_SECONDS,
+)
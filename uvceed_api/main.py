@@ -1,8 +1,38 @@
 from fastapi import FastAPI
+from . import config
+from .adb import close_pool, open_pool
+from .db import db_conn, ensure_phase3_schema
+from .response_cache import start_listener, stop_listener
 from .routes.health import router as health_router
 from .routes.signals import router as signals_router
 
 app = FastAPI(title="UVCeed API", version="0.1.0")
 
+@app.on_event("startup")
+def _migrate_on_startup() -> None:
+    # Requests only check the cached schema version; DDL runs here (and in db_migrate) only
+    if config.MIGRATE_ON_STARTUP:
+        with db_conn() as conn:
+            ensure_phase3_schema(conn)
+
+@app.on_event("startup")
+async def _open_async_pool() -> None:
+    if config.ASYNC_DB:
+        await open_pool()
+
+@app.on_event("shutdown")
+async def _close_async_pool() -> None:
+    await close_pool()
+
+@app.on_event("startup")
+def _start_cache_listener() -> None:
+    if config.RESPONSE_CACHE:
+        start_listener()
+
+@app.on_event("shutdown")
+def _stop_cache_listener() -> None:
+    # Also flushes request counts from cache hits
+    stop_listener()
+
 app.include_router(health_router)
 app.include_router(signals_router)
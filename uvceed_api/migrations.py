@@ -0,0 +1,116 @@
+"""Versioned schema migrations from sql/migrations/NNNN_name.sql.
+
+Migrations are applied in version order, each in its own transaction together
+with its schema_migrations row, under a transaction-level advisory lock so
+concurrent deployers (several uvicorn workers starting at once) serialize.
+They run at deploy/startup (`python3 -m uvceed_api.db_migrate`, API startup);
+request paths only call check_schema_version, which hits the database until
+the expected version has been seen once per process and never again after.
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[1] / "sql" / "migrations"
+_FILE_RE = re.compile(r"^(\d{4})_([a-z0-9_]+)\.sql$")
+
+# pg_advisory_xact_lock key for the runner ("uvce" as an int)
+MIGRATION_LOCK_ID = 0x75766365
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    path: Path
+
+    @property
+    def sql(self) -> str:
+        return self.path.read_text(encoding="utf-8")
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+
+def discover_migrations(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    found: List[Migration] = []
+    for path in sorted(directory.glob("*.sql")):
+        m = _FILE_RE.match(path.name)
+        if not m:
+            raise RuntimeError(f"unexpected migration file name: {path.name} (want NNNN_name.sql)")
+        found.append(Migration(int(m.group(1)), m.group(2), path))
+    versions = [m.version for m in found]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"duplicate migration versions in {directory}")
+    return found
+
+MIGRATIONS = discover_migrations()
+SCHEMA_VERSION = MIGRATIONS[-1].version if MIGRATIONS else 0
+
+def _ensure_table(cur) -> None:
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+      version integer PRIMARY KEY,
+      name text NOT NULL,
+      checksum text NOT NULL,
+      applied_at timestamptz NOT NULL DEFAULT now()
+    );
+    """)
+
+def applied_migrations(conn) -> Dict[int, Dict]:
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('schema_migrations') AS t;")
+        if not cur.fetchone()["t"]:
+            return {}
+        cur.execute("SELECT version, name, checksum, applied_at FROM schema_migrations ORDER BY version;")
+        return {int(r["version"]): dict(r) for r in cur.fetchall()}
+
+def migrate(conn) -> List[Migration]:
+    """Apply pending migrations in order; returns the ones applied. Commits per migration."""
+    applied: List[Migration] = []
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(%s);", (MIGRATION_LOCK_ID,))
+        _ensure_table(cur)
+    conn.commit()
+
+    for m in MIGRATIONS:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (MIGRATION_LOCK_ID,))
+            cur.execute("SELECT 1 FROM schema_migrations WHERE version = %s;", (m.version,))
+            if cur.fetchone():
+                conn.commit()
+                continue
+            cur.execute(m.sql)
+            cur.execute(
+                "INSERT INTO schema_migrations(version, name, checksum) VALUES (%s, %s, %s);",
+                (m.version, m.name, m.checksum),
+            )
+        conn.commit()
+        applied.append(m)
+    return applied
+
+_version_ok = False
+
+def schema_version_checked() -> bool:
+    """True once check_schema_version has passed in this process (async callers skip the threadpool hop)."""
+    return _version_ok
+
+def check_schema_version(conn) -> None:
+    """Raise if the database is behind this code's migrations; cached once it has passed."""
+    global _version_ok
+    if _version_ok:
+        return
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('schema_migrations') AS t;")
+        current = 0
+        if cur.fetchone()["t"]:
+            cur.execute("SELECT coalesce(max(version), 0) AS v FROM schema_migrations;")
+            current = int(cur.fetchone()["v"])
+    if current < SCHEMA_VERSION:
+        raise RuntimeError(
+            f"database schema is at version {current}, code expects {SCHEMA_VERSION}: "
+            "run `python3 -m uvceed_api.db_migrate`"
+        )
+    _version_ok = True
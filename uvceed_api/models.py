@@ -11,6 +11,9 @@ class SignalOut(BaseModel):
     trend: Trend = "unknown"
     confidence: Confidence = "low"
     generated_at: Optional[str] = None
+    geo_level: Optional[str] = None
+    geo_id: Optional[str] = None
+    stale: bool = False
     payload: Optional[Dict[str, Any]] = None
 
 class LatestSignalsOut(BaseModel):
@@ -18,6 +21,7 @@ class LatestSignalsOut(BaseModel):
     generated_at: Optional[str] = None
     signals: Dict[str, SignalOut]
     refreshed: bool = False
+    refresh_pending: bool = False
     errors: Optional[Dict[str, str]] = None
 
 class RefreshIn(BaseModel):
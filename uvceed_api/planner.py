@@ -0,0 +1,173 @@
+"""Geo-deduplicated refresh planning.
+
+Each signal depends on one geography only (wastewater and the NSSP county series
+-> county, NSSP -> state), so refreshing ZIPs one by one repeats identical upstream
+fetches for every ZIP in the same county/state. The planner:
+
+  1. resolves every ZIP's geography (zip_geo cache table, upstream lookup on miss)
+  2. groups the ZIPs that need each signal by that signal's geo key
+  3. fetches and scores each distinct (signal, geo key) exactly once
+  4. writes one geo-keyed snapshot that every member ZIP is served from
+
+Used by `cli_refresh_requested --plan`.
+"""
+
+import sys
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from uvceed_alerts import cdc_nssp_ed_trajectories, cdc_nssp_ed_visits, cdc_wastewater
+from uvceed_alerts.geo import GeoResult
+
+from . import config
+from .db import acquire_lease, mark_zip_refreshed, release_lease
+from .geo import GeoKey, geo_key, resolve_zips
+from .refresh import lease_key, plan_signals, save_payload
+
+@dataclass(frozen=True)
+class GeoIngestor:
+    fetch: Callable[[GeoResult], Any]                       # any member's geo -> raw upstream rows
+    build: Callable[[str, GeoResult, Any], Dict[str, Any]]  # (zip, geo, rows) -> payload
+
+def _wastewater_geo(geo: GeoResult) -> Dict[str, Any]:
+    return {
+        "zip_code": geo.zip_code,
+        "place": geo.place,
+        "state_name": geo.state_name,
+        "state_abbr": geo.state_abbr,
+        "county_name": geo.county_name,
+        "county_fips": geo.county_fips,
+    }
+
+GEO_INGESTORS: Dict[str, GeoIngestor] = {
+    "wastewater": GeoIngestor(
+        fetch=lambda g: cdc_wastewater.fetch_rows_for_county(g.county_fips),
+        build=lambda z, g, rows: cdc_wastewater.build_snapshot(z, _wastewater_geo(g), rows),
+    ),
+    "nssp_ed_visits": GeoIngestor(
+        fetch=lambda g: cdc_nssp_ed_visits.fetch_rows_for_state(g.state_name, weeks=config.NSSP_WEEKS),
+        build=lambda z, g, rows: cdc_nssp_ed_visits.payload_from_rows(
+            z, g, rows, pathogen=config.NSSP_PATHOGEN, weeks=config.NSSP_WEEKS
+        ),
+    ),
+    # Keyed per county, but every county of a state reuses the same (cached) state-wide pull
+    "nssp_ed_county": GeoIngestor(
+        fetch=lambda g: cdc_nssp_ed_trajectories.fetch_state_county_rows(g.state_name, config.NSSP_WEEKS),
+        build=lambda z, g, rows: cdc_nssp_ed_trajectories.county_payload_from_rows(
+            z, g, rows, pathogen=config.NSSP_PATHOGEN, weeks=config.NSSP_WEEKS
+        ),
+    ),
+}
+
+@dataclass
+class RefreshPlan:
+    geos: Dict[str, GeoResult] = field(default_factory=dict)
+    unresolved: Dict[str, str] = field(default_factory=dict)
+    # (signal_type, geo key) -> member ZIPs needing that signal
+    groups: Dict[Tuple[str, GeoKey], List[str]] = field(default_factory=dict)
+    versions: Dict[Tuple[str, GeoKey], Optional[str]] = field(default_factory=dict)
+
+    @property
+    def naive_fetches(self) -> int:
+        return sum(len(zs) for zs in self.groups.values())
+
+    @property
+    def planned_fetches(self) -> int:
+        return len(self.groups)
+
+def build_plan(
+    conn,
+    zip_codes: List[str],
+    *,
+    force: bool = False,
+    signal_types: Optional[List[str]] = None,
+    concurrency: int = 8,
+) -> RefreshPlan:
+    types = [st for st in (signal_types or config.SIGNAL_TYPES) if st in GEO_INGESTORS]
+    plan = RefreshPlan()
+    plan.geos, plan.unresolved = resolve_zips(conn, zip_codes, concurrency=concurrency)
+
+    for z in zip_codes:
+        geo = plan.geos.get(z)
+        if geo is None:
+            continue
+        keys = {st: geo_key(st, z, geo) for st in types}
+        # Only the first ZIP of a geo group needs the snapshot check; the rest share its answer.
+        unseen = [st for st in types if (st, keys[st]) not in plan.versions]
+        needed, versions = plan_signals(conn, z, unseen, force, keys=keys) if unseen else ([], {})
+        for st in unseen:
+            plan.versions[(st, keys[st])] = versions.get(st)
+            if st in needed:
+                plan.groups[(st, keys[st])] = []
+        for st in types:
+            if (st, keys[st]) in plan.groups:
+                plan.groups[(st, keys[st])].append(z)
+    return plan
+
+def execute_plan(conn, plan: RefreshPlan, *, concurrency: int = 8) -> Dict[str, Any]:
+    """Fetch + score each (signal, geo key) once on a thread pool; insert on this thread.
+
+    A group's refresh lease is taken before its fetch is submitted, so a geo that the
+    API or the refresher is already refreshing is skipped rather than fetched twice.
+    Groups are submitted only as workers free up, so no lease ticks down in a queue.
+    """
+    refreshed_zips: set = set()
+    errors: Dict[str, Dict[str, str]] = {z: {"geo": e} for z, e in plan.unresolved.items()}
+    skipped_locked = 0
+    owner = f"planner:{uuid.uuid4().hex[:12]}"
+    workers = max(1, concurrency)
+    ttl = config.REFRESH_TIMEOUT_SECONDS + config.REFRESH_LEASE_GRACE_SECONDS
+
+    pending = deque(plan.groups)
+    running: Dict[Future, Tuple[str, GeoKey, str]] = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="uvceed-plan") as pool:
+        while pending or running:
+            while pending and len(running) < workers:
+                st, key = pending.popleft()
+                lock = lease_key(key, st)
+                acquired = acquire_lease(conn, lock, owner, ttl)
+                conn.commit()
+                if not acquired:
+                    skipped_locked += 1
+                    continue
+                rep = plan.groups[(st, key)][0]
+                running[pool.submit(GEO_INGESTORS[st].fetch, plan.geos[rep])] = (st, key, lock)
+            if not running:
+                break
+
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in done:
+                st, key, lock = running.pop(fut)
+                members = plan.groups[(st, key)]
+                try:
+                    rep = members[0]
+                    payload = GEO_INGESTORS[st].build(rep, plan.geos[rep], fut.result())
+                    save_payload(conn, rep, st, payload, geo_key=key, source_version=plan.versions.get((st, key)))
+                    refreshed_zips.update(members)
+                except Exception as e:
+                    conn.rollback()
+                    for z in members:
+                        errors.setdefault(z, {})[st] = str(e)[:1200]
+                finally:
+                    release_lease(conn, lock, owner)
+                    conn.commit()
+
+    for z in refreshed_zips:
+        mark_zip_refreshed(conn, z)
+    conn.commit()
+
+    for z, errs in errors.items():
+        print(f"WARN {z}: {errs}", file=sys.stderr)
+
+    return {
+        "zips": len(plan.geos) + len(plan.unresolved),
+        "unresolved": len(plan.unresolved),
+        "naive_fetches": plan.naive_fetches,
+        "planned_fetches": plan.planned_fetches,
+        "refreshed_zips": len(refreshed_zips),
+        "skipped_locked": skipped_locked,
+        "errors": sum(len(e) for e in errors.values()),
+    }
@@ -0,0 +1,220 @@
+"""Process-wide psycopg2 connection pool behind db.db_conn().
+
+- bounded: at most max_size connections per process; callers beyond that wait
+  up to timeout_s for one to be returned, then get PoolTimeout
+- min_size connections are kept warm; extra ones are closed after max_idle_s
+- every connection is retired after max_lifetime_s (server restarts, failovers,
+  memory held by long-lived backends)
+- a connection idle longer than check_after_s is probed with SELECT 1 before reuse
+- connections come back reset: open transactions are rolled back, autocommit off
+- fork-aware: a child process (pre-forking servers) starts with an empty pool
+  instead of sharing the parent's sockets
+
+Thread-safe for FastAPI's threadpool and the threaded CLIs.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Optional
+
+import psycopg2
+import psycopg2.extensions
+
+class PoolTimeout(RuntimeError):
+    """No connection became available within the pool timeout."""
+
+@dataclass
+class _Slot:
+    conn: Any
+    created: float
+    returned: float
+
+class ConnectionPool:
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        *,
+        min_size: int = 1,
+        max_size: int = 10,
+        max_lifetime_s: float = 1800.0,
+        max_idle_s: float = 300.0,
+        check_after_s: float = 30.0,
+        timeout_s: float = 10.0,
+    ):
+        self._connect = connect
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.max_lifetime_s = max_lifetime_s
+        self.max_idle_s = max_idle_s
+        self.check_after_s = check_after_s
+        self.timeout_s = timeout_s
+
+        self._cond = threading.Condition()
+        self._idle: Deque[_Slot] = deque()
+        self._in_use: Dict[int, _Slot] = {}
+        self._size = 0
+        self._waiting = 0
+        self._pid = os.getpid()
+        self._counters = {
+            "connections_opened": 0,
+            "connections_closed": 0,
+            "health_check_failures": 0,
+            "acquired": 0,
+            "timeouts": 0,
+            "wait_ms_total": 0.0,
+        }
+
+    # -- internals (called with self._cond held unless noted) --
+
+    def _reset_after_fork(self) -> None:
+        if self._pid != os.getpid():
+            # Inherited sockets belong to the parent; drop them without closing
+            self._idle.clear()
+            self._in_use.clear()
+            self._size = 0
+            self._waiting = 0
+            self._pid = os.getpid()
+
+    def _close(self, slot: _Slot) -> None:
+        self._size -= 1
+        self._counters["connections_closed"] += 1
+        try:
+            slot.conn.close()
+        except Exception:
+            pass
+
+    def _expired(self, slot: _Slot, now: float) -> bool:
+        return bool(slot.conn.closed) or (self.max_lifetime_s > 0 and now - slot.created > self.max_lifetime_s)
+
+    def _prune_idle(self, now: float) -> None:
+        # Oldest-returned first; keep min_size warm
+        while self._idle and self._size > self.min_size:
+            slot = self._idle[0]
+            if self.max_idle_s > 0 and now - slot.returned > self.max_idle_s:
+                self._idle.popleft()
+                self._close(slot)
+            else:
+                break
+
+    @staticmethod
+    def _healthy(conn) -> bool:
+        # Called without the lock held
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+                cur.fetchone()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    # -- public API --
+
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self.timeout_s
+        while True:
+            slot: Optional[_Slot] = None
+            create = False
+            with self._cond:
+                self._reset_after_fork()
+                now = time.monotonic()
+                self._prune_idle(now)
+                while self._idle:
+                    candidate = self._idle.pop()  # most recently returned: warmest
+                    if self._expired(candidate, now):
+                        self._close(candidate)
+                        continue
+                    slot = candidate
+                    break
+                if slot is None:
+                    if self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                    else:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            self._counters["timeouts"] += 1
+                            raise PoolTimeout(
+                                f"no database connection available within {self.timeout_s:g}s "
+                                f"(pool max_size={self.max_size})"
+                            )
+                        self._waiting += 1
+                        try:
+                            self._cond.wait(remaining)
+                        finally:
+                            self._waiting -= 1
+                        continue
+
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                now = time.monotonic()
+                slot = _Slot(conn, now, now)
+                with self._cond:
+                    self._counters["connections_opened"] += 1
+            elif time.monotonic() - slot.returned > self.check_after_s and not self._healthy(slot.conn):
+                with self._cond:
+                    self._counters["health_check_failures"] += 1
+                    self._close(slot)
+                    self._cond.notify()
+                continue
+
+            with self._cond:
+                self._in_use[id(slot.conn)] = slot
+                self._counters["acquired"] += 1
+                self._counters["wait_ms_total"] += (time.monotonic() - started) * 1000.0
+            return slot.conn
+
+    def putconn(self, conn, discard: bool = False) -> None:
+        status = None
+        if not discard and not conn.closed:
+            try:
+                status = conn.get_transaction_status()
+                if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                if conn.autocommit:
+                    conn.autocommit = False
+            except Exception:
+                discard = True
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                discard = True
+
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            slot = self._in_use.pop(id(conn), None)
+            if slot is None:
+                return
+            now = time.monotonic()
+            if discard or self._expired(slot, now):
+                self._close(slot)
+            else:
+                slot.returned = now
+                self._idle.append(slot)
+            self._cond.notify()
+
+    def close_all(self) -> None:
+        with self._cond:
+            while self._idle:
+                self._close(self._idle.pop())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "waiting": self._waiting,
+                **{k: (round(v, 1) if isinstance(v, float) else v) for k, v in self._counters.items()},
+            }
@@ -2,33 +2,143 @@ import json
 import subprocess
 import datetime as dt
 import sys
-from typing import Dict, List, Optional, Tuple, Any
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple, Any
 
-from . import config
+from uvceed_alerts import cdc_nssp_ed_trajectories, cdc_nssp_ed_visits, cdc_wastewater, freshness
+
+from . import cadence, config
+from .geo import GeoKey, signal_geo_keys, zip_geo_keys
+from .limiter import Overloaded, refresh_limiter
 from .db import (
-    advisory_key,
-    advisory_unlock,
+    acquire_lease,
+    active_leases,
+    db_conn,
+    get_zip_geos,
     insert_signal_snapshot,
-    latest_snapshots,
+    latest_geo_snapshots,
+    localize_payload,
     mark_zip_refreshed,
-    try_advisory_lock,
+    refresh_lock_key,
+    release_lease,
+    touch_snapshot,
 )
 
 UTC = dt.timezone.utc
 
-def _is_stale(row: Optional[dict], ttl_hours: float) -> bool:
+def signal_ttl_hours(signal_type: str) -> float:
+    return config.TTL_HOURS_WASTEWATER if signal_type == "wastewater" else config.TTL_HOURS_NSSP_ED_VISITS
+
+def stale_at(signal_type: str, row: Optional[dict]) -> Optional[dt.datetime]:
+    """When row becomes stale (cadence model, else fixed TTL); None if it already is / can't tell."""
     if not row:
-        return True
-    ga = row.get("generated_at")
+        return None
+    if config.ADAPTIVE_TTL:
+        due = cadence.next_check_at(signal_type, row)
+        if due is not None:
+            return due
+    ga = row.get("checked_at") or row.get("generated_at")
     if not isinstance(ga, dt.datetime):
+        return None
+    return ga.astimezone(UTC) + dt.timedelta(hours=signal_ttl_hours(signal_type))
+
+def is_stale(signal_type: str, row: Optional[dict], within_s: float = 0.0) -> bool:
+    """True if row is stale now, or will be within `within_s` seconds (refresh-ahead)."""
+    at = stale_at(signal_type, row)
+    if at is None:
         return True
-    age = dt.datetime.now(UTC) - ga.astimezone(UTC)
-    return age.total_seconds() > ttl_hours * 3600
+    return dt.datetime.now(UTC) + dt.timedelta(seconds=within_s) >= at
 
 def _run_cmd(args: List[str], timeout_s: int) -> Tuple[int, str, str]:
     p = subprocess.run(args, capture_output=True, text=True, timeout=timeout_s)
     return p.returncode, p.stdout, p.stderr
 
+# signal_type -> in-process ingestor (same payload the CLI prints with --json)
+INGESTORS: Dict[str, Callable[[str], Dict[str, Any]]] = {
+    "wastewater": lambda zip_code: cdc_wastewater.build_payload(zip_code),
+    "nssp_ed_visits": lambda zip_code: cdc_nssp_ed_visits.build_payload(
+        zip_code, pathogen=config.NSSP_PATHOGEN, weeks=config.NSSP_WEEKS
+    ),
+    "nssp_ed_county": lambda zip_code: cdc_nssp_ed_trajectories.build_county_payload(
+        zip_code, pathogen=config.NSSP_PATHOGEN, weeks=config.NSSP_WEEKS
+    ),
+}
+
+# Shared by all requests; HTTP sessions/caches inside uvceed_alerts stay warm across refreshes.
+_executor = ThreadPoolExecutor(max_workers=config.REFRESH_WORKERS, thread_name_prefix="uvceed-refresh")
+
+def _subprocess_cmd(signal_type: str, zip_code: str) -> Optional[List[str]]:
+    if signal_type == "wastewater":
+        return [sys.executable, "-m", "uvceed_alerts.cdc_wastewater", zip_code, "--json"]
+    if signal_type == "nssp_ed_visits":
+        return [
+            sys.executable, "-m", "uvceed_alerts.cdc_nssp_ed_visits",
+            zip_code,
+            "--pathogen", config.NSSP_PATHOGEN,
+            "--weeks", str(config.NSSP_WEEKS),
+            "--json-only",
+        ]
+    if signal_type == "nssp_ed_county":
+        return [
+            sys.executable, "-m", "uvceed_alerts.cdc_nssp_ed_trajectories",
+            zip_code,
+            "--pathogen", config.NSSP_PATHOGEN,
+            "--weeks", str(config.NSSP_WEEKS),
+            "--granularity", "county",
+            "--json-only",
+        ]
+    return None
+
+def _fetch_payload_subprocess(signal_type: str, zip_code: str) -> Dict[str, Any]:
+    cmd = _subprocess_cmd(signal_type, zip_code)
+    if cmd is None:
+        raise ValueError(f"no ingestor for signal_type={signal_type}")
+
+    rc, out, err = _run_cmd(cmd, config.REFRESH_TIMEOUT_SECONDS)
+    if rc != 0:
+        raise RuntimeError(err.strip() or out.strip() or f"refresh failed with exit_code={rc}")
+
+    try:
+        return json.loads(out)
+    except Exception:
+        # If non-JSON noise got printed, try last JSON-looking line
+        for line in reversed(out.splitlines()):
+            s = line.strip()
+            if s.startswith("{") and s.endswith("}"):
+                return json.loads(s)
+        raise
+
+def _fetch_payload_subprocess_timed(signal_type: str, zip_code: str) -> Dict[str, Any]:
+    try:
+        return _fetch_payload_subprocess(signal_type, zip_code)
+    except subprocess.TimeoutExpired:
+        raise TimeoutError(f"refresh timed out after {config.REFRESH_TIMEOUT_SECONDS}s")
+
+class _LeaseHeld(Exception):
+    """Another caller holds the signal's refresh lease; its snapshot is awaited instead."""
+
+def _submit_payload(signal_type: str, zip_code: str, on_start: Optional[Callable[[str], None]] = None) -> Future:
+    """Start one ingestor on the shared pool; the Future resolves to its payload.
+
+    on_start(signal_type) runs on the pool thread right before the ingestor, i.e.
+    after any wait in the pool's queue; if it raises, the ingestor doesn't run.
+    """
+    def _run() -> Dict[str, Any]:
+        if on_start is not None:
+            on_start(signal_type)
+        if config.REFRESH_ENGINE == "subprocess":
+            return _fetch_payload_subprocess_timed(signal_type, zip_code)
+        return INGESTORS[signal_type](zip_code)
+
+    return _executor.submit(_run)
+
 def _parse_dt(value: Any) -> dt.datetime:
     if isinstance(value, dt.datetime):
         return value if value.tzinfo else value.replace(tzinfo=UTC)
@@ -54,6 +164,7 @@ def _extract_meta(signal_type: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         meta["state"] = payload.get("state_abbr")
         meta["county_fips"] = payload.get("county_fips")
         meta["pathogen"] = None
+        meta["data_as_of"] = payload.get("data_as_of")
     elif signal_type == "nssp_ed_visits":
         scores = payload.get("scores") or {}
         meta["risk_level"] = payload.get("risk")
@@ -63,94 +174,372 @@ def _extract_meta(signal_type: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         meta["state"] = payload.get("state_abbr")
         meta["county_fips"] = payload.get("county_fips")
         meta["pathogen"] = payload.get("pathogen") or payload.get("metric_used")
+        week_ends = [str(p.get("week_end") or "")[:10] for p in (payload.get("points") or [])]
+        meta["data_as_of"] = max((w for w in week_ends if w), default=None)
+    elif signal_type == "nssp_ed_county":
+        results = payload.get("results") or {}
+        meta["risk_level"] = results.get("risk")
+        meta["trend"] = results.get("trend")
+        meta["confidence"] = results.get("confidence")
+        meta["composite_score"] = None
+        meta["state"] = payload.get("state_abbr")
+        meta["county_fips"] = payload.get("county_fips")
+        meta["pathogen"] = payload.get("pathogen")
+        week_ends = [str(p.get("week_end") or "")[:10] for p in (results.get("recent") or [])]
+        meta["data_as_of"] = max((w for w in week_ends if w), default=None)
     return meta
 
-def refresh_zip(conn, zip_code: str, force: bool = False) -> Tuple[bool, Dict[str, str]]:
-    """Refresh signal snapshots for zip_code.
+def latest_for_zip(
+    conn,
+    zip_code: str,
+    signal_types: Optional[List[str]] = None,
+    keys: Optional[Dict[str, GeoKey]] = None,
+) -> Tuple[Dict[str, GeoKey], Dict[str, Optional[Dict[str, Any]]]]:
+    """(geo key per signal, latest snapshot per signal) serving zip_code.
+
+    County/state payloads get zip_code's own location fields (db.localize_payload), and
+    each row carries that zip_geo row as "zip_geo" (as db.register_and_read_latest's do).
+    """
+    if keys is None:
+        keys = signal_geo_keys(conn, zip_code, list(signal_types or config.SIGNAL_TYPES))
+    rows = latest_geo_snapshots(conn, keys)
+    geo = get_zip_geos(conn, [zip_code]).get(zip_code)
+    return keys, {st: {**localize_payload(row, geo), "zip_geo": geo} if row else None for st, row in rows.items()}
+
+def _needs_ingest(
+    types: List[str],
+    current: Dict[str, Optional[Dict[str, Any]]],
+    force: bool,
+    stale_within_s: float = 0.0,
+) -> Tuple[List[str], Dict[str, Optional[str]], List[int]]:
+    """(signals to ingest, source_version per signal, snapshot ids to touch). No DB access."""
+    needed = [st for st in types if force or is_stale(st, current.get(st), stale_within_s)]
+
+    versions: Dict[str, Optional[str]] = {}
+    touch: List[int] = []
+    if config.FRESHNESS_GATE:
+        for st in list(needed):
+            versions[st] = freshness.signal_source_version(st)
+            row = current.get(st)
+            if force or not row or not versions[st]:
+                continue
+            if row.get("source_version") == versions[st]:
+                touch.append(int(row["id"]))
+                needed.remove(st)
+    return needed, versions, touch
+
+def plan_signals(
+    conn,
+    zip_code: str,
+    signal_types: Optional[List[str]] = None,
+    force: bool = False,
+    keys: Optional[Dict[str, GeoKey]] = None,
+) -> Tuple[List[str], Dict[str, Optional[str]]]:
+    """Which signals serving zip_code need ingesting, plus their upstream source_version.
+
+    Snapshots are shared per geo key, so a fresh one computed for any other ZIP
+    in the same county/state counts. Stale snapshots whose upstream is
+    unchanged (freshness gate) are touched here and left out of the result.
+    """
+    types = list(signal_types or config.SIGNAL_TYPES)
+    if keys is None:
+        keys = signal_geo_keys(conn, zip_code, types)
+    current = latest_geo_snapshots(conn, {st: keys[st] for st in types})
+    needed, versions, touch = _needs_ingest(types, current, force)
+    for snapshot_id in touch:
+        touch_snapshot(conn, snapshot_id)
+    return needed, versions
+
+def save_payload(
+    conn,
+    zip_code: str,
+    signal_type: str,
+    payload: Dict[str, Any],
+    *,
+    geo_key: Optional[GeoKey] = None,
+    source_version: Optional[str] = None,
+) -> int:
+    """Insert one ingestor payload as a signal_snapshots row (keyed by geo_key, default the ZIP)."""
+    geo_level, geo_id = geo_key or ("zip", zip_code)
+    meta = _extract_meta(signal_type, payload)
+    return insert_signal_snapshot(
+        conn,
+        zip_code=zip_code,
+        signal_type=signal_type,
+        generated_at=_parse_dt(payload.get("generated_at")),
+        payload=payload,
+        risk_level=meta.get("risk_level"),
+        trend=meta.get("trend"),
+        confidence=meta.get("confidence"),
+        composite_score=meta.get("composite_score"),
+        pathogen=meta.get("pathogen"),
+        state=meta.get("state"),
+        county_fips=meta.get("county_fips"),
+        geo_level=geo_level,
+        geo_id=geo_id,
+        source_version=source_version,
+        data_as_of=meta.get("data_as_of"),
+    )
 
-    Runs uvceed_alerts ingestion scripts WITHOUT --db, then inserts results
-    into signal_snapshots from this process. This avoids lock contention
-    between the API request transaction and a child process writing to DB.
+def lease_key(key: GeoKey, signal_type: str) -> str:
+    return refresh_lock_key("{}:{}".format(*key), signal_type)
+
+def _lease_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:12]}"
+
+INFLIGHT_POLL_SECONDS = 0.25
+
+def _wait_for_inflight(
+    keys: Dict[str, GeoKey],
+    baseline: Dict[str, Optional[int]],
+    timeout_s: float,
+) -> Tuple[Dict[str, bool], Dict[str, str]]:
+    """Wait for refreshes owned by someone else to land.
+
+    A signal is done when a snapshot newer than `baseline` (snapshot id seen
+    before the lease was found taken) appears for its geo key. If the lease
+    disappears without a new snapshot, the other refresh failed. Polls with a
+    short-lived connection per round; nothing is held while sleeping.
+    """
+    landed: Dict[str, bool] = {}
+    errors: Dict[str, str] = {}
+    pending = dict(keys)
+    deadline = time.monotonic() + timeout_s
+    while pending:
+        with db_conn() as conn:
+            rows = latest_geo_snapshots(conn, pending)
+            leased = active_leases(conn, [lease_key(k, st) for st, k in pending.items()])
+        for st in list(pending):
+            row = rows.get(st)
+            if row is not None and int(row["id"]) != baseline.get(st):
+                landed[st] = True
+                del pending[st]
+            elif lease_key(pending[st], st) not in leased:
+                errors[st] = "in-flight refresh by another caller finished without a new snapshot"
+                del pending[st]
+        if not pending:
+            break
+        if time.monotonic() >= deadline:
+            for st in pending:
+                errors[st] = f"timed out after {timeout_s:g}s waiting for in-flight refresh"
+            break
+        time.sleep(INFLIGHT_POLL_SECONDS)
+    return landed, errors
+
+def refresh_zip(
+    zip_code: str,
+    *,
+    force: bool = False,
+    signal_types: Optional[List[str]] = None,
+    stale_within_s: float = 0.0,
+    limit: bool = False,
+) -> Tuple[bool, Dict[str, str]]:
+    """Refresh the signal snapshots serving zip_code.
+
+    Three phases, so no connection or transaction is held across upstream work:
+      1. read: one short transaction reads the current snapshots, touches
+         unchanged ones and skips stale signals leased by another caller
+      2. upstream: ingestors run on the thread pool (per-signal timeout,
+         signals fetched concurrently) with no DB connection held; each takes
+         its refresh lease in a short transaction when a pool thread starts
+         it, so the lease TTL (timeout + grace) covers the run, not the queue
+      3. write: each result is inserted, and its lease released, in its own
+         short transaction as soon as it completes
+
+    Snapshots are keyed by each signal's geography (config.SIGNAL_GEO_LEVEL),
+    so a fresh county/state snapshot computed for another ZIP is reused and
+    the lease is per geo key, not per ZIP. A signal whose lease is held
+    elsewhere is not refreshed again: after our own fetches, we wait (up to
+    UVCEED_REFRESH_INFLIGHT_WAIT_SECONDS) for the other caller's snapshot to
+    land, so a burst of requests produces one refresh and every caller gets
+    its result. When the freshness gate is on, a stale snapshot whose
+    upstream dataset hasn't changed (same source_version) is extended instead
+    of re-ingested. UVCEED_REFRESH_ENGINE=subprocess restores the old
+    one-interpreter-per-signal ingestion.
+
+    signal_types restricts the refresh to a subset (default: config.SIGNAL_TYPES).
+    stale_within_s also refreshes snapshots that will go stale within that many
+    seconds (used by the refresh-ahead daemon, uvceed_api.refresher).
+    limit=True runs phase 2 under the API-wide refresh_limiter: the slot is only
+    taken when this call has signals to ingest (never while waiting on another
+    caller's refresh), and Overloaded is raised after the leases are released.
     """
     errors: Dict[str, str] = {}
     refreshed_any = False
 
-    current = latest_snapshots(conn, zip_code, config.SIGNAL_TYPES)
+    types = list(signal_types or config.SIGNAL_TYPES)
+    keys = zip_geo_keys(zip_code, types)
 
-    needed: List[str] = []
-    for st in config.SIGNAL_TYPES:
-        if force:
-            needed.append(st)
-        else:
-            ttl = config.TTL_HOURS_WASTEWATER if st == "wastewater" else config.TTL_HOURS_NSSP_ED_VISITS
-            if _is_stale(current.get(st), ttl):
-                needed.append(st)
+    # Phase 1: read (freshness markers are fetched between the two short transactions)
+    with db_conn() as conn:
+        current = latest_geo_snapshots(conn, keys)
+    needed, versions, touch = _needs_ingest(types, current, force, stale_within_s)
+    needed = [st for st in needed if st in INGESTORS]
 
-    for st in needed:
-        key = advisory_key(zip_code, st)
-        if not try_advisory_lock(conn, key):
-            continue
+    owner = _lease_owner()
+    leases: Dict[str, str] = {}
+    inflight: List[str] = []
+    if touch or needed:
+        with db_conn() as conn:
+            for snapshot_id in touch:
+                touch_snapshot(conn, snapshot_id)
+            held = active_leases(conn, [lease_key(keys[st], st) for st in needed])
+        inflight = [st for st in needed if lease_key(keys[st], st) in held]
+        needed = [st for st in needed if st not in inflight]
 
-        try:
-            if st == "wastewater":
-                cmd = [sys.executable, "-m", "uvceed_alerts.cdc_wastewater", zip_code, "--json"]
-            elif st == "nssp_ed_visits":
-                cmd = [
-                    sys.executable, "-m", "uvceed_alerts.cdc_nssp_ed_visits",
-                    zip_code,
-                    "--pathogen", config.NSSP_PATHOGEN,
-                    "--weeks", str(config.NSSP_WEEKS),
-                    "--json-only",
-                ]
-            else:
-                continue
+    # A signal's lease and timeout both start when a pool thread picks it up (on the
+    # pool thread, via _claim), so time queued behind other ZIPs' work on _executor
+    # can neither expire the lease nor count against REFRESH_TIMEOUT_SECONDS.
+    started: Dict[str, float] = {}
 
-            rc, out, err = _run_cmd(cmd, config.REFRESH_TIMEOUT_SECONDS)
-            if rc != 0:
-                errors[st] = (err.strip() or out.strip() or f"refresh failed with exit_code={rc}")[:1200]
-                continue
+    def _claim(st: str) -> None:
+        key = lease_key(keys[st], st)
+        with db_conn() as conn:
+            acquired = acquire_lease(conn, key, owner, config.REFRESH_TIMEOUT_SECONDS + config.REFRESH_LEASE_GRACE_SECONDS)
+        if not acquired:
+            raise _LeaseHeld(st)
+        leases[st] = key
+        started[st] = time.monotonic()
+
+    def _finish(st: str, payload: Optional[Dict[str, Any]]) -> None:
+        # Phase 3: one short transaction per completed signal
+        with db_conn() as conn:
+            if payload is not None:
+                save_payload(conn, zip_code, st, payload, geo_key=keys[st], source_version=versions.get(st))
+                mark_zip_refreshed(conn, zip_code)
+            key = leases.pop(st, None)
+            if key is not None:
+                release_lease(conn, key, owner)
 
+    # Phase 2: upstream (at most REFRESH_MAX_PARALLEL per ZIP), no connection held
+    queue = deque(needed)
+    running: Dict[Future, str] = {}
+    try:
+        with refresh_limiter.slot() if limit and queue else nullcontext():
+            while queue or running:
+                while queue and len(running) < max(1, config.REFRESH_MAX_PARALLEL):
+                    st = queue.popleft()
+                    running[_submit_payload(st, zip_code, _claim)] = st
+
+                now = time.monotonic()
+                next_deadline = min(started.get(st, now) for st in running.values()) + config.REFRESH_TIMEOUT_SECONDS
+                done, _ = wait(list(running), timeout=max(0.0, next_deadline - now), return_when=FIRST_COMPLETED)
+
+                for fut in done:
+                    st = running.pop(fut)
+                    payload = None
+                    try:
+                        payload = fut.result()
+                    except _LeaseHeld:
+                        # Taken by another caller since phase 1; wait for its snapshot below.
+                        inflight.append(st)
+                        continue
+                    except TimeoutError as e:
+                        errors[st] = str(e)
+                    except Exception as e:
+                        errors[st] = str(e)[:1200]
+                    try:
+                        _finish(st, payload)
+                        refreshed_any = refreshed_any or payload is not None
+                    except Exception as e:
+                        errors[st] = str(e)[:1200]
+
+                now = time.monotonic()
+                for fut, st in list(running.items()):
+                    if st in started and started[st] + config.REFRESH_TIMEOUT_SECONDS <= now:
+                        # The worker thread can't be killed; it finishes in the background and its result is dropped.
+                        del running[fut]
+                        fut.cancel()
+                        errors[st] = f"refresh timed out after {config.REFRESH_TIMEOUT_SECONDS}s"
+                        try:
+                            _finish(st, None)
+                        except Exception as e:
+                            errors[st] = str(e)[:1200]
+    finally:
+        for fut in running:
+            fut.cancel()
+        if leases:
+            # Leases also expire on their own; this just frees them early.
             try:
-                payload = json.loads(out)
+                with db_conn() as conn:
+                    for key in list(leases.values()):
+                        release_lease(conn, key, owner)
             except Exception:
-                # If non-JSON noise got printed, try last JSON-looking line
-                last = None
-                for line in reversed(out.splitlines()):
-                    s = line.strip()
-                    if s.startswith("{") and s.endswith("}"):
-                        last = s
-                        break
-                if not last:
-                    raise
-                payload = json.loads(last)
-
-            gen_at = _parse_dt(payload.get("generated_at"))
-            meta = _extract_meta(st, payload)
-
-            insert_signal_snapshot(
-                conn,
-                zip_code=zip_code,
-                signal_type=st,
-                generated_at=gen_at,
-                payload=payload,
-                risk_level=meta.get("risk_level"),
-                trend=meta.get("trend"),
-                confidence=meta.get("confidence"),
-                composite_score=meta.get("composite_score"),
-                pathogen=meta.get("pathogen"),
-                state=meta.get("state"),
-                county_fips=meta.get("county_fips"),
-            )
-            refreshed_any = True
-
-        except subprocess.TimeoutExpired:
-            errors[st] = f"refresh timed out after {config.REFRESH_TIMEOUT_SECONDS}s"
-        except Exception as e:
-            errors[st] = str(e)[:1200]
-        finally:
-            advisory_unlock(conn, key)
-
-    if refreshed_any:
-        mark_zip_refreshed(conn, zip_code)
+                pass
+
+    if inflight and config.REFRESH_INFLIGHT_WAIT_SECONDS > 0:
+        baseline = {st: (int(current[st]["id"]) if current.get(st) else None) for st in inflight}
+        landed, wait_errors = _wait_for_inflight(
+            {st: keys[st] for st in inflight}, baseline, config.REFRESH_INFLIGHT_WAIT_SECONDS
+        )
+        refreshed_any = refreshed_any or bool(landed)
+        errors.update(wait_errors)
 
     return refreshed_any, errors
+
+# ---------------------------
+# Background refresh (stale-while-revalidate)
+# ---------------------------
+
+_bg_executor = ThreadPoolExecutor(max_workers=config.REFRESH_BACKGROUND_WORKERS, thread_name_prefix="uvceed-swr")
+_inflight: Dict[Tuple[str, bool], Future] = {}  # (zip_code, force) -> refresh in flight
+_inflight_lock = threading.Lock()
+
+def _refresh_zip_logged(zip_code: str, force: bool) -> Tuple[bool, Dict[str, str]]:
+    try:
+        refreshed, errors = refresh_zip(zip_code, force=force, limit=True)
+    except Overloaded as e:
+        print(f"[refresh] refresh {zip_code} shed: {e.reason}", file=sys.stderr)
+        raise
+    if errors:
+        print(f"[refresh] refresh {zip_code}: {errors}", file=sys.stderr)
+    return refreshed, errors
+
+def _forget(key: Tuple[str, bool], fut: Future) -> None:
+    with _inflight_lock:
+        if _inflight.get(key) is fut:
+            del _inflight[key]
+
+def refresh_zip_background(zip_code: str, force: bool = False) -> Future:
+    """Schedule refresh_zip in the background; at most one in flight per ZIP in this process.
+
+    Cross-process duplicates are still prevented by the per-signal refresh leases.
+    The Future resolves to refresh_zip's (refreshed_any, errors), or raises
+    Overloaded if the refresh limiter shed it.
+    """
+    key = (zip_code, force)
+    with _inflight_lock:
+        fut = _inflight.get(key)
+        if fut is not None and not fut.done():
+            return fut
+        fut = _bg_executor.submit(_refresh_zip_logged, zip_code, force)
+        _inflight[key] = fut
+    fut.add_done_callback(lambda f: _forget(key, f))
+    return fut
+
+def refresh_zip_shared(zip_code: str, force: bool = False) -> Tuple[bool, Dict[str, str]]:
+    """Synchronous refresh_zip that shares the per-ZIP in-flight slot with refresh_zip_background.
+
+    If a refresh of zip_code is already running in this process (background or
+    another request), its result is awaited instead of starting a second one;
+    otherwise the refresh runs on the calling thread and concurrent callers join
+    it. Raises Overloaded if the refresh limiter shed the ingest.
+    """
+    key = (zip_code, force)
+    with _inflight_lock:
+        fut = _inflight.get(key)
+        joined = fut is not None and not fut.done()
+        if not joined:
+            fut = Future()
+            fut.set_running_or_notify_cancel()
+            _inflight[key] = fut
+    if joined:
+        return fut.result()
+    fut.add_done_callback(lambda f: _forget(key, f))
+    try:
+        result = _refresh_zip_logged(zip_code, force)
+    except BaseException as e:
+        fut.set_exception(e)
+        raise
+    fut.set_result(result)
+    return result
@@ -0,0 +1,164 @@
+"""Refresh-ahead daemon: keeps requested ZIPs fresh before users hit an expired snapshot.
+
+  python3 -m uvceed_api.refresher
+
+Every tick it:
+  1. loads ZIPs requested in the last UVCEED_REFRESHER_DAYS with their decayed
+     popularity (zip_requests.popularity, half-life UVCEED_POPULARITY_HALF_LIFE_HOURS)
+  2. groups them by (signal, geo key) -- one snapshot serves a whole county/state --
+     summing member popularity
+  3. schedules each group at stale_at - lead, where lead is
+     UVCEED_REFRESHER_LEAD_MINUTES scaled by popularity / UVCEED_REFRESHER_HOT_SCORE
+     (hot geos refresh well ahead of expiry, cold ones only once expired)
+  4. runs the most popular due groups, at most UVCEED_REFRESHER_MAX_PER_MINUTE,
+     so work is spread over time instead of bunching up
+
+Refreshes go through refresh_zip, so leases, the freshness gate and the cadence
+model apply as for the API. Safe to run next to the API, cron and queue workers.
+SIGINT/SIGTERM finish the current tick and exit.
+"""
+
+import argparse
+import datetime as dt
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from . import config
+from .db import db_conn, ensure_phase3_schema, latest_snapshot_heads, requested_zip_popularity
+from .geo import GeoKey, cached_geo_keys
+from .refresh import INGESTORS, refresh_zip, stale_at
+
+UTC = dt.timezone.utc
+
+_stop = threading.Event()
+
+@dataclass
+class Task:
+    signal_type: str
+    key: GeoKey
+    zip_code: str       # most popular member ZIP; refresh_zip is called with it
+    popularity: float   # summed over member ZIPs
+    lead_s: float
+    refresh_at: dt.datetime
+    stale_at: dt.datetime
+
+def _handle_signal(signum, frame) -> None:
+    print(f"[refresher] signal {signum}: stopping after this tick", file=sys.stderr)
+    _stop.set()
+
+def plan_tick(conn, now: dt.datetime, cooldown: Dict[Tuple[str, GeoKey], dt.datetime]) -> Tuple[List[Task], Dict[str, int]]:
+    """Due tasks (most popular first) and counters for the log line."""
+    types = [st for st in config.SIGNAL_TYPES if st in INGESTORS]
+    zips = requested_zip_popularity(conn, config.REFRESHER_DAYS, config.POPULARITY_HALF_LIFE_HOURS)
+    keys = cached_geo_keys(conn, [r["zip_code"] for r in zips], types)
+
+    groups: Dict[Tuple[str, GeoKey], Task] = {}
+    for r in zips:  # most popular first, so the first ZIP seen represents the group
+        z, pop = r["zip_code"], float(r["popularity"] or 0.0)
+        for st in types:
+            k = (st, keys[z][st])
+            if k in groups:
+                groups[k].popularity += pop
+            else:
+                groups[k] = Task(st, keys[z][st], z, pop, 0.0, now, now)
+
+    heads = latest_snapshot_heads(conn, [(st, key[0], key[1]) for st, key in groups])
+    due: List[Task] = []
+    for (st, key), task in groups.items():
+        heat = min(1.0, task.popularity / config.REFRESHER_HOT_SCORE) if config.REFRESHER_HOT_SCORE > 0 else 1.0
+        task.lead_s = config.REFRESHER_LEAD_MINUTES * 60.0 * heat
+        task.stale_at = stale_at(st, heads.get((st, key[0], key[1]))) or now
+        task.refresh_at = task.stale_at - dt.timedelta(seconds=task.lead_s)
+        if task.refresh_at <= now and cooldown.get((st, key), now) <= now:
+            due.append(task)
+    due.sort(key=lambda t: -t.popularity)
+    return due, {"zips": len(zips), "geos": len(groups), "due": len(due)}
+
+def _run(task: Task) -> Tuple[bool, Dict[str, str]]:
+    try:
+        return refresh_zip(task.zip_code, signal_types=[task.signal_type], stale_within_s=task.lead_s)
+    except Exception as e:
+        return False, {task.signal_type: str(e)[:1200]}
+
+def tick(pool: ThreadPoolExecutor, cooldown: Dict[Tuple[str, GeoKey], dt.datetime], budget: int, dry_run: bool = False) -> Dict[str, int]:
+    now = dt.datetime.now(UTC)
+    with db_conn() as conn:
+        due, stats = plan_tick(conn, now, cooldown)
+    batch = due[:budget]
+    stats.update(ran=len(batch), deferred=len(due) - len(batch), refreshed=0, errors=0)
+    if dry_run:
+        for t in batch:
+            print(
+                f"due {t.signal_type} {t.key[0]}:{t.key[1]} via {t.zip_code} popularity={t.popularity:.2f} "
+                f"stale_at={t.stale_at.isoformat(timespec='seconds')} lead={t.lead_s / 60:.0f}m"
+            )
+        return stats
+
+    retry_after = dt.timedelta(seconds=config.REFRESHER_TICK_SECONDS)
+    results = list(zip(batch, pool.map(_run, batch)))
+    heads = {}
+    landed = [(t.signal_type, t.key[0], t.key[1]) for t, (refreshed, _) in results if refreshed]
+    if landed:
+        with db_conn() as conn:
+            heads = latest_snapshot_heads(conn, landed)
+    for task, (refreshed, errors) in results:
+        k = (task.signal_type, task.key)
+        if refreshed:
+            stats["refreshed"] += 1
+            new_stale_at = stale_at(task.signal_type, heads.get((task.signal_type, task.key[0], task.key[1])))
+            if new_stale_at is not None and new_stale_at > task.stale_at:
+                cooldown.pop(k, None)
+            else:
+                # Re-ingested ahead of time but data_as_of didn't advance, so the cadence model
+                # still expects new data at the same stale_at: don't redo it every tick of the lead
+                cooldown[k] = max(task.stale_at, now + retry_after)
+        elif errors:
+            cooldown[k] = now + 5 * retry_after
+            stats["errors"] += 1
+            print(f"[refresher] WARN {task.signal_type} {task.key[0]}:{task.key[1]}: {errors}", file=sys.stderr)
+        else:
+            # Nothing new upstream yet: leave it until it is actually stale
+            cooldown[k] = max(task.stale_at, now + retry_after)
+    return stats
+
+def main():
+    ap = argparse.ArgumentParser(description="Refresh popular ZIPs ahead of their TTL (long-running).")
+    ap.add_argument("--tick", type=float, default=config.REFRESHER_TICK_SECONDS, help="seconds between scheduling passes")
+    ap.add_argument("--concurrency", type=int, default=config.REFRESHER_CONCURRENCY, help="refreshes run in parallel")
+    ap.add_argument("--max-per-minute", type=float, default=config.REFRESHER_MAX_PER_MINUTE, help="refresh budget (spreads work over time)")
+    ap.add_argument("--once", action="store_true", help="run a single tick and exit")
+    ap.add_argument("--dry-run", action="store_true", help="print what is due and exit")
+    args = ap.parse_args()
+
+    signal.signal(signal.SIGINT, _handle_signal)
+    signal.signal(signal.SIGTERM, _handle_signal)
+
+    with db_conn() as conn:
+        ensure_phase3_schema(conn)
+
+    budget = max(1, int(args.max_per_minute * args.tick / 60.0))
+    cooldown: Dict[Tuple[str, GeoKey], dt.datetime] = {}
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency), thread_name_prefix="uvceed-refresher") as pool:
+        while not _stop.is_set():
+            started = time.monotonic()
+            try:
+                stats = tick(pool, cooldown, budget, dry_run=args.dry_run)
+            except Exception as e:
+                print(f"[refresher] tick failed: {e}", file=sys.stderr)
+            else:
+                print(
+                    "[refresher] " + " ".join(f"{k}={v}" for k, v in stats.items())
+                    + f" elapsed={time.monotonic() - started:.1f}s",
+                    file=sys.stderr,
+                )
+            if args.once or args.dry_run:
+                break
+            _stop.wait(max(0.0, args.tick - (time.monotonic() - started)))
+
+if __name__ == "__main__":
+    main()
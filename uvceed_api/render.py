@@ -0,0 +1,90 @@
+"""/signals/latest response bodies, rendered without pydantic.
+
+Snapshot payloads (with their `recent` series) are the bulk of every response.
+The read path selects them as `payload::text`, so the driver never decodes the
+jsonb and the text is spliced into the body verbatim; only the handful of
+per-signal scalars are encoded here. Rows whose payload is already a dict
+(refresh paths that re-read with SELECT *) are dumped once.
+
+The body has the shape of models.LatestSignalsOut, which stays the documented
+response_model; values outside its Literal sets fall back to the model defaults.
+"""
+
+import datetime as dt
+import json
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+UTC = dt.timezone.utc
+
+_RISK = {"low", "moderate", "high", "unknown"}
+_TREND = {"rising", "falling", "flat", "unknown"}
+_CONFIDENCE = {"low", "moderate", "high"}
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str).encode
+
+def iso_utc(value: Any) -> Optional[str]:
+    if not isinstance(value, dt.datetime):
+        return None
+    return value.astimezone(UTC).isoformat().replace("+00:00", "Z")
+
+def _choice(value: Any, allowed: Set[str], default: str) -> str:
+    return value if value in allowed else default
+
+def _payload_json(payload: Any) -> str:
+    if payload is None:
+        return "null"
+    if isinstance(payload, str):
+        return payload  # payload::text straight from Postgres
+    return _dumps(payload)
+
+def render_signal(signal_type: str, row: Optional[Dict[str, Any]], stale: bool) -> Tuple[str, Optional[str], bool]:
+    """(JSON object text, generated_at ISO, has payload) for one signal."""
+    if not row:
+        head = {
+            "signal_type": signal_type, "risk": "unknown", "trend": "unknown", "confidence": "low",
+            "generated_at": None, "geo_level": None, "geo_id": None, "stale": False,
+        }
+        return _dumps(head)[:-1] + ',"payload":null}', None, False
+    ga = iso_utc(row.get("generated_at"))
+    head = {
+        "signal_type": signal_type,
+        "risk": _choice(row.get("risk_level") or "unknown", _RISK, "unknown"),
+        "trend": _choice(row.get("trend") or "unknown", _TREND, "unknown"),
+        "confidence": _choice(row.get("confidence") or "low", _CONFIDENCE, "low"),
+        "generated_at": ga,
+        "geo_level": row.get("geo_level"),
+        "geo_id": row.get("geo_id"),
+        "stale": bool(stale),
+    }
+    payload = row.get("payload")
+    return _dumps(head)[:-1] + ',"payload":' + _payload_json(payload) + "}", ga, payload is not None
+
+def render_latest(
+    zip_code: str,
+    signals: Iterable[Tuple[str, Optional[Dict[str, Any]], bool]],
+    *,
+    refreshed: bool,
+    refresh_pending: bool,
+    errors: Optional[Dict[str, str]],
+) -> Tuple[bytes, bool]:
+    """(body, any payload present) from (signal_type, row, stale) triples."""
+    parts = []
+    newest: Optional[str] = None
+    any_payload = False
+    for st, row, stale in signals:
+        text, ga, has_payload = render_signal(st, row, stale)
+        parts.append(_dumps(st) + ":" + text)
+        any_payload = any_payload or has_payload
+        # Top-level generated_at: newest among signals that have one
+        if ga and (newest is None or ga > newest):
+            newest = ga
+    body = (
+        '{"zip_code":' + _dumps(zip_code)
+        + ',"generated_at":' + _dumps(newest)
+        + ',"signals":{' + ",".join(parts) + "}"
+        + ',"refreshed":' + _dumps(bool(refreshed))
+        + ',"refresh_pending":' + _dumps(bool(refresh_pending))
+        + ',"errors":' + _dumps(errors or None)
+        + "}"
+    )
+    return body.encode("utf-8"), any_payload
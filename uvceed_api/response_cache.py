@@ -0,0 +1,270 @@
+"""Per-worker cache of fresh /signals/latest responses, invalidated by LISTEN/NOTIFY.
+
+- keyed by ZIP; holds the rendered body and its validators (ETag, Last-Modified)
+- bounded (UVCEED_RESPONSE_CACHE_MAX_ENTRIES, least recently used evicted first)
+- an entry lives until UVCEED_RESPONSE_CACHE_TTL_SECONDS or until its first signal
+  goes stale, whichever comes first -- only fresh responses are cached
+- db.insert_signal_snapshot NOTIFYs SNAPSHOT_CHANNEL with "signal:geo_level:geo_id";
+  a listener thread evicts every ZIP served by that geo key, so new data is
+  visible on the next request
+- while the listener is disconnected the cache is bypassed (and emptied on
+  reconnect), since notifications may have been missed
+- hits skip Postgres, so their zip_requests bumps are batched and flushed by the
+  listener thread every UVCEED_RESPONSE_CACHE_FLUSH_SECONDS
+
+Counters (hit ratio, evictions, invalidations) are exposed on /metrics.
+"""
+
+import datetime as dt
+import select
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+import psycopg2
+
+from . import config
+from .db import SNAPSHOT_CHANNEL, db_conn, get_database_url, record_zip_requests
+
+UTC = dt.timezone.utc
+
+# (signal_type, geo_level, geo_id), as in the NOTIFY payload
+SnapshotKey = Tuple[str, str, str]
+
+@dataclass
+class Entry:
+    body: bytes
+    headers: Dict[str, str]       # ETag / Last-Modified
+    first_stale: dt.datetime      # Cache-Control max-age is computed from this at serve time
+    keys: Tuple[SnapshotKey, ...]
+    expires: float                # monotonic
+
+class ResponseCache:
+    def __init__(self, max_entries: int, ttl_s: float):
+        self.max_entries = max(1, max_entries)
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Entry]" = OrderedDict()
+        self._by_key: Dict[SnapshotKey, Set[str]] = {}
+        self._generation = 0
+        self._pending: Dict[str, int] = {}
+        self.connected = False
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "stores_skipped": 0,
+            "evictions_lru": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "notifications": 0,
+            "listener_reconnects": 0,
+        }
+
+    # -- internals (called with self._lock held) --
+
+    def _drop(self, zip_code: str) -> None:
+        entry = self._entries.pop(zip_code, None)
+        if entry is None:
+            return
+        for k in entry.keys:
+            zips = self._by_key.get(k)
+            if zips is not None:
+                zips.discard(zip_code)
+                if not zips:
+                    del self._by_key[k]
+
+    # -- public API --
+
+    def generation(self) -> int:
+        """Read before loading from Postgres and pass to put(), so a NOTIFY in between wins."""
+        with self._lock:
+            return self._generation
+
+    def get(self, zip_code: str) -> Optional[Entry]:
+        if not self.connected:
+            return None
+        with self._lock:
+            entry = self._entries.get(zip_code)
+            if entry is not None and entry.expires <= time.monotonic():
+                self._drop(zip_code)
+                self._counters["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(zip_code)
+            self._counters["hits"] += 1
+            # The hit still counts as a request for popularity / the refresher
+            self._pending[zip_code] = self._pending.get(zip_code, 0) + 1
+            return entry
+
+    def put(
+        self,
+        zip_code: str,
+        body: bytes,
+        headers: Dict[str, str],
+        first_stale: dt.datetime,
+        keys: Iterable[SnapshotKey],
+        generation: int,
+    ) -> None:
+        if not self.connected:
+            return
+        ttl = min(self.ttl_s, (first_stale - dt.datetime.now(UTC)).total_seconds())
+        with self._lock:
+            if generation != self._generation or ttl <= 0:
+                self._counters["stores_skipped"] += 1
+                return
+            self._drop(zip_code)
+            entry = Entry(body, dict(headers), first_stale, tuple(keys), time.monotonic() + ttl)
+            self._entries[zip_code] = entry
+            for k in entry.keys:
+                self._by_key.setdefault(k, set()).add(zip_code)
+            self._counters["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self._counters["evictions_lru"] += 1
+
+    def invalidate(self, key: SnapshotKey) -> int:
+        """Evict every ZIP whose response includes the snapshot at key; returns how many."""
+        with self._lock:
+            self._generation += 1
+            self._counters["notifications"] += 1
+            zips = list(self._by_key.get(key, ()))
+            for z in zips:
+                self._drop(z)
+            self._counters["invalidations"] += len(zips)
+            return len(zips)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._by_key.clear()
+
+    def take_pending(self) -> Dict[str, int]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            return pending
+
+    def restore_pending(self, counts: Dict[str, int]) -> None:
+        with self._lock:
+            for z, n in counts.items():
+                self._pending[z] = self._pending.get(z, 0) + n
+
+    def note_reconnect(self) -> None:
+        with self._lock:
+            self._counters["listener_reconnects"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "enabled": config.RESPONSE_CACHE,
+                "listener_connected": self.connected,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_ratio": round(self._counters["hits"] / lookups, 4) if lookups else None,
+                "pending_requests": sum(self._pending.values()),
+                **self._counters,
+            }
+
+response_cache = ResponseCache(config.RESPONSE_CACHE_MAX_ENTRIES, config.RESPONSE_CACHE_TTL_SECONDS)
+
+def _parse_notify(payload: str) -> Optional[SnapshotKey]:
+    parts = payload.split(":", 2)
+    return (parts[0], parts[1], parts[2]) if len(parts) == 3 else None
+
+class SnapshotListener(threading.Thread):
+    """LISTENs on a dedicated connection (not from the pool) and feeds the cache."""
+
+    POLL_SECONDS = 1.0
+    KEEPALIVE_SECONDS = 30.0
+    MAX_BACKOFF_SECONDS = 30.0
+
+    def __init__(self, cache: ResponseCache):
+        super().__init__(name="uvceed-snapshot-listener", daemon=True)
+        self.cache = cache
+        self._stopping = threading.Event()
+        self._next_flush = time.monotonic() + config.RESPONSE_CACHE_FLUSH_SECONDS
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def _flush(self, force: bool = False) -> None:
+        if not force and time.monotonic() < self._next_flush:
+            return
+        self._next_flush = time.monotonic() + config.RESPONSE_CACHE_FLUSH_SECONDS
+        pending = self.cache.take_pending()
+        if not pending:
+            return
+        try:
+            with db_conn() as conn:
+                record_zip_requests(conn, pending, config.POPULARITY_HALF_LIFE_HOURS)
+        except Exception as e:
+            self.cache.restore_pending(pending)
+            print(f"[response_cache] WARN request flush failed: {e}", file=sys.stderr)
+
+    def _listen(self) -> None:
+        conn = psycopg2.connect(get_database_url())
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {SNAPSHOT_CHANNEL};")
+            # Anything cached before this point may have missed a notification
+            self.cache.clear()
+            self.cache.connected = True
+            last_seen = time.monotonic()
+            while not self._stopping.is_set():
+                if select.select([conn], [], [], self.POLL_SECONDS)[0]:
+                    conn.poll()
+                    while conn.notifies:
+                        key = _parse_notify(conn.notifies.pop(0).payload)
+                        if key is not None:
+                            self.cache.invalidate(key)
+                    last_seen = time.monotonic()
+                elif time.monotonic() - last_seen > self.KEEPALIVE_SECONDS:
+                    # Surfaces a dead connection instead of waiting on it forever
+                    with conn.cursor() as cur:
+                        cur.execute("SELECT 1;")
+                    last_seen = time.monotonic()
+                self._flush()
+        finally:
+            self.cache.connected = False
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def run(self) -> None:
+        backoff = 1.0
+        while not self._stopping.is_set():
+            started = time.monotonic()
+            try:
+                self._listen()
+            except Exception as e:
+                print(f"[response_cache] WARN listener disconnected: {e}", file=sys.stderr)
+            if self._stopping.is_set():
+                break
+            self.cache.note_reconnect()
+            backoff = 1.0 if time.monotonic() - started > self.MAX_BACKOFF_SECONDS else min(backoff * 2, self.MAX_BACKOFF_SECONDS)
+            self._stopping.wait(backoff)
+        self._flush(force=True)
+
+_listener: Optional[SnapshotListener] = None
+
+def start_listener() -> None:
+    global _listener
+    if _listener is None or not _listener.is_alive():
+        _listener = SnapshotListener(response_cache)
+        _listener.start()
+
+def stop_listener(timeout: float = 5.0) -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener.join(timeout)
+        _listener = None
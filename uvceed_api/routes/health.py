@@ -1,9 +1,26 @@
 from fastapi import APIRouter, Depends
+
+from uvceed_alerts.shared_cache import get_cache
+
+from ..adb import apool_stats
 from ..auth import require_api_key
+from ..db import pool_stats
+from ..limiter import refresh_limiter
 from ..models import HealthOut
+from ..response_cache import response_cache
 
 router = APIRouter()
 
 @router.get("/health", response_model=HealthOut)
-def health(_: None = Depends(require_api_key)):
+async def health(_: None = Depends(require_api_key)):
     return HealthOut(status="ok")
+
+@router.get("/metrics")
+async def metrics(_: None = Depends(require_api_key)):
+    return {
+        "refresh_limiter": refresh_limiter.stats(),
+        "db_pool": pool_stats(),
+        "async_db_pool": apool_stats(),
+        "response_cache": response_cache.stats(),
+        "shared_cache": get_cache().stats(),
+    }
@@ -1,83 +1,356 @@
 import re
+import hashlib
 import datetime as dt
-from typing import Any, Dict, Optional
+from concurrent.futures import TimeoutError as FutureTimeout
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from starlette.concurrency import run_in_threadpool
+
+from uvceed_alerts.shared_cache import get_cache
+
+from .. import config
+from ..adb import adb_conn, aregister_and_read_latest, asnapshot_payloads
 from ..auth import require_api_key
-from ..db import db_conn, ensure_phase3_schema, latest_snapshots, upsert_zip_request
-from ..models import LatestSignalsOut, RefreshIn, SignalOut
-from ..refresh import refresh_zip
+from ..db import ZIP_LOCATION_FIELDS, db_conn, register_and_read_latest, snapshot_payloads, upsert_zip_request
+from ..jobs import PRIORITY_INTERACTIVE, PRIORITY_STALE, enqueue_refresh, wait_for_snapshots
+from ..models import LatestSignalsOut, RefreshIn
+from ..geo import GeoKey, zip_geo_keys
+from ..limiter import Overloaded
+from ..migrations import check_schema_version, schema_version_checked
+from ..refresh import is_stale, latest_for_zip, refresh_zip_background, refresh_zip_shared, stale_at
+from ..render import render_latest
+from ..response_cache import response_cache
 
 router = APIRouter()
 
 ZIP_RE = re.compile(r"^\d{5}$")
 UTC = dt.timezone.utc
 
-def _normalize_row(st: str, row: Optional[dict]) -> SignalOut:
-    if not row:
-        return SignalOut(signal_type=st, risk="unknown", trend="unknown", confidence="low", generated_at=None, payload=None)
-    ga = row.get("generated_at")
-    ga_iso = ga.astimezone(UTC).isoformat().replace("+00:00", "Z") if isinstance(ga, dt.datetime) else None
-    return SignalOut(
-        signal_type=st,
-        risk=(row.get("risk_level") or "unknown"),
-        trend=(row.get("trend") or "unknown"),
-        confidence=(row.get("confidence") or "low"),
-        generated_at=ga_iso,
-        payload=row.get("payload"),
+def _latest_response(
+    zip: str,
+    keys: Dict[str, GeoKey],
+    refreshed: bool,
+    errors: Dict[str, str],
+    refresh_pending: bool = False,
+    rows: Optional[Dict[str, Optional[dict]]] = None,
+    stale: Iterable[str] = (),
+) -> Response:
+    """Pre-rendered LatestSignalsOut body; payloads are passed through as stored, never re-validated."""
+    if rows is None:
+        with db_conn() as conn:
+            _, rows = latest_for_zip(conn, zip, keys=keys)
+    marked = set(stale)
+    body, any_payload = render_latest(
+        zip,
+        (
+            (st, rows.get(st), st in marked or (bool(rows.get(st)) and is_stale(st, rows.get(st))))
+            for st in config.SIGNAL_TYPES
+        ),
+        refreshed=refreshed,
+        refresh_pending=refresh_pending,
+        errors=errors,
+    )
+
+    # If everything is missing and refresh errors occurred, surface a 503
+    if not any_payload and errors:
+        raise HTTPException(status_code=503, detail={"message": "refresh failed and no cached data exists", "errors": errors})
+
+    return Response(content=body, media_type="application/json")
+
+def _shed_response(
+    zip: str,
+    keys: Dict[str, GeoKey],
+    rows: Dict[str, Optional[dict]],
+    due: List[str],
+    exc: Overloaded,
+) -> Response:
+    """Refresh capacity exhausted: serve cached snapshots marked stale, or a fast 503 if there are none."""
+    if not any(rows.get(st) for st in config.SIGNAL_TYPES):
+        raise HTTPException(
+            status_code=503,
+            detail={"message": "refresh capacity exhausted; retry later", "reason": exc.reason},
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+    return _latest_response(zip, keys, False, {st: f"refresh shed ({exc.reason})" for st in due}, rows=rows, stale=due)
+
+def _due(rows: Dict[str, Optional[dict]], force: bool = False) -> List[str]:
+    if force:
+        return list(config.SIGNAL_TYPES)
+    return [st for st in config.SIGNAL_TYPES if not rows.get(st) or is_stale(st, rows.get(st))]
+
+def _refresh_limited(
+    zip: str,
+    keys: Dict[str, GeoKey],
+    rows: Dict[str, Optional[dict]],
+    force: bool = False,
+) -> Response:
+    """Synchronous refresh, joined with any in flight for this ZIP; ingestion runs under the refresh limiter."""
+    try:
+        refreshed, errors = refresh_zip_shared(zip, force=force)
+    except Overloaded as e:
+        return _shed_response(zip, keys, rows, _due(rows, force), e)
+    return _latest_response(zip, keys, refreshed, errors)
+
+def _read_and_register(zip: str, keys: Dict[str, GeoKey], register: bool = True) -> Dict[str, Optional[dict]]:
+    """Short transaction: record the request and read the current snapshots."""
+    with db_conn() as conn:
+        check_schema_version(conn)
+        if register:
+            upsert_zip_request(conn, zip, config.POPULARITY_HALF_LIFE_HOURS)
+        _, rows = latest_for_zip(conn, zip, keys=keys)
+    return rows
+
+def _read_fast(zip: str, payloads: bool = True) -> Tuple[Dict[str, GeoKey], Dict[str, Optional[dict]]]:
+    """Register + geo keys + latest snapshots in one autocommit statement (one round trip when warm).
+
+    Falls back to the upstream geo lookup only for a ZIP not yet in zip_geo.
+    payloads=False skips the payload column (conditional requests; see _fill_payloads).
+    """
+    levels = {st: config.SIGNAL_GEO_LEVEL.get(st, "zip") for st in config.SIGNAL_TYPES}
+    with db_conn() as conn:
+        conn.autocommit = True
+        check_schema_version(conn)
+        fast = register_and_read_latest(conn, zip, levels, config.POPULARITY_HALF_LIFE_HOURS, payloads=payloads)
+    if fast is not None:
+        return fast
+    keys = zip_geo_keys(zip, config.SIGNAL_TYPES)
+    return keys, _read_and_register(zip, keys, register=False)
+
+def _check_schema() -> None:
+    with db_conn() as conn:
+        check_schema_version(conn)
+
+async def _aread_fast(zip: str, payloads: bool = True) -> Tuple[Dict[str, GeoKey], Dict[str, Optional[dict]]]:
+    """_read_fast on the async pool; the blocking geo lookup (cold ZIP) goes to the threadpool."""
+    if not config.ASYNC_DB:
+        return await run_in_threadpool(_read_fast, zip, payloads)
+    if not schema_version_checked():
+        await run_in_threadpool(_check_schema)
+    levels = {st: config.SIGNAL_GEO_LEVEL.get(st, "zip") for st in config.SIGNAL_TYPES}
+    async with adb_conn() as conn:
+        fast = await aregister_and_read_latest(conn, zip, levels, config.POPULARITY_HALF_LIFE_HOURS, payloads=payloads)
+    if fast is not None:
+        return fast
+    keys = await run_in_threadpool(zip_geo_keys, zip, config.SIGNAL_TYPES)
+    return keys, await run_in_threadpool(_read_and_register, zip, keys, False)
+
+def _apply_payloads(rows: Dict[str, Optional[dict]], found: Dict[int, str]) -> None:
+    for row in rows.values():
+        if row and "payload" not in row:
+            row["payload"] = found.get(row["id"])
+
+def _payload_ids(rows: Dict[str, Optional[dict]]) -> List[int]:
+    return [row["id"] for row in rows.values() if row and "payload" not in row]
+
+def _fill_payloads(zip: str, rows: Dict[str, Optional[dict]]) -> None:
+    """Load payloads for rows read without them (conditional request that wasn't a 304)."""
+    ids = _payload_ids(rows)
+    if ids:
+        with db_conn() as conn:
+            _apply_payloads(rows, snapshot_payloads(conn, zip, ids))
+
+async def _afill_payloads(zip: str, rows: Dict[str, Optional[dict]]) -> None:
+    ids = _payload_ids(rows)
+    if not ids:
+        return
+    if not config.ASYNC_DB:
+        await run_in_threadpool(_fill_payloads, zip, rows)
+        return
+    async with adb_conn() as conn:
+        _apply_payloads(rows, await asnapshot_payloads(conn, zip, ids))
+
+def _validators(zip: str, rows: Dict[str, Optional[dict]]) -> Dict[str, str]:
+    """ETag / Last-Modified for a fresh response.
+
+    The body of a fresh response is fully determined by the ZIP, its zip_geo location
+    (county/state payloads are localized from it) and its snapshot ids, so the strong
+    ETag hashes those.
+    """
+    geo = next((r["zip_geo"] for r in rows.values() if r and r.get("zip_geo")), None) or {}
+    tag = (
+        f"v2;zip={zip};"
+        + ";".join(f"{f}={geo.get(f)}" for f in ZIP_LOCATION_FIELDS)
+        + ";"
+        + ";".join(f"{st}={rows[st]['id']}" for st in config.SIGNAL_TYPES)
+    )
+    headers = {"ETag": '"' + hashlib.sha256(tag.encode("utf-8")).hexdigest()[:32] + '"'}
+    newest = max(
+        (r["generated_at"] for r in rows.values() if r and isinstance(r.get("generated_at"), dt.datetime)),
+        default=None,
     )
+    if newest is not None:
+        headers["Last-Modified"] = format_datetime(newest.astimezone(UTC), usegmt=True)
+    return headers
+
+def _first_stale_at(rows: Dict[str, Optional[dict]]) -> dt.datetime:
+    now = dt.datetime.now(UTC)
+    return min((at for at in (stale_at(st, rows[st]) for st in config.SIGNAL_TYPES) if at is not None), default=now)
+
+def _cache_headers(validators: Dict[str, str], first_stale: dt.datetime) -> Dict[str, str]:
+    """Validators plus Cache-Control: max-age runs until the first signal goes stale."""
+    max_age = max(0, int((first_stale - dt.datetime.now(UTC)).total_seconds()))
+    return {**validators, "Cache-Control": f"private, max-age={max_age}"}
+
+def _shared_body_key(zip: str, validators: Dict[str, str]) -> str:
+    return "resp:" + zip + ":" + validators["ETag"].strip('"')
+
+async def _shared_cache_call(fn, *args):
+    # Postgres/Redis backends do socket I/O: keep it off the event loop
+    if get_cache().blocking:
+        return await run_in_threadpool(fn, *args)
+    return fn(*args)
+
+def _not_modified(request: Request, validators: Dict[str, str]) -> bool:
+    """RFC 9110: If-None-Match wins; If-Modified-Since is only consulted without it."""
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        tags = [t.strip() for t in inm.split(",")]
+        # Weak comparison, as If-None-Match requires
+        return "*" in tags or validators["ETag"] in [t[2:] if t.startswith("W/") else t for t in tags]
+    ims = request.headers.get("if-modified-since")
+    if not ims or "Last-Modified" not in validators:
+        return False
+    try:
+        since = parsedate_to_datetime(ims)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=UTC)
+    return parsedate_to_datetime(validators["Last-Modified"]) <= since
+
+def _latest_queued(
+    zip: str,
+    keys: Dict[str, GeoKey],
+    rows: Dict[str, Optional[dict]],
+    max_wait_ms: Optional[int],
+) -> Response:
+    """Queue mode: enqueue missing/stale signals for the workers; only wait when nothing exists yet."""
+    missing = [st for st in config.SIGNAL_TYPES if not rows.get(st)]
+    stale = [st for st in config.SIGNAL_TYPES if rows.get(st) and is_stale(st, rows.get(st))]
+    if not (missing or stale):
+        return _latest_response(zip, keys, False, {}, rows=rows)
+
+    with db_conn() as conn:
+        enqueue_refresh(conn, zip, {st: keys[st] for st in missing + stale}, priority=(PRIORITY_INTERACTIVE if missing else PRIORITY_STALE))
+
+    refreshed = False
+    if missing:
+        wait_s = max_wait_ms / 1000.0 if max_wait_ms is not None else float(config.REFRESH_TIMEOUT_SECONDS)
+        rows = wait_for_snapshots({st: keys[st] for st in missing}, wait_s)
+        refreshed = any(rows.get(st) for st in missing)
+        missing = [st for st in missing if not rows.get(st)]
+
+    return _latest_response(zip, keys, refreshed, {}, refresh_pending=bool(missing or stale))
+
+def _latest_slow(
+    zip: str,
+    keys: Dict[str, GeoKey],
+    rows: Dict[str, Optional[dict]],
+    swr: bool,
+    max_wait_ms: Optional[int],
+) -> Response:
+    """Something is missing/stale: queue, refresh or serve stale (blocking; runs in the threadpool)."""
+    if config.REFRESH_QUEUE:
+        return _latest_queued(zip, keys, rows, max_wait_ms)
+
+    if not swr:
+        # read-through cache: missing/stale -> refresh and then re-read
+        return _refresh_limited(zip, keys, rows)
+
+    missing = [st for st in config.SIGNAL_TYPES if not rows.get(st)]
+    stale = [st for st in config.SIGNAL_TYPES if rows.get(st) and is_stale(st, rows.get(st))]
+
+    if missing and max_wait_ms is None:
+        # Nothing to serve yet: block like the read-through path
+        return _refresh_limited(zip, keys, rows)
+    if missing:
+        fut = refresh_zip_background(zip)
+        try:
+            refreshed, errors = fut.result(timeout=max_wait_ms / 1000.0)
+        except FutureTimeout:
+            return _latest_response(zip, keys, False, {}, refresh_pending=True)
+        except Overloaded as e:
+            return _shed_response(zip, keys, rows, missing + stale, e)
+        return _latest_response(zip, keys, refreshed, errors)
+    # Warm cache, something stale: never wait on an upstream
+    refresh_zip_background(zip)
+    return _latest_response(zip, keys, False, {}, refresh_pending=True, rows=rows)
 
 @router.get("/signals/latest", response_model=LatestSignalsOut)
-def signals_latest(
+async def signals_latest(
+    request: Request,
     zip: str = Query(..., description="5-digit ZIP"),
+    swr: Optional[bool] = Query(None, description="serve stale snapshots immediately and refresh in the background (default: UVCEED_SWR)"),
+    max_wait_ms: Optional[int] = Query(None, ge=0, description="SWR only: max time to wait for a ZIP with no snapshot yet"),
     _: None = Depends(require_api_key),
 ):
     if not ZIP_RE.match(zip):
         raise HTTPException(status_code=400, detail="zip must be a 5-digit string")
-    with db_conn() as conn:
-        ensure_phase3_schema(conn)
-        upsert_zip_request(conn, zip)
+    if swr is None:
+        swr = config.SWR_DEFAULT
+
+    # Conditional polls read snapshot heads only; payloads are loaded if the answer isn't a 304
+    conditional = "if-none-match" in request.headers or "if-modified-since" in request.headers
 
-        # read-through cache: if missing/stale -> refresh and then re-read
-        refreshed, errors = refresh_zip(conn, zip, force=False)
+    cached = response_cache.get(zip) if config.RESPONSE_CACHE else None
+    if cached is not None:
+        headers = _cache_headers(cached.headers, cached.first_stale)
+        if conditional and _not_modified(request, headers):
+            return Response(status_code=304, headers=headers)
+        return Response(content=cached.body, media_type="application/json", headers=headers)
+    generation = response_cache.generation()
 
-        rows = latest_snapshots(conn, zip, ["wastewater", "nssp_ed_visits"])
-        signals = {st: _normalize_row(st, rows.get(st)) for st in ["wastewater", "nssp_ed_visits"]}
+    # No DB connection is held across upstream work: read, (maybe) refresh, re-read.
+    keys, rows = await _aread_fast(zip, payloads=not conditional)
+    if not _due(rows):
+        # Fresh hit: answered from the single read above, without leaving the event loop
+        validators = _validators(zip, rows)
+        first_stale = _first_stale_at(rows)
+        headers = _cache_headers(validators, first_stale)
+        if conditional and _not_modified(request, headers):
+            return Response(status_code=304, headers=headers)
+        # Conditional miss: another worker may already have rendered this exact body (same ETag)
+        shared = get_cache() if conditional and get_cache().enabled else None
+        body = await _shared_cache_call(shared.get, _shared_body_key(zip, validators)) if shared else None
+        if body is not None:
+            response = Response(content=body, media_type="application/json")
+        else:
+            await _afill_payloads(zip, rows)
+            response = _latest_response(zip, keys, False, {}, rows=rows)
+            if shared:
+                ttl = (first_stale - dt.datetime.now(UTC)).total_seconds()
+                await _shared_cache_call(shared.set, _shared_body_key(zip, validators), response.body, ttl)
+        if config.RESPONSE_CACHE:
+            response_cache.put(
+                zip,
+                response.body,
+                validators,
+                first_stale,
+                [(st, level, geo_id) for st, (level, geo_id) in keys.items()],
+                generation,
+            )
+        response.headers.update(headers)
+        return response
+    await _afill_payloads(zip, rows)
+    return await run_in_threadpool(_latest_slow, zip, keys, rows, swr, max_wait_ms)
 
-        # Choose a top-level generated_at as the newest among signals that have it
-        newest = None
-        for st, s in signals.items():
-            if s.generated_at:
-                if newest is None or s.generated_at > newest:
-                    newest = s.generated_at
+def _refresh_now(zip: str) -> Response:
+    keys = zip_geo_keys(zip, config.SIGNAL_TYPES)
+    rows = _read_and_register(zip, keys)
 
-        # If everything is missing and refresh errors occurred, surface a 503
-        if all(v.payload is None for v in signals.values()) and errors:
-            raise HTTPException(status_code=503, detail={"message": "refresh failed and no cached data exists", "errors": errors})
+    if config.REFRESH_QUEUE:
+        with db_conn() as conn:
+            enqueue_refresh(conn, zip, keys, priority=PRIORITY_INTERACTIVE, force=True)
+        return _latest_response(zip, keys, False, {}, refresh_pending=True, rows=rows)
 
-        return LatestSignalsOut(zip_code=zip, generated_at=newest, signals=signals, refreshed=bool(refreshed), errors=(errors or None))
+    return _refresh_limited(zip, keys, rows, force=True)
 
 @router.post("/signals/refresh", response_model=LatestSignalsOut)
-def signals_refresh(body: RefreshIn, _: None = Depends(require_api_key)):
+async def signals_refresh(body: RefreshIn, _: None = Depends(require_api_key)):
     zip = body.zip
     if not ZIP_RE.match(zip):
         raise HTTPException(status_code=400, detail="zip must be a 5-digit string")
-    with db_conn() as conn:
-        ensure_phase3_schema(conn)
-        upsert_zip_request(conn, zip)
-
-        refreshed, errors = refresh_zip(conn, zip, force=True)
-
-        rows = latest_snapshots(conn, zip, ["wastewater", "nssp_ed_visits"])
-        signals = {st: _normalize_row(st, rows.get(st)) for st in ["wastewater", "nssp_ed_visits"]}
-
-        newest = None
-        for st, s in signals.items():
-            if s.generated_at:
-                if newest is None or s.generated_at > newest:
-                    newest = s.generated_at
-
-        if all(v.payload is None for v in signals.values()) and errors:
-            raise HTTPException(status_code=503, detail={"message": "refresh failed and no cached data exists", "errors": errors})
-
-        return LatestSignalsOut(zip_code=zip, generated_at=newest, signals=signals, refreshed=bool(refreshed), errors=(errors or None))
+    # Forced refresh is all blocking work (geo lookup, ingestion): keep it off the event loop
+    return await run_in_threadpool(_refresh_now, zip)
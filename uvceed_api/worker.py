@@ -0,0 +1,136 @@
+"""Refresh worker: drains refresh_jobs with bounded concurrency.
+
+Run as many of these as needed, on as many hosts as needed:
+
+  python3 -m uvceed_api.worker --concurrency 4
+
+Each worker thread keeps one DB connection for claiming/completing jobs
+(FOR UPDATE SKIP LOCKED, committed immediately) and runs refresh_zip for the
+job's signal, using the job's representative ZIP; refresh_zip uses its own short
+transactions. A failed queue statement or lost connection is logged and the
+thread reconnects with backoff; a job it had claimed is picked up again by the
+periodic requeue_stuck sweep.
+SIGINT/SIGTERM stop claiming new jobs; in-flight jobs finish first.
+"""
+
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from . import config
+from .db import db_conn, ensure_phase3_schema
+from .jobs import claim_jobs, complete_job, fail_job, purge_finished, requeue_stuck
+from .refresh import refresh_zip
+
+_stop = threading.Event()
+
+REQUEUE_EVERY_SECONDS = 60
+MAX_BACKOFF_SECONDS = 60.0
+
+def _handle_signal(signum, frame) -> None:
+    print(f"[worker] signal {signum}: finishing in-flight jobs", file=sys.stderr)
+    _stop.set()
+
+def _run_one(conn, job) -> None:
+    st = job["signal_type"]
+    try:
+        _, errors = refresh_zip(job["zip_code"], force=bool(job["force"]), signal_types=[st])
+    except Exception as e:
+        errors = {st: str(e)[:1200]}
+
+    if errors.get(st):
+        fail_job(conn, job, errors[st])
+    else:
+        complete_job(conn, int(job["id"]))
+    conn.commit()
+
+def _requeue_due(conn, stuck_after: int, shared: dict, lock: threading.Lock) -> None:
+    """Every REQUEUE_EVERY_SECONDS (one thread per process), requeue jobs orphaned by dead workers."""
+    with lock:
+        if time.monotonic() < shared["next_requeue"]:
+            return
+        shared["next_requeue"] = time.monotonic() + REQUEUE_EVERY_SECONDS
+    stuck = requeue_stuck(conn, stuck_after)
+    conn.commit()
+    if stuck:
+        print(f"[worker] requeued_stuck={stuck}", file=sys.stderr)
+
+def _worker_loop(worker_id: str, poll_s: float, max_jobs: int, stuck_after: int, shared: dict, lock: threading.Lock) -> None:
+    backoff = poll_s
+    while not _stop.is_set():
+        try:
+            with db_conn() as conn:
+                while not _stop.is_set():
+                    with lock:
+                        if max_jobs and shared["claimed"] >= max_jobs:
+                            return
+                    _requeue_due(conn, stuck_after, shared, lock)
+                    jobs = claim_jobs(conn, worker_id, limit=1)
+                    conn.commit()
+                    backoff = poll_s
+                    if not jobs:
+                        _stop.wait(poll_s)
+                        continue
+                    with lock:
+                        shared["claimed"] += 1
+                    job = jobs[0]
+                    started = time.monotonic()
+                    _run_one(conn, job)
+                    print(
+                        f"[worker] {worker_id} job={job['id']} {job['geo_key']}/{job['signal_type']} "
+                        f"zip={job['zip_code']} attempt={job['attempts']} {time.monotonic() - started:.1f}s",
+                        file=sys.stderr,
+                    )
+        except Exception as e:
+            # db_conn rolled back (or discarded a broken connection); take a fresh one after a pause
+            print(f"[worker] {worker_id} WARN {e}; reconnecting in {backoff:g}s", file=sys.stderr)
+            _stop.wait(backoff)
+            backoff = min(max(backoff, 1.0) * 2, MAX_BACKOFF_SECONDS)
+
+def main():
+    ap = argparse.ArgumentParser(description="Process queued refresh jobs (refresh_jobs table).")
+    ap.add_argument("--concurrency", type=int, default=config.WORKER_CONCURRENCY, help="jobs run in parallel by this process")
+    ap.add_argument("--poll", type=float, default=2.0, help="seconds to sleep when the queue is empty")
+    ap.add_argument("--max-jobs", type=int, default=0, help="exit after claiming N jobs (0 = run forever)")
+    ap.add_argument("--stuck-after", type=int, default=config.REFRESH_TIMEOUT_SECONDS * 10, help="requeue running jobs locked longer than this (seconds)")
+    args = ap.parse_args()
+
+    signal.signal(signal.SIGINT, _handle_signal)
+    signal.signal(signal.SIGTERM, _handle_signal)
+
+    with db_conn() as conn:
+        ensure_phase3_schema(conn)
+        stuck = requeue_stuck(conn, args.stuck_after)
+        purged = purge_finished(conn)
+    print(f"[worker] requeued_stuck={stuck} purged_finished={purged}", file=sys.stderr)
+
+    if config.DB_POOL and 2 * args.concurrency > config.DB_POOL_MAX:
+        # each thread holds one connection for claims plus one inside refresh_zip
+        print(f"hint: raise UVCEED_DB_POOL_MAX (now {config.DB_POOL_MAX}) to 2 x --concurrency", file=sys.stderr)
+
+    base = f"{socket.gethostname()}:{os.getpid()}"
+    shared = {"claimed": 0, "next_requeue": time.monotonic() + REQUEUE_EVERY_SECONDS}
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(
+            target=_worker_loop,
+            args=(f"{base}:{i}", args.poll, args.max_jobs, args.stuck_after, shared, lock),
+            name=f"uvceed-worker-{i}",
+            daemon=True,
+        )
+        for i in range(max(1, args.concurrency))
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        while t.is_alive():
+            t.join(timeout=1.0)
+
+    print(f"OK: worker exiting claimed={shared['claimed']}")
+
+if __name__ == "__main__":
+    main()